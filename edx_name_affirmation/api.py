@@ -3,20 +3,50 @@ Python API for edx_name_affirmation.
 """
 
 import logging
+from collections import defaultdict
 
-from django.core.exceptions import ObjectDoesNotExist
+from edx_django_utils.cache import TieredCache
 
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ObjectDoesNotExist
+from django.db import transaction
+from django.db.models import BooleanField, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from edx_name_affirmation.cache import (
+    get_cached_verified_name,
+    get_verified_name_cache_key,
+    invalidate_verified_name_cache,
+    is_verified_name_cache_enabled,
+    set_cached_verified_name
+)
 from edx_name_affirmation.exceptions import (
     VerifiedNameAttemptIdNotGiven,
     VerifiedNameDoesNotExist,
     VerifiedNameEmptyString,
     VerifiedNameMultipleAttemptIds
 )
-from edx_name_affirmation.models import VerifiedName, VerifiedNameConfig
+from edx_name_affirmation.models import CurrentVerifiedName, VerifiedName, VerifiedNameConfig
+from edx_name_affirmation.signals import deferred_approval_signals, send_verified_name_approved
 from edx_name_affirmation.statuses import VerifiedNameStatus
 
 log = logging.getLogger(__name__)
 
+# Maximum number of users resolved per query by the bulk lookup functions
+BULK_LOOKUP_CHUNK_SIZE = 1000
+
+# Maximum number of attempts updated per transaction by `bulk_update_verified_name_status`
+BULK_STATUS_UPDATE_CHUNK_SIZE = 500
+
+# Results of the updates made by `bulk_update_verified_name_status`
+BULK_STATUS_UPDATED = 'updated'
+BULK_STATUS_UNCHANGED = 'unchanged'
+BULK_STATUS_NOT_FOUND = 'not_found'
+
+_NOT_FOUND = object()
+
 
 def create_verified_name(
     user, verified_name, profile_name, verification_attempt_id=None,
@@ -96,16 +126,96 @@ def get_verified_name(user, is_verified=False, statuses_to_exclude=None):
           relevant if `is_verified` is False.
 
     Returns a VerifiedName object.
+
+    If the NAME_AFFIRMATION_VERIFIED_NAME_CACHE_ENABLED setting is True, the result is
+    read from and stored in the cache. If the NAME_AFFIRMATION_USE_CURRENT_VERIFIED_NAME
+    setting is True, lookups without `statuses_to_exclude` are served from the user's
+    CurrentVerifiedName row.
+    """
+    use_cache = is_verified_name_cache_enabled()
+    if use_cache:
+        # The key is built once, so a result read before an invalidation is stored under the old version
+        cache_key = get_verified_name_cache_key(user.id, is_verified, statuses_to_exclude)
+        is_cached, cached_verified_name = get_cached_verified_name(cache_key)
+        if is_cached:
+            return cached_verified_name
+
+    verified_name = _NOT_FOUND
+    if _use_current_verified_name() and (is_verified or not statuses_to_exclude):
+        verified_name = _get_verified_name_from_current(user, is_verified)
+
+    if verified_name is _NOT_FOUND:
+        verified_name_qs = VerifiedName.objects.filter(user=user).order_by('-created', '-id')
+        verified_name = _filter_by_status(verified_name_qs, is_verified, statuses_to_exclude).first()
+
+    if use_cache:
+        set_cached_verified_name(cache_key, verified_name)
+
+    return verified_name
+
+
+def _use_current_verified_name():
+    """
+    Return whether reads should be served from the CurrentVerifiedName read model.
+    """
+    return getattr(settings, 'NAME_AFFIRMATION_USE_CURRENT_VERIFIED_NAME', False)
+
+
+def _get_verified_name_from_current(user, is_verified):
+    """
+    Look up the latest (approved) VerifiedName through the user's CurrentVerifiedName row.
+
+    Returns `_NOT_FOUND` if the user has no row yet, so callers can fall back to the history.
+    """
+    field_name = 'approved_verified_name' if is_verified else 'latest_verified_name'
+    current_verified_name = CurrentVerifiedName.objects.select_related(field_name).filter(user_id=user.id).first()
+    if current_verified_name is None:
+        return _NOT_FOUND
+    return getattr(current_verified_name, field_name)
+
+
+def get_verified_names_for_users(user_ids, is_verified=False, statuses_to_exclude=None):
+    """
+    Get the most recent VerifiedName for each of the given users.
+
+    Arguments:
+        * `user_ids` (iterable of int)
+        * `is_verified` (bool): Optional, set to True to ignore entries that are not
+          verified.
+        * `statuses_to_exclude` (list): Optional list of statuses to filter out. Only
+          relevant if `is_verified` is False.
+
+    Returns a dict mapping user ID to VerifiedName object. Users without a matching
+    VerifiedName are left out of the dict.
     """
-    verified_name_qs = VerifiedName.objects.filter(user=user).order_by('-created')
+    user_ids = list(dict.fromkeys(user_ids))
+    latest_id_for_user = _filter_by_status(
+        VerifiedName.objects.filter(user_id=OuterRef('user_id')),
+        is_verified,
+        statuses_to_exclude,
+    ).order_by('-created', '-id').values('id')[:1]
 
+    verified_names = {}
+    for start in range(0, len(user_ids), BULK_LOOKUP_CHUNK_SIZE):
+        chunk = user_ids[start:start + BULK_LOOKUP_CHUNK_SIZE]
+        verified_name_qs = VerifiedName.objects.filter(user_id__in=chunk, id=Subquery(latest_id_for_user))
+        for verified_name in verified_name_qs:
+            verified_names[verified_name.user_id] = verified_name
+
+    return verified_names
+
+
+def _filter_by_status(verified_name_qs, is_verified, statuses_to_exclude):
+    """
+    Apply the `is_verified` and `statuses_to_exclude` filters shared by the VerifiedName getters.
+    """
     if is_verified:
-        return verified_name_qs.filter(status=VerifiedNameStatus.APPROVED.value).first()
+        return verified_name_qs.filter(status=VerifiedNameStatus.APPROVED.value)
 
     if statuses_to_exclude:
-        return verified_name_qs.exclude(status__in=statuses_to_exclude).first()
+        return verified_name_qs.exclude(status__in=statuses_to_exclude)
 
-    return verified_name_qs.first()
+    return verified_name_qs
 
 
 def delete_verified_name(verified_name_id):
@@ -131,16 +241,19 @@ def get_verified_name_history(user):
     Arguments:
         * `user` (User object)
     """
-    return VerifiedName.objects.filter(user=user).order_by('-created')
+    return VerifiedName.objects.filter(user=user).select_related('user').order_by('-created', '-id')
 
 
 def update_verified_name_status(
     user, status, verification_attempt_id=None, proctored_exam_attempt_id=None, platform_verification_attempt_id=None,
+    enforce_lifecycle=False,
 ):
     """
     Update the status of a VerifiedName using the linked ID verification, exam attempt ID, or platform defined
     verification attempt ID. Only one of these should be specified.
 
+    The status is set with `compare_and_set_verified_name_status`, and the VerifiedName is returned.
+
     Arguments:
         * user (User object)
         * status (Verified Name Status)
@@ -150,6 +263,8 @@ def update_verified_name_status(
           attempt.
         * platform_verification_attempt_id (int): Optional reference to a platform defined
           verification attempt.
+        * enforce_lifecycle (bool): Optional, defaults False. If True, the status is only
+          updated if it moves forward in the pending -> submitted -> approved/denied lifecycle.
     """
     filters = {'user': user}
 
@@ -193,22 +308,194 @@ def update_verified_name_status(
         )
         raise VerifiedNameDoesNotExist(err_msg)
 
-    verified_name_obj.status = status
-    verified_name_obj.save()
-
-    log_msg = (
-        'Updated status={status} for VerifiedName belonging to user_id={user_id}. '
+    if compare_and_set_verified_name_status(verified_name_obj, status, enforce_lifecycle):
+        log_msg = 'Updated status={status} for VerifiedName belonging to user_id={user_id}. '
+    else:
+        # the status may have been changed by another process since the VerifiedName was read
+        verified_name_obj.refresh_from_db(fields=['status'])
+        log_msg = 'Did not update VerifiedName belonging to user_id={user_id} from status={current_status}. '
+    log_msg += (
         'verification_attempt_id={verification_attempt_id}, '
-        'proctored_exam_attempt_id={proctored_exam_attempt_id}'.format(
+        'proctored_exam_attempt_id={proctored_exam_attempt_id}'
+    )
+    log.info(log_msg.format(
+        status=status,
+        current_status=verified_name_obj.status,
+        user_id=verified_name_obj.user_id,
+        verification_attempt_id=verification_attempt_id,
+        proctored_exam_attempt_id=proctored_exam_attempt_id,
+    ))
+
+    return verified_name_obj
+
+
+def compare_and_set_verified_name_status(verified_name, status, enforce_lifecycle=False):
+    """
+    Set the status of a VerifiedName with a single conditional UPDATE, and return whether it changed.
+
+    Only `status` and `modified` are written, so concurrent changes to the VerifiedName are not lost. Nothing
+    is written if the VerifiedName already has the given status in the database. With `enforce_lifecycle`,
+    nothing is written either if its status is not earlier in the pending -> submitted -> approved/denied
+    lifecycle than the given status.
+
+    When the status changes, the VerifiedName is reloaded, a history record is stored, the user's cached
+    lookups and CurrentVerifiedName are refreshed, and VERIFIED_NAME_APPROVED is sent for an approval.
+
+    Arguments:
+        * verified_name (VerifiedName object)
+        * status (Verified Name Status)
+        * enforce_lifecycle (bool): Optional, defaults False.
+    """
+    verified_names = _filter_status_transitions(
+        VerifiedName.objects.filter(id=verified_name.id), status, enforce_lifecycle,
+    )
+
+    with transaction.atomic():
+        if not verified_names.update(status=status, modified=timezone.now()):
+            return False
+        verified_name.refresh_from_db()
+        VerifiedName.history.bulk_history_create([verified_name], update=True)
+        CurrentVerifiedName.refresh_for_users([verified_name.user_id])
+
+    user_id = verified_name.user_id
+    invalidate_verified_name_cache(user_id)
+    transaction.on_commit(lambda: invalidate_verified_name_cache(user_id))
+    if verified_name.status == VerifiedNameStatus.APPROVED:
+        send_verified_name_approved(user_id, verified_name.profile_name)
+    return True
+
+
+def bulk_update_verified_name_status(
+    status, verification_attempt_ids=None, proctored_exam_attempt_ids=None, platform_verification_attempt_ids=None,
+    enforce_lifecycle=False,
+):
+    """
+    Update the status of the VerifiedNames linked to many attempts, like `update_verified_name_status`
+    does for a single attempt, without looking up their users.
+
+    The attempts are updated in chunks of BULK_STATUS_UPDATE_CHUNK_SIZE, each in its own transaction, with a
+    single conditional UPDATE per chunk. If a chunk fails, the chunks before it stay updated. History records,
+    cache invalidation, CurrentVerifiedName refreshes and VERIFIED_NAME_APPROVED signals are handled as in
+    `compare_and_set_verified_name_status`, with one signal per user once each chunk commits.
+
+    Arguments:
+        * status (Verified Name Status)
+        * verification_attempt_ids (list of int): Optional references to external ID verification attempts.
+        * proctored_exam_attempt_ids (list of int): Optional references to external proctored exam attempts.
+        * platform_verification_attempt_ids (list of int): Optional references to platform defined
+          verification attempts.
+        * enforce_lifecycle (bool): Optional, defaults False. If True, a status is only updated if it moves
+          forward in the pending -> submitted -> approved/denied lifecycle.
+
+    Returns a list with a dict for each given attempt ID, in order. Each dict has the attempt ID under its
+    field name, such as `proctored_exam_attempt_id`, the `verified_name_id` of the attempt's most recent
+    VerifiedName, or None if there is none, and a `result` of BULK_STATUS_UPDATED, BULK_STATUS_UNCHANGED
+    or BULK_STATUS_NOT_FOUND.
+    """
+    attempts = [
+        (field_name, attempt_id)
+        for field_name, attempt_ids in (
+            ('verification_attempt_id', verification_attempt_ids),
+            ('proctored_exam_attempt_id', proctored_exam_attempt_ids),
+            ('platform_verification_attempt_id', platform_verification_attempt_ids),
+        )
+        for attempt_id in dict.fromkeys(attempt_ids or [])
+    ]
+
+    results = []
+    for start in range(0, len(attempts), BULK_STATUS_UPDATE_CHUNK_SIZE):
+        chunk = attempts[start:start + BULK_STATUS_UPDATE_CHUNK_SIZE]
+        with transaction.atomic(), deferred_approval_signals():
+            results += _update_verified_name_status_for_attempts(status, chunk, enforce_lifecycle)
+
+    log.info(
+        'Bulk updated status={status} for {num_updated} of {num_attempts} VerifiedNames'.format(
             status=status,
-            user_id=verified_name_obj.user.id,
-            verification_attempt_id=verification_attempt_id,
-            proctored_exam_attempt_id=proctored_exam_attempt_id,
+            num_updated=sum(result['result'] == BULK_STATUS_UPDATED for result in results),
+            num_attempts=len(results),
         )
     )
-    log.info(log_msg)
+    return results
 
-    return verified_name_obj
+
+def _update_verified_name_status_for_attempts(status, attempts, enforce_lifecycle):
+    """
+    Update the status of the most recent VerifiedName for each of the given (attempt ID field name, attempt ID)
+    pairs, returning the result for each. Must be called within a transaction.
+    """
+    attempt_ids_by_field = defaultdict(set)
+    for field_name, attempt_id in attempts:
+        attempt_ids_by_field[field_name].add(attempt_id)
+    # one IN lookup per attempt ID field
+    attempt_filter = Q()
+    for field_name, attempt_ids in attempt_ids_by_field.items():
+        attempt_filter |= Q(**{f'{field_name}__in': attempt_ids})
+    # the most recent VerifiedName for each attempt comes last
+    verified_names_by_attempt = {}
+    for verified_name in VerifiedName.objects.select_for_update().filter(attempt_filter).order_by('created', 'id'):
+        for field_name, attempt_ids in attempt_ids_by_field.items():
+            attempt_id = getattr(verified_name, field_name)
+            if attempt_id in attempt_ids:
+                verified_names_by_attempt[(field_name, attempt_id)] = verified_name
+
+    verified_names = {
+        verified_name.id: verified_name for verified_name in verified_names_by_attempt.values()
+    }
+    # the VerifiedNames are locked, so these are the rows the conditional update changes
+    transition_ids = set(
+        _filter_status_transitions(VerifiedName.objects.filter(id__in=verified_names), status, enforce_lifecycle)
+        .values_list('id', flat=True)
+    )
+    if transition_ids:
+        now = timezone.now()
+        _filter_status_transitions(
+            VerifiedName.objects.filter(id__in=transition_ids), status, enforce_lifecycle,
+        ).update(status=status, modified=now)
+        transitioned_verified_names = [verified_names[verified_name_id] for verified_name_id in transition_ids]
+        for verified_name in transitioned_verified_names:
+            verified_name.status = status
+            verified_name.modified = now
+        VerifiedName.history.bulk_history_create(transitioned_verified_names, update=True)
+
+        user_ids = {verified_name.user_id for verified_name in transitioned_verified_names}
+        CurrentVerifiedName.refresh_for_users(user_ids)
+        for user_id in user_ids:
+            invalidate_verified_name_cache(user_id)
+        transaction.on_commit(lambda: [invalidate_verified_name_cache(user_id) for user_id in user_ids])
+        if status == VerifiedNameStatus.APPROVED:
+            for verified_name in transitioned_verified_names:
+                send_verified_name_approved(verified_name.user_id, verified_name.profile_name)
+
+    results = []
+    for field_name, attempt_id in attempts:
+        verified_name = verified_names_by_attempt.get((field_name, attempt_id))
+        if not verified_name:
+            result = BULK_STATUS_NOT_FOUND
+        elif verified_name.id in transition_ids:
+            result = BULK_STATUS_UPDATED
+        else:
+            result = BULK_STATUS_UNCHANGED
+        results.append({
+            field_name: attempt_id,
+            'verified_name_id': verified_name.id if verified_name else None,
+            'result': result,
+        })
+    return results
+
+
+def _filter_status_transitions(verified_name_qs, status, enforce_lifecycle):
+    """
+    Filter VerifiedNames down to those whose status would change if set to the given status, and with
+    `enforce_lifecycle`, whose status is earlier in the pending -> submitted -> approved/denied lifecycle.
+    """
+    verified_name_qs = verified_name_qs.exclude(status=status)
+    if enforce_lifecycle:
+        lifecycle_position = VerifiedNameStatus.get_lifecycle_position(status)
+        verified_name_qs = verified_name_qs.filter(status__in=[
+            previous_status for previous_status in VerifiedNameStatus
+            if VerifiedNameStatus.get_lifecycle_position(previous_status) < lifecycle_position
+        ])
+    return verified_name_qs
 
 
 def create_verified_name_config(user, use_verified_name_for_certs=None):
@@ -246,8 +533,85 @@ def should_use_verified_name_for_certs(user):
     """
     Returns a boolean describing whether the user has opted to use their verified
     name over their profile name for certificates.
+
+    If the NAME_AFFIRMATION_USE_CURRENT_VERIFIED_NAME setting is True, this is read from
+    the user's CurrentVerifiedName row.
     Arguments:
         * `user` (User object)
     """
+    if _use_current_verified_name():
+        use_verified_name_for_certs = CurrentVerifiedName.objects.filter(user_id=user.id).values_list(
+            'use_verified_name_for_certs', flat=True,
+        ).first()
+        if use_verified_name_for_certs is not None:
+            return use_verified_name_for_certs
+
     config_obj = VerifiedNameConfig.current(user)
     return config_obj.use_verified_name_for_certs
+
+
+def should_use_verified_name_for_certs_for_users(user_ids):
+    """
+    Bulk version of `should_use_verified_name_for_certs`.
+
+    Resolves the current VerifiedNameConfig for every given user with two queries per chunk
+    of users, and primes the per-user `VerifiedNameConfig.current` cache with the result so
+    later single-user calls do not hit the database.
+
+    Arguments:
+        * `user_ids` (iterable of int)
+
+    Returns a dict mapping user ID to a boolean. IDs that do not belong to a user are left out.
+    """
+    user_ids = list(dict.fromkeys(user_ids))
+    latest_config_for_user = VerifiedNameConfig.objects.filter(
+        user_id=OuterRef('user_id'),
+    ).order_by('-change_date', '-id').values('id')[:1]
+
+    use_verified_name_for_certs = {}
+    for start in range(0, len(user_ids), BULK_LOOKUP_CHUNK_SIZE):
+        chunk = user_ids[start:start + BULK_LOOKUP_CHUNK_SIZE]
+        users = get_user_model().objects.in_bulk(chunk)
+        configs = {
+            config.user_id: config
+            for config in VerifiedNameConfig.objects.filter(user_id__in=chunk, id=Subquery(latest_config_for_user))
+        }
+
+        for user_id, user in users.items():
+            # Mirror `ConfigurationModel.current`, which falls back to an unsaved default entry
+            config_obj = configs.get(user_id) or VerifiedNameConfig(user=user)
+            config_obj.user = user
+            TieredCache.set_all_tiers(
+                VerifiedNameConfig.cache_key_name(user), config_obj, VerifiedNameConfig.cache_timeout,
+            )
+            use_verified_name_for_certs[user_id] = config_obj.use_verified_name_for_certs
+
+    return use_verified_name_for_certs
+
+
+def with_verified_name(user_queryset):
+    """
+    Annotate a User QuerySet with name affirmation data so reports can be built in a single query.
+
+    Each user gets a `verified_name` annotation holding their most recent approved verified name
+    (None if there is none) and a `use_verified_name_for_certs` annotation holding the value from
+    their current VerifiedNameConfig (False if there is none). The result can be streamed with
+    `.iterator()`.
+
+    Arguments:
+        * `user_queryset` (QuerySet of User objects)
+    """
+    latest_approved_name = VerifiedName.objects.filter(
+        user_id=OuterRef('pk'),
+        status=VerifiedNameStatus.APPROVED.value,
+    ).order_by('-created', '-id').values('verified_name')[:1]
+    current_certs_preference = VerifiedNameConfig.objects.filter(
+        user_id=OuterRef('pk'),
+    ).order_by('-change_date', '-id').values('use_verified_name_for_certs')[:1]
+
+    return user_queryset.annotate(
+        verified_name=Subquery(latest_approved_name),
+        use_verified_name_for_certs=Coalesce(
+            Subquery(current_certs_preference), Value(False), output_field=BooleanField(),
+        ),
+    )
@@ -0,0 +1,175 @@
+"""
+Caching helpers for edx_name_affirmation.
+
+Cached `get_verified_name` results are stored under a per-user version key. Invalidating a user
+replaces that version, which orphans every cached variant of their lookups at once and works
+across processes without having to know which variants were cached.
+
+The cache also numbers and records the IDV events of each attempt, so that bursts of events for
+the same attempt can be coalesced into a single update.
+"""
+
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import cache
+
+from edx_name_affirmation.statuses import VerifiedNameStatus
+
+VERIFIED_NAME_CACHE_ENABLED_SETTING = 'NAME_AFFIRMATION_VERIFIED_NAME_CACHE_ENABLED'
+VERIFIED_NAME_CACHE_TIMEOUT_SETTING = 'NAME_AFFIRMATION_VERIFIED_NAME_CACHE_TIMEOUT'
+DEFAULT_VERIFIED_NAME_CACHE_TIMEOUT = 60 * 60
+IDV_EVENT_COALESCE_SECONDS_SETTING = 'NAME_AFFIRMATION_IDV_EVENT_COALESCE_SECONDS'
+
+# How long the events of an IDV attempt are remembered, so late events stay ordered
+IDV_EVENT_STATE_TIMEOUT = 60 * 60
+
+_CACHE_KEY_PREFIX = 'edx_name_affirmation.verified_name'
+_IDV_EVENT_CACHE_KEY_PREFIX = 'edx_name_affirmation.idv_event'
+
+# Stored in place of None so that users without a matching VerifiedName are cached too
+_NO_VERIFIED_NAME = 'edx_name_affirmation.no_verified_name'
+
+
+def is_verified_name_cache_enabled():
+    """
+    Return whether `get_verified_name` results should be cached.
+    """
+    return getattr(settings, VERIFIED_NAME_CACHE_ENABLED_SETTING, False)
+
+
+def get_verified_name_cache_timeout():
+    """
+    Return the number of seconds a cached `get_verified_name` result is kept.
+    """
+    return getattr(settings, VERIFIED_NAME_CACHE_TIMEOUT_SETTING, DEFAULT_VERIFIED_NAME_CACHE_TIMEOUT)
+
+
+def get_verified_name_cache_key(user_id, is_verified, statuses_to_exclude):
+    """
+    Return the cache key for the given user and `get_verified_name` query variant.
+
+    The key includes the user's current cache version. Callers should build it once, before
+    looking up the result, and pass it to both `get_cached_verified_name` and
+    `set_cached_verified_name`. A result read before an invalidation is then stored under the
+    old version and never served.
+    """
+    if is_verified:
+        variant = 'verified'
+    elif statuses_to_exclude:
+        variant = 'exclude:' + ','.join(sorted(getattr(status, 'value', status) for status in statuses_to_exclude))
+    else:
+        variant = 'any'
+    return f'{_CACHE_KEY_PREFIX}.{user_id}.{_get_cache_version(user_id)}.{variant}'
+
+
+def get_cached_verified_name(cache_key):
+    """
+    Look up the cached `get_verified_name` result stored under the given key.
+
+    Returns a tuple of (is_found, verified_name). A cached "no verified name" result is
+    returned as (True, None).
+    """
+    cached_value = cache.get(cache_key)
+    if cached_value is None:
+        return False, None
+    if cached_value == _NO_VERIFIED_NAME:
+        return True, None
+    return True, cached_value
+
+
+def set_cached_verified_name(cache_key, verified_name):
+    """
+    Cache a `get_verified_name` result under the given key. A result of None is cached as well.
+    """
+    cache.set(
+        cache_key,
+        _NO_VERIFIED_NAME if verified_name is None else verified_name,
+        get_verified_name_cache_timeout(),
+    )
+
+
+def invalidate_verified_name_cache(user_id):
+    """
+    Invalidate every cached `get_verified_name` result for the given user.
+    """
+    cache.set(_version_cache_key(user_id), uuid4().hex, None)
+
+
+def _version_cache_key(user_id):
+    return f'{_CACHE_KEY_PREFIX}.version.{user_id}'
+
+
+def _get_cache_version(user_id):
+    """
+    Return the current cache version for the given user, creating one if needed.
+    """
+    version_key = _version_cache_key(user_id)
+    version = cache.get(version_key)
+    if version is None:
+        # `add` keeps whichever version another process may have stored in the meantime
+        cache.add(version_key, uuid4().hex, None)
+        version = cache.get(version_key)
+    return version
+
+
+def get_idv_event_coalesce_seconds():
+    """
+    Return the number of seconds IDV events for the same attempt are coalesced over. Coalescing
+    is disabled if this is 0.
+    """
+    return getattr(settings, IDV_EVENT_COALESCE_SECONDS_SETTING, 0)
+
+
+def record_idv_event(attempt_id, status):
+    """
+    Record an IDV event with the given VerifiedName status for the attempt.
+
+    Returns the sequence number of the event among the events of the attempt, which identifies it
+    to `claim_idv_event`. The number is taken with a single atomic `incr` on a counter for the
+    attempt, so recording an event never waits for other events of the attempt.
+    """
+    timeout = get_idv_event_coalesce_seconds() + IDV_EVENT_STATE_TIMEOUT
+    sequence_key = _idv_event_cache_key(attempt_id)
+    try:
+        sequence = cache.incr(sequence_key)
+    except ValueError:
+        # This is the first event of the attempt, unless another process just started the counter
+        sequence = 1 if cache.add(sequence_key, 1, timeout) else cache.incr(sequence_key)
+    cache.set(f'{sequence_key}.{sequence}', status, timeout)
+    return sequence
+
+
+def claim_idv_event(attempt_id, sequence, status):
+    """
+    Claim the IDV event with the given sequence number and status so that it can be applied.
+
+    Returns a tuple of (should_apply, num_coalesced). `should_apply` is False if another event of
+    the attempt supersedes this one: a later event that is at least as far along the status
+    lifecycle, or an earlier event that is further along it. `num_coalesced` is the number of other
+    events for the attempt that are covered by applying this one.
+    """
+    sequence_key = _idv_event_cache_key(attempt_id)
+    last_sequence = cache.get(sequence_key)
+    if last_sequence is None:
+        # The state was evicted, so there is nothing to compare against
+        return True, 0
+
+    position = VerifiedNameStatus.get_lifecycle_position(status)
+    other_statuses = cache.get_many([f'{sequence_key}.{other}' for other in range(1, last_sequence + 1)])
+    for other in range(1, last_sequence + 1):
+        other_status = other_statuses.get(f'{sequence_key}.{other}')
+        if other == sequence or other_status is None:
+            continue
+        other_position = VerifiedNameStatus.get_lifecycle_position(other_status)
+        if other_position > position or (other > sequence and other_position == position):
+            return False, 0
+
+    claimed_key = f'{sequence_key}.claimed'
+    num_coalesced = max(last_sequence - cache.get(claimed_key, 0) - 1, 0)
+    cache.set(claimed_key, last_sequence, IDV_EVENT_STATE_TIMEOUT)
+    return True, num_coalesced
+
+
+def _idv_event_cache_key(attempt_id):
+    return f'{_IDV_EVENT_CACHE_KEY_PREFIX}.{attempt_id}'
@@ -3,6 +3,10 @@ Name Affirmation signal handlers
 """
 
 import logging
+import threading
+import weakref
+from itertools import groupby
+from operator import attrgetter
 
 from openedx_events.learning.signals import (
     IDV_ATTEMPT_APPROVED,
@@ -11,35 +15,256 @@ from openedx_events.learning.signals import (
     IDV_ATTEMPT_PENDING
 )
 
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.db.models.signals import post_save
+from django.db import transaction
+from django.db.models import QuerySet
+from django.db.models.signals import post_delete, post_save
 from django.dispatch.dispatcher import receiver
 
-from edx_name_affirmation.models import VerifiedName
-from edx_name_affirmation.signals import VERIFIED_NAME_APPROVED
+from edx_name_affirmation.cache import (
+    get_idv_event_coalesce_seconds,
+    invalidate_verified_name_cache,
+    record_idv_event
+)
+from edx_name_affirmation.models import CurrentVerifiedName, TaskOutboxEntry, VerifiedName, VerifiedNameConfig
+from edx_name_affirmation.signals import send_verified_name_approved
 from edx_name_affirmation.statuses import VerifiedNameStatus
 from edx_name_affirmation.tasks import (
-    delete_verified_name_task,
+    delete_verified_names_task,
     idv_update_verified_name_task,
-    proctoring_update_verified_name_task
+    idv_update_verified_names_task,
+    proctoring_update_verified_name_task,
+    proctoring_update_verified_names_task
 )
 
 User = get_user_model()
 
 log = logging.getLogger(__name__)
 
+# Values of the IDV and proctoring event dispatch settings
+EVENT_DISPATCH_PER_EVENT = 'per_event'
+EVENT_DISPATCH_BATCHED = 'batched'
+
+IDV_EVENT_DISPATCH_SETTING = 'NAME_AFFIRMATION_IDV_EVENT_DISPATCH'
+IDV_EVENT_BATCH_SIZE_SETTING = 'NAME_AFFIRMATION_IDV_EVENT_BATCH_SIZE'
+DEFAULT_IDV_EVENT_BATCH_SIZE = 500
+TASK_OUTBOX_ENABLED_SETTING = 'NAME_AFFIRMATION_TASK_OUTBOX_ENABLED'
+DEFAULT_TASK_OUTBOX_RELAY_BATCH_SIZE = 100
+PROCTORING_EVENT_DISPATCH_SETTING = 'NAME_AFFIRMATION_PROCTORING_EVENT_DISPATCH'
+PROCTORING_EVENT_BATCH_SIZE_SETTING = 'NAME_AFFIRMATION_PROCTORING_EVENT_BATCH_SIZE'
+DEFAULT_PROCTORING_EVENT_BATCH_SIZE = 500
+DELETE_BATCH_SIZE_SETTING = 'NAME_AFFIRMATION_DELETE_BATCH_SIZE'
+DEFAULT_DELETE_BATCH_SIZE = 1000
+
+
+# The pending on_commit batches of this thread, by database alias, savepoint and dispatch function. The only
+# strong reference to a batch is its on_commit callback, so Django drops the batch along with the callback
+# when its transaction or savepoint is rolled back.
+_on_commit_batches = threading.local()
+
+
+def _get_on_commit_batches():
+    if not hasattr(_on_commit_batches, 'batches'):
+        _on_commit_batches.batches = weakref.WeakValueDictionary()
+    return _on_commit_batches.batches
+
+
+class _OnCommitBatch:
+    """
+    Passes the items that were added at one level of a transaction to `dispatch` once it commits.
+    """
+    def __init__(self, key, dispatch):
+        self.key = key
+        self.dispatch = dispatch
+        self.items = []
+
+    def __call__(self):
+        batches = _get_on_commit_batches()
+        if batches.get(self.key) is self:
+            del batches[self.key]
+        self.dispatch(self.items)
+
+
+def _add_to_on_commit_batch(dispatch, item):
+    """
+    Pass the item to `dispatch` once the current transaction commits, together with the other items
+    added for `dispatch` at the same level of the transaction.
+
+    The items are buffered per savepoint, and each buffer registers a single on_commit callback, so the
+    items of a savepoint that is rolled back are dropped with it. Outside of a transaction, the item is
+    dispatched right away.
+    """
+    connection = transaction.get_connection()
+    if not connection.in_atomic_block:
+        dispatch([item])
+        return
+
+    key = (connection.alias, tuple(connection.savepoint_ids), dispatch)
+    batches = _get_on_commit_batches()
+    batch = batches.get(key)
+    if batch is None:
+        batch = _OnCommitBatch(key, dispatch)
+        batches[key] = batch
+        transaction.on_commit(batch)
+    batch.items.append(item)
+
+
+def _is_idv_event_dispatch_batched():
+    # Batches are built by the task outbox relay, from the events of any number of transactions, so
+    # without the outbox each event is dispatched on its own.
+    return (
+        _is_task_outbox_enabled()
+        and getattr(settings, IDV_EVENT_DISPATCH_SETTING, EVENT_DISPATCH_PER_EVENT) == EVENT_DISPATCH_BATCHED
+    )
+
+
+def _get_idv_event_batch_size():
+    return getattr(settings, IDV_EVENT_BATCH_SIZE_SETTING, DEFAULT_IDV_EVENT_BATCH_SIZE)
+
+
+def _is_proctoring_event_dispatch_batched():
+    # As for IDV events, batches are built by the task outbox relay.
+    return (
+        _is_task_outbox_enabled()
+        and getattr(settings, PROCTORING_EVENT_DISPATCH_SETTING, EVENT_DISPATCH_PER_EVENT) == EVENT_DISPATCH_BATCHED
+    )
+
+
+def _get_proctoring_event_batch_size():
+    return getattr(settings, PROCTORING_EVENT_BATCH_SIZE_SETTING, DEFAULT_PROCTORING_EVENT_BATCH_SIZE)
+
+
+def _get_delete_batch_size():
+    return getattr(settings, DELETE_BATCH_SIZE_SETTING, DEFAULT_DELETE_BATCH_SIZE)
+
+
+def _is_task_outbox_enabled():
+    return getattr(settings, TASK_OUTBOX_ENABLED_SETTING, False)
+
+
+def _add_to_task_outbox(dispatcher, payload, user_id=None):
+    """
+    Record a task dispatch in the outbox, in the current transaction. The relay later passes the
+    payload to the dispatcher registered under the given name in `_OUTBOX_DISPATCHERS`.
+
+    `user_id` is the user whose names are in the payload, if any.
+    """
+    TaskOutboxEntry.objects.create(dispatcher=dispatcher, payload=payload, user_id=user_id)
+
+
+def relay_task_outbox(batch_size=DEFAULT_TASK_OUTBOX_RELAY_BATCH_SIZE):
+    """
+    Publish the oldest task outbox entries to Celery and delete them. Returns the number of entries relayed.
+
+    Entries are locked while they are published, so concurrent relays skip them. If publishing fails, the
+    whole batch stays in the outbox and is retried, so a task may be published more than once.
+    """
+    with transaction.atomic():
+        entries = list(TaskOutboxEntry.objects.select_for_update(skip_locked=True).order_by('id')[:batch_size])
+        for dispatcher, dispatcher_entries in groupby(entries, key=attrgetter('dispatcher')):
+            payloads = [entry.payload for entry in dispatcher_entries]
+            if dispatcher not in _OUTBOX_DISPATCHERS:
+                log.error(f'Dropping {len(payloads)} task outbox entries with unknown dispatcher {dispatcher}')
+                continue
+            _OUTBOX_DISPATCHERS[dispatcher](payloads)
+        TaskOutboxEntry.objects.filter(id__in=[entry.id for entry in entries]).delete()
+    return len(entries)
+
+
+def _dispatch_idv_updates(idv_updates):
+    for idv_update in idv_updates:
+        _dispatch_idv_update(idv_update)
+
+
+def _dispatch_idv_update_batch(idv_updates):
+    batch_size = _get_idv_event_batch_size()
+    for i in range(0, len(idv_updates), batch_size):
+        batch = idv_updates[i:i + batch_size]
+        log.info(f'Triggering Celery task for {len(batch)} IDV attempt updates')
+        idv_update_verified_names_task.delay(batch)
+
+
+def _dispatch_proctoring_updates(proctoring_updates):
+    for proctoring_update in proctoring_updates:
+        proctoring_update_verified_name_task.delay(*proctoring_update)
+
+
+def _dispatch_proctoring_update_batch(proctoring_updates):
+    batch_size = _get_proctoring_event_batch_size()
+    for i in range(0, len(proctoring_updates), batch_size):
+        batch = proctoring_updates[i:i + batch_size]
+        log.info(f'Triggering Celery task for {len(batch)} proctoring attempt updates')
+        proctoring_update_verified_names_task.delay(batch)
+
+
+def _dispatch_verified_name_deletes(attempt_ids):
+    batch_size = _get_delete_batch_size()
+    for i in range(0, len(attempt_ids), batch_size):
+        batch = attempt_ids[i:i + batch_size]
+        log.info(f'Triggering Celery task to delete the VerifiedNames of {len(batch)} deleted attempts')
+        delete_verified_names_task.delay(
+            platform_verification_attempt_ids=[
+                platform_verification_attempt_id for platform_verification_attempt_id, _ in batch
+                if platform_verification_attempt_id is not None
+            ],
+            proctoring_attempt_ids=[
+                proctoring_attempt_id for _, proctoring_attempt_id in batch if proctoring_attempt_id is not None
+            ],
+        )
+
+
+def _add_verified_name_delete(attempt_ids):
+    """
+    Delete the VerifiedNames of a deleted attempt once the transaction commits. The deletes of all
+    attempts deleted in the transaction are sent together, in tasks of up to the delete batch size.
+    """
+    if _is_task_outbox_enabled():
+        _add_to_task_outbox('delete_verified_name', attempt_ids)
+    else:
+        _add_to_on_commit_batch(_dispatch_verified_name_deletes, attempt_ids)
+
 
 @receiver(post_save, sender=VerifiedName)
 def verified_name_approved(sender, instance, **kwargs):  # pylint: disable=unused-argument
     """
     Emit a signal when a verified name's status is updated to "approved".
+
+    The signal is only sent when a verified name is created as approved or its status changes
+    to approved, not when an already approved verified name is saved again.
     """
-    if instance.status == VerifiedNameStatus.APPROVED:
-        VERIFIED_NAME_APPROVED.send(
-          sender='name_affirmation',
-          user_id=instance.user.id,
-          profile_name=instance.profile_name
-        )
+    if instance.status == VerifiedNameStatus.APPROVED and instance.tracker.has_changed('status'):
+        send_verified_name_approved(instance.user_id, instance.profile_name)
+
+
+@receiver(post_save, sender=VerifiedName)
+@receiver(post_delete, sender=VerifiedName)
+def invalidate_verified_name(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """
+    Invalidate cached verified name lookups for the user whenever one of their VerifiedNames changes.
+    """
+    user_id = instance.user_id
+    invalidate_verified_name_cache(user_id)
+    # Invalidate again once the change is visible to other processes, so a concurrent read
+    # cannot re-cache the pre-commit state.
+    transaction.on_commit(lambda: invalidate_verified_name_cache(user_id))
+
+
+@receiver(post_save, sender=VerifiedName)
+@receiver(post_delete, sender=VerifiedName)
+@receiver(post_save, sender=VerifiedNameConfig)
+@receiver(post_delete, sender=VerifiedNameConfig)
+def refresh_current_verified_name(sender, instance, origin=None, **kwargs):  # pylint: disable=unused-argument
+    """
+    Keep the user's CurrentVerifiedName in sync, in the same transaction as the change, if the
+    read model is maintained.
+    """
+    if not CurrentVerifiedName.is_maintained():
+        return
+    # When the user is being deleted, their CurrentVerifiedName is deleted along with them
+    if isinstance(origin, User) or (isinstance(origin, QuerySet) and origin.model is User):
+        return
+    CurrentVerifiedName.refresh_for_users([instance.user_id])
 
 
 @receiver(IDV_ATTEMPT_APPROVED)
@@ -51,13 +276,7 @@ def handle_idv_event(sender, signal, **kwargs):  # pylint: disable=unused-argume
     Trigger update to verified names based on open edX IDV events.
     """
     event_data = kwargs.get('idv_attempt')
-    user = User.objects.get(id=event_data.user.id)
-
-    # If the user has a pending name change, use that as the full name
-    try:
-        user_full_name = user.pending_name_change
-    except AttributeError:
-        user_full_name = event_data.user.pii.name
+    user_id = event_data.user.id
 
     status = None
     if signal == IDV_ATTEMPT_APPROVED:
@@ -72,16 +291,46 @@ def handle_idv_event(sender, signal, **kwargs):  # pylint: disable=unused-argume
         log.info(f'IDV_ATTEMPT {signal} signal not recognized')  # driven by receiver decorator so should never happen
         return
 
-    log.info(f'IDV_ATTEMPT {status} signal triggering Celery task for user {user.id} '
-             f'with name {event_data.name}')
-    idv_update_verified_name_task.delay(
-        event_data.attempt_id,
-        user.id,
-        status,
-        event_data.name,
-        user_full_name,
+    # Everything here comes from the event, so that the sender does not pay for any queries. The task
+    # checks for a pending name change if it needs to create a VerifiedName.
+    idv_update = (
+        event_data.attempt_id, user_id, status, event_data.name, event_data.user.pii.name, event_data.status,
     )
 
+    if _is_idv_event_dispatch_batched():
+        log.info(f'IDV_ATTEMPT {status} signal queueing update for user {user_id} '
+                 f'with name {event_data.name} for a batched Celery task')
+        _add_to_task_outbox('idv_update_batch', idv_update, user_id=user_id)
+        return
+
+    if _is_task_outbox_enabled():
+        _add_to_task_outbox('idv_update', idv_update, user_id=user_id)
+    else:
+        transaction.on_commit(lambda: _dispatch_idv_update(idv_update))
+
+
+def _dispatch_idv_update(idv_update):
+    """
+    Trigger the Celery task for an IDV event, coalescing it with other events for the attempt if enabled.
+    """
+    attempt_id, user_id, status, photo_id_name, full_name, attempt_status = idv_update
+    task_args = (attempt_id, user_id, status, photo_id_name, full_name)
+    task_kwargs = {'attempt_status': attempt_status}
+
+    coalesce_seconds = get_idv_event_coalesce_seconds()
+    if coalesce_seconds:
+        coalesce_token = record_idv_event(attempt_id, status)
+        log.info(f'IDV_ATTEMPT {status} signal triggering Celery task for user {user_id} '
+                 f'with name {photo_id_name} in {coalesce_seconds} seconds')
+        idv_update_verified_name_task.apply_async(
+            task_args, dict(task_kwargs, coalesce_token=coalesce_token), countdown=coalesce_seconds,
+        )
+        return
+
+    log.info(f'IDV_ATTEMPT {status} signal triggering Celery task for user {user_id} '
+             f'with name {photo_id_name}')
+    idv_update_verified_name_task.delay(*task_args, **task_kwargs)
+
 
 def platform_verification_delete_handler(sender, instance, signal, **kwargs):  # pylint: disable=unused-argument
     """
@@ -89,13 +338,13 @@ def platform_verification_delete_handler(sender, instance, signal, **kwargs):  #
     """
     platform_verification_attempt_id = instance.id
     log.info(
-        'VerifiedName: platform_verification_delete_handler triggering Celery task for '
+        'VerifiedName: platform_verification_delete_handler queueing VerifiedName delete for '
         'platform_verification_attempt_id=%(platform_verification_attempt_id)s',
         {
             'platform_verification_attempt_id': platform_verification_attempt_id,
         }
     )
-    delete_verified_name_task.delay(platform_verification_attempt_id, None)
+    _add_verified_name_delete((platform_verification_attempt_id, None))
 
 
 def proctoring_attempt_handler(
@@ -135,13 +384,15 @@ def proctoring_attempt_handler(
 
     # only trigger celery task if status is relevant to name affirmation
     if trigger_status:
-        proctoring_update_verified_name_task.delay(
-            attempt_id,
-            user_id,
-            trigger_status,
-            full_name,
-            profile_name,
-        )
+        proctoring_update = (attempt_id, user_id, trigger_status, full_name, profile_name)
+        if _is_proctoring_event_dispatch_batched():
+            log.info('VerifiedName: proctoring_attempt_handler queueing update for user %(user_id)s '
+                     'for a batched Celery task', {'user_id': user_id})
+            _add_to_task_outbox('proctoring_update_batch', proctoring_update, user_id=user_id)
+        elif _is_task_outbox_enabled():
+            _add_to_task_outbox('proctoring_update', proctoring_update, user_id=user_id)
+        else:
+            transaction.on_commit(lambda: proctoring_update_verified_name_task.delay(*proctoring_update))
     else:
         log.info('VerifiedName: proctoring_attempt_handler will not trigger Celery task for user %(user_id)s '
                  'with profile_name %(profile_name)s because of status %(status)s',
@@ -162,10 +413,20 @@ def proctoring_delete_handler(sender, instance, signal, **kwargs):  # pylint: di
     """
     proctoring_attempt_id = instance.id
     log.info(
-        'VerifiedName: proctoring_delete_handler triggering Celery task for '
+        'VerifiedName: proctoring_delete_handler queueing VerifiedName delete for '
         'proctoring_attempt_id=%(proctoring_attempt_id)s',
         {
             'proctoring_attempt_id': proctoring_attempt_id,
         }
     )
-    delete_verified_name_task.delay(None, proctoring_attempt_id)
+    _add_verified_name_delete((None, proctoring_attempt_id))
+
+
+# Dispatchers for task outbox entries, by the name stored on the entry. Each is passed a list of payloads.
+_OUTBOX_DISPATCHERS = {
+    'idv_update': _dispatch_idv_updates,
+    'idv_update_batch': _dispatch_idv_update_batch,
+    'proctoring_update': _dispatch_proctoring_updates,
+    'proctoring_update_batch': _dispatch_proctoring_update_batch,
+    'delete_verified_name': _dispatch_verified_name_deletes,
+}
@@ -0,0 +1,82 @@
+"""
+Management command to backfill the attempt status snapshot on VerifiedNames.
+"""
+
+import logging
+import time
+
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from edx_name_affirmation.models import FINAL_PLATFORM_ATTEMPT_STATUSES, PlatformVerificationAttempt, VerifiedName
+
+log = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    """
+    Copy the status of each linked platform verification attempt onto the `attempt_status`
+    field of VerifiedNames that do not have a final status snapshot yet. VerifiedNames linked
+    to a SoftwareSecurePhotoVerification are skipped, as their status is always looked up.
+
+    Example usage:
+        $ ./manage.py lms backfill_verified_name_attempt_status --batch-size 1000 --sleep-seconds 1
+    """
+    help = 'Backfill the attempt status snapshot on VerifiedNames linked to a platform verification attempt'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of VerifiedNames to update per batch',
+        )
+        parser.add_argument(
+            '--sleep-seconds',
+            type=float,
+            default=0,
+            help='Number of seconds to sleep between batches',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        sleep_seconds = options['sleep_seconds']
+
+        verified_name_qs = VerifiedName.objects.filter(
+            Q(attempt_status__isnull=True) | ~Q(attempt_status__in=FINAL_PLATFORM_ATTEMPT_STATUSES),
+            platform_verification_attempt_id__isnull=False,
+        ).only('id', 'platform_verification_attempt_id', 'attempt_status').order_by('id')
+
+        last_id = 0
+        total_updated = 0
+        while True:
+            batch = list(verified_name_qs.filter(id__gt=last_id)[:batch_size])
+            if not batch:
+                break
+            last_id = batch[-1].id
+
+            platform_verification_statuses = VerifiedName.get_attempt_statuses(
+                PlatformVerificationAttempt,
+                {verified_name.platform_verification_attempt_id for verified_name in batch},
+            )
+
+            verified_names_to_update = []
+            for verified_name in batch:
+                attempt_status = platform_verification_statuses.get(verified_name.platform_verification_attempt_id)
+                if attempt_status and attempt_status != verified_name.attempt_status:
+                    verified_name.attempt_status = attempt_status
+                    verified_names_to_update.append(verified_name)
+
+            VerifiedName.objects.bulk_update(verified_names_to_update, ['attempt_status'])
+            total_updated += len(verified_names_to_update)
+            log.info(
+                'Backfilled attempt_status for %(num_updated)s VerifiedNames up to id=%(last_id)s',
+                {'num_updated': len(verified_names_to_update), 'last_id': last_id},
+            )
+
+            if sleep_seconds:
+                time.sleep(sleep_seconds)
+
+        log.info('Finished backfilling attempt_status for %(total_updated)s VerifiedNames', {
+            'total_updated': total_updated,
+        })
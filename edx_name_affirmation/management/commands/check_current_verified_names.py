@@ -0,0 +1,60 @@
+"""
+Management command to check the CurrentVerifiedName read model for consistency.
+"""
+
+import logging
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from edx_name_affirmation.models import CurrentVerifiedName
+
+log = logging.getLogger(__name__)
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    """
+    Compare the CurrentVerifiedName row of every user with the value recomputed from VerifiedName
+    and VerifiedNameConfig, and report the users whose rows are missing or out of date.
+
+    Example usage:
+        $ ./manage.py lms check_current_verified_names --batch-size 1000
+    """
+    help = 'Check that the CurrentVerifiedName read model matches VerifiedName and VerifiedNameConfig'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of users to check per batch',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+
+        last_user_id = 0
+        stale_user_ids = []
+        while True:
+            user_ids = list(
+                User.objects.filter(pk__gt=last_user_id).order_by('pk').values_list('pk', flat=True)[:batch_size]
+            )
+            if not user_ids:
+                break
+            last_user_id = user_ids[-1]
+
+            stale_user_ids.extend(row.user_id for row in CurrentVerifiedName.get_stale_rows(user_ids))
+
+        if stale_user_ids:
+            log.warning(
+                'Found %(num_stale)s out of date CurrentVerifiedNames for user_ids=%(user_ids)s',
+                {'num_stale': len(stale_user_ids), 'user_ids': stale_user_ids},
+            )
+            raise CommandError(
+                f'{len(stale_user_ids)} CurrentVerifiedNames are out of date. '
+                'Run rebuild_current_verified_names to repair them.'
+            )
+
+        log.info('All CurrentVerifiedNames are up to date')
@@ -0,0 +1,67 @@
+"""
+Management command to rebuild the CurrentVerifiedName read model.
+"""
+
+import logging
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from edx_name_affirmation.models import CurrentVerifiedName
+
+log = logging.getLogger(__name__)
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    """
+    Recompute the CurrentVerifiedName row of every user from VerifiedName and VerifiedNameConfig,
+    writing only the rows that are missing or out of date.
+
+    Example usage:
+        $ ./manage.py lms rebuild_current_verified_names --batch-size 1000 --sleep-seconds 1
+    """
+    help = 'Rebuild the CurrentVerifiedName read model from VerifiedName and VerifiedNameConfig'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of users to rebuild per batch',
+        )
+        parser.add_argument(
+            '--sleep-seconds',
+            type=float,
+            default=0,
+            help='Number of seconds to sleep between batches',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        sleep_seconds = options['sleep_seconds']
+
+        last_user_id = 0
+        total_updated = 0
+        while True:
+            user_ids = list(
+                User.objects.filter(pk__gt=last_user_id).order_by('pk').values_list('pk', flat=True)[:batch_size]
+            )
+            if not user_ids:
+                break
+            last_user_id = user_ids[-1]
+
+            stale_rows = CurrentVerifiedName.get_stale_rows(user_ids)
+            CurrentVerifiedName.save_rows(stale_rows)
+            total_updated += len(stale_rows)
+            log.info(
+                'Rebuilt %(num_updated)s CurrentVerifiedNames for users up to id=%(last_user_id)s',
+                {'num_updated': len(stale_rows), 'last_user_id': last_user_id},
+            )
+
+            if sleep_seconds:
+                time.sleep(sleep_seconds)
+
+        log.info('Finished rebuilding %(total_updated)s CurrentVerifiedNames', {'total_updated': total_updated})
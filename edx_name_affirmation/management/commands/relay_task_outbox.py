@@ -0,0 +1,54 @@
+"""
+Management command to publish task outbox entries to Celery.
+"""
+
+import logging
+import time
+
+from django.core.management.base import BaseCommand
+
+from edx_name_affirmation.handlers import DEFAULT_TASK_OUTBOX_RELAY_BATCH_SIZE, relay_task_outbox
+
+log = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    """
+    Publish the Celery tasks recorded in the task outbox by the signal handlers, oldest first,
+    until the outbox is empty. With `--poll-seconds`, keep polling the outbox instead of exiting.
+
+    Example usage:
+        $ ./manage.py lms relay_task_outbox --batch-size 100 --poll-seconds 1
+    """
+    help = 'Publish the Celery tasks recorded in the name affirmation task outbox'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=DEFAULT_TASK_OUTBOX_RELAY_BATCH_SIZE,
+            help='Number of outbox entries to publish per batch',
+        )
+        parser.add_argument(
+            '--poll-seconds',
+            type=float,
+            default=0,
+            help='If set, keep running and check for new outbox entries this often once the outbox is empty',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        poll_seconds = options['poll_seconds']
+
+        total_relayed = 0
+        while True:
+            num_relayed = relay_task_outbox(batch_size)
+            total_relayed += num_relayed
+            if num_relayed:
+                log.info('Relayed %(num_relayed)s task outbox entries', {'num_relayed': num_relayed})
+                continue
+            if not poll_seconds:
+                break
+            time.sleep(poll_seconds)
+
+        log.info('Finished relaying %(total_relayed)s task outbox entries', {'total_relayed': total_relayed})
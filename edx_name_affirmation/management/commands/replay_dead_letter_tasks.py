@@ -0,0 +1,125 @@
+"""
+Management command to replay name affirmation tasks that failed for good.
+"""
+
+import logging
+import time
+
+from celery import current_app
+
+from django.core.management.base import BaseCommand
+from django.db.models import Max
+
+# Import the tasks so that they are registered with the Celery app
+from edx_name_affirmation import tasks  # pylint: disable=unused-import
+from edx_name_affirmation.models import DeadLetterTask
+
+log = logging.getLogger(__name__)
+
+
+class RateLimiter:
+    """
+    Spaces out calls to `wait` so that at most `max_per_second` calls return per second.
+    """
+    def __init__(self, max_per_second):
+        self.interval = 1 / max_per_second if max_per_second else 0
+        self.next_time = time.monotonic()
+
+    def wait(self):
+        if not self.interval:
+            return
+        now = time.monotonic()
+        if self.next_time > now:
+            time.sleep(self.next_time - now)
+        self.next_time = max(now, self.next_time) + self.interval
+
+
+class Command(BaseCommand):
+    """
+    Publish the tasks stored as DeadLetterTasks to Celery again, oldest first, and delete their dead letters.
+
+    The tasks run on the Celery workers, in parallel and with the usual retries and backoff. A task that
+    fails for good again is stored as a new dead letter. If publishing fails part of the way through a
+    batch, the published tasks of the batch are published again by the next run.
+
+    Example usage:
+        $ ./manage.py lms replay_dead_letter_tasks --batch-size 100 --max-per-second 20
+        $ ./manage.py lms replay_dead_letter_tasks --dry-run
+    """
+    help = 'Publish name affirmation Celery tasks that failed for good again'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=100,
+            help='Number of dead letters to replay per batch',
+        )
+        parser.add_argument(
+            '--max-per-second',
+            type=float,
+            default=0,
+            help='Maximum number of tasks to publish per second. Unlimited by default',
+        )
+        parser.add_argument(
+            '--task-name',
+            help='Only replay dead letters of the task with this name',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Log the dead letters that would be replayed without replaying them',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        rate_limiter = RateLimiter(options['max_per_second'])
+        dry_run = options['dry_run']
+
+        dead_letter_qs = DeadLetterTask.objects.order_by('id')
+        if options['task_name']:
+            dead_letter_qs = dead_letter_qs.filter(task_name=options['task_name'])
+
+        # Tasks that fail again are stored as new dead letters, which are left for a later run
+        max_id = DeadLetterTask.objects.aggregate(Max('id'))['id__max'] or 0
+        dead_letter_qs = dead_letter_qs.filter(id__lte=max_id)
+
+        last_id = 0
+        num_replayed = 0
+        while True:
+            batch = list(dead_letter_qs.filter(id__gt=last_id)[:batch_size])
+            if not batch:
+                break
+            last_id = batch[-1].id
+
+            dead_letters = []
+            for dead_letter in batch:
+                if dead_letter.task_name not in current_app.tasks:
+                    log.error('Skipping dead letter id=%(id)s for unknown task %(task_name)s', {
+                        'id': dead_letter.id, 'task_name': dead_letter.task_name,
+                    })
+                else:
+                    dead_letters.append(dead_letter)
+
+            if dry_run:
+                for dead_letter in dead_letters:
+                    log.info('Would replay dead letter id=%(id)s for task %(task_name)s with args=%(args)s', {
+                        'id': dead_letter.id, 'task_name': dead_letter.task_name, 'args': dead_letter.args,
+                    })
+                num_replayed += len(dead_letters)
+                continue
+
+            for dead_letter in dead_letters:
+                rate_limiter.wait()
+                current_app.tasks[dead_letter.task_name].apply_async(args=dead_letter.args, kwargs=dead_letter.kwargs)
+
+            DeadLetterTask.objects.filter(id__in=[dead_letter.id for dead_letter in dead_letters]).delete()
+            num_replayed += len(dead_letters)
+            log.info('Published %(num_tasks)s dead letter tasks up to id=%(last_id)s', {
+                'num_tasks': len(dead_letters), 'last_id': last_id,
+            })
+
+        if dry_run:
+            log.info('Found %(num_replayed)s dead letter tasks to replay', {'num_replayed': num_replayed})
+        else:
+            log.info('Published %(num_replayed)s dead letter tasks', {'num_replayed': num_replayed})
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.30 on 2026-10-17 23:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('edx_name_affirmation', '0010_alter_historicalverifiedname_options'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='verifiedname',
+            index=models.Index(fields=['user', '-created', '-id'], name='nameaff_vn_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='verifiedname',
+            index=models.Index(fields=['user', 'status', '-created', '-id'], name='nameaff_vn_user_status_idx'),
+        ),
+    ]
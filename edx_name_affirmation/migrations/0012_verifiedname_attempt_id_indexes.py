@@ -0,0 +1,27 @@
+# Generated by Django 4.2.30 on 2026-10-17 23:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('edx_name_affirmation', '0011_verifiedname_user_created_indexes'),
+    ]
+
+    # Plain secondary indexes: InnoDB builds these in place without locking writes, so the
+    # migration is safe to run against a live table.
+    operations = [
+        migrations.AddIndex(
+            model_name='verifiedname',
+            index=models.Index(fields=['verification_attempt_id'], name='nameaff_vn_verif_attempt_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='verifiedname',
+            index=models.Index(fields=['proctored_exam_attempt_id'], name='nameaff_vn_proctor_attempt_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='verifiedname',
+            index=models.Index(fields=['platform_verification_attempt_id'], name='nameaff_vn_pverif_attempt_idx'),
+        ),
+    ]
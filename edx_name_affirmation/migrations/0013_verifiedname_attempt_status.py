@@ -0,0 +1,23 @@
+# Generated by Django 4.2.30 on 2026-10-17 23:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('edx_name_affirmation', '0012_verifiedname_attempt_id_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='historicalverifiedname',
+            name='attempt_status',
+            field=models.CharField(blank=True, max_length=32, null=True),
+        ),
+        migrations.AddField(
+            model_name='verifiedname',
+            name='attempt_status',
+            field=models.CharField(blank=True, max_length=32, null=True),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.30 on 2026-10-17 23:32
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('edx_name_affirmation', '0013_verifiedname_attempt_status'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CurrentVerifiedName',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='current_verified_name', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('use_verified_name_for_certs', models.BooleanField(default=False)),
+                ('approved_verified_name', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='edx_name_affirmation.verifiedname')),
+                ('latest_verified_name', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='edx_name_affirmation.verifiedname')),
+            ],
+            options={
+                'verbose_name': 'current verified name',
+                'db_table': 'nameaffirmation_currentverifiedname',
+            },
+        ),
+    ]
@@ -0,0 +1,92 @@
+# Generated by Django 4.2.30 on 2026-10-17 23:34
+
+import logging
+
+from django.db import migrations, models
+from django.utils import timezone
+
+log = logging.getLogger(__name__)
+
+# Prefix of the history change reason recorded for each unlinked VerifiedName, followed by the attempt ID
+UNLINK_CHANGE_REASON_PREFIX = 'unlink_duplicate_platform_attempt:'
+
+
+def unlink_duplicate_platform_attempts(apps, schema_editor):
+    """
+    Keep only the most recent VerifiedName linked to each platform verification attempt,
+    so that the uniqueness constraint can be added.
+
+    Each unlinked VerifiedName gets a history record whose change reason holds the attempt ID,
+    so that the links can be restored when migrating backwards. Running this again once there
+    are no duplicates does nothing.
+    """
+    VerifiedName = apps.get_model('edx_name_affirmation', 'VerifiedName')
+    HistoricalVerifiedName = apps.get_model('edx_name_affirmation', 'HistoricalVerifiedName')
+    duplicated_attempt_ids = (
+        VerifiedName.objects.filter(platform_verification_attempt_id__isnull=False)
+        .values('platform_verification_attempt_id')
+        .annotate(num_names=models.Count('id'))
+        .filter(num_names__gt=1)
+        .values_list('platform_verification_attempt_id', flat=True)
+    )
+    for attempt_id in list(duplicated_attempt_ids):
+        verified_names = list(
+            VerifiedName.objects.filter(platform_verification_attempt_id=attempt_id).order_by('-created', '-id')
+        )
+        unlinked_names = verified_names[1:]
+        log.warning(
+            'Unlinking VerifiedNames %(unlinked_ids)s from platform_verification_attempt_id=%(attempt_id)s, '
+            'which stays linked to VerifiedName %(kept_id)s',
+            {
+                'unlinked_ids': [verified_name.id for verified_name in unlinked_names],
+                'attempt_id': attempt_id,
+                'kept_id': verified_names[0].id,
+            },
+        )
+        VerifiedName.objects.filter(id__in=[verified_name.id for verified_name in unlinked_names]).update(
+            platform_verification_attempt_id=None,
+        )
+        history_date = timezone.now()
+        for verified_name in unlinked_names:
+            verified_name.platform_verification_attempt_id = None
+        HistoricalVerifiedName.objects.bulk_create([
+            HistoricalVerifiedName(
+                **{
+                    field.attname: getattr(verified_name, field.attname)
+                    for field in VerifiedName._meta.concrete_fields
+                },
+                history_date=history_date,
+                history_type='~',
+                history_change_reason=f'{UNLINK_CHANGE_REASON_PREFIX}{attempt_id}',
+            )
+            for verified_name in unlinked_names
+        ])
+
+
+def relink_duplicate_platform_attempts(apps, schema_editor):
+    """
+    Restore the links removed by `unlink_duplicate_platform_attempts`, from the history records it created,
+    for the VerifiedNames that were not linked to another attempt since.
+    """
+    VerifiedName = apps.get_model('edx_name_affirmation', 'VerifiedName')
+    HistoricalVerifiedName = apps.get_model('edx_name_affirmation', 'HistoricalVerifiedName')
+    unlink_records = HistoricalVerifiedName.objects.filter(
+        history_change_reason__startswith=UNLINK_CHANGE_REASON_PREFIX,
+    )
+    for unlink_record in unlink_records:
+        attempt_id = int(unlink_record.history_change_reason[len(UNLINK_CHANGE_REASON_PREFIX):])
+        VerifiedName.objects.filter(id=unlink_record.id, platform_verification_attempt_id__isnull=True).update(
+            platform_verification_attempt_id=attempt_id,
+        )
+    unlink_records.delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('edx_name_affirmation', '0014_currentverifiedname'),
+    ]
+
+    operations = [
+        migrations.RunPython(unlink_duplicate_platform_attempts, relink_duplicate_platform_attempts),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.30 on 2026-10-17 23:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('edx_name_affirmation', '0015_unlink_duplicate_platform_attempts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskOutboxEntry',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('dispatcher', models.CharField(max_length=64)),
+                ('payload', models.JSONField()),
+                ('user_id', models.PositiveIntegerField(blank=True, db_index=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'task outbox entry',
+                'verbose_name_plural': 'task outbox entries',
+                'db_table': 'nameaffirmation_taskoutboxentry',
+            },
+        ),
+    ]
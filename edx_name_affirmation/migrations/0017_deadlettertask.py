@@ -0,0 +1,30 @@
+# Generated by Django 4.2.30 on 2026-10-17 23:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('edx_name_affirmation', '0016_taskoutboxentry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DeadLetterTask',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('task_id', models.CharField(blank=True, max_length=255, null=True)),
+                ('task_name', models.CharField(max_length=255)),
+                ('user_id', models.PositiveIntegerField(blank=True, db_index=True, null=True)),
+                ('args', models.JSONField(default=list)),
+                ('kwargs', models.JSONField(default=dict)),
+                ('exception', models.TextField(blank=True)),
+            ],
+            options={
+                'verbose_name': 'dead letter task',
+                'db_table': 'nameaffirmation_deadlettertask',
+            },
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.30 on 2026-10-18 12:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('edx_name_affirmation', '0017_deadlettertask'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='verifiedname',
+            constraint=models.UniqueConstraint(fields=('platform_verification_attempt_id',), name='nameaff_vn_unique_pverif_attempt'),
+        ),
+        migrations.RemoveIndex(
+            model_name='verifiedname',
+            name='nameaff_vn_pverif_attempt_idx',
+        ),
+    ]
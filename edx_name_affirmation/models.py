@@ -2,14 +2,21 @@
 Database models for edx_name_affirmation.
 """
 
+import threading
+from contextlib import contextmanager
+
 from config_models.models import ConfigurationModel
+from model_utils import FieldTracker
 from model_utils.models import TimeStampedModel
 from simple_history.models import HistoricalRecords
 
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.exceptions import ObjectDoesNotExist
-from django.db import models
+from django.db import connection, models, transaction
+from django.db.models import OuterRef, Subquery
 
+from edx_name_affirmation.cache import invalidate_verified_name_cache
 from edx_name_affirmation.statuses import VerifiedNameStatus
 
 try:
@@ -21,6 +28,12 @@ except ImportError:
 
 User = get_user_model()
 
+_deferred_refreshes = threading.local()
+
+# Statuses of a platform VerificationAttempt that are never changed once reached. Only a snapshot
+# with one of these statuses is used without looking up the attempt.
+FINAL_PLATFORM_ATTEMPT_STATUSES = ('approved', 'denied')
+
 
 class VerifiedName(TimeStampedModel):
     """
@@ -44,6 +57,10 @@ class VerifiedName(TimeStampedModel):
     # Reference to a generic VerificationAttempt object in the platform
     platform_verification_attempt_id = models.PositiveIntegerField(null=True, blank=True)
 
+    # Snapshot of the last known status of the linked platform verification attempt, so a final
+    # status can be read without querying the platform's tables
+    attempt_status = models.CharField(max_length=32, null=True, blank=True)
+
     status = models.CharField(
         max_length=32,
         choices=[(st.value, st.value) for st in VerifiedNameStatus],
@@ -51,6 +68,9 @@ class VerifiedName(TimeStampedModel):
     )
     history = HistoricalRecords()
 
+    # Tracks status changes, so that signals are only sent when the status actually changes
+    tracker = FieldTracker(fields=['status'])
+
     @classmethod
     def retire_user(cls, user_id):
         """
@@ -58,18 +78,95 @@ class VerifiedName(TimeStampedModel):
         :param user_id: int
         """
         verified_names = cls.objects.filter(user_id=user_id)
-        verified_names.delete()
+        with CurrentVerifiedName.deferred_refresh():
+            verified_names.delete()
+        # pending and failed tasks for the user hold their names as well
+        TaskOutboxEntry.objects.filter(user_id=user_id).delete()
+        DeadLetterTask.objects.filter(user_id=user_id).delete()
+        invalidate_verified_name_cache(user_id)
+
+    @classmethod
+    def prefetch_attempt_statuses(cls, verified_names):
+        """
+        Look up the linked verification attempt statuses for many VerifiedNames at once, with
+        one query per source model, so that reading `verification_attempt_status` and
+        `platform_verification_attempt_status` on them does not query the database.
+        :param verified_names: list of VerifiedName objects
+        """
+        # records with a final attempt status snapshot do not need a lookup
+        verified_names_to_look_up = [
+            verified_name for verified_name in verified_names if not verified_name.has_final_attempt_status
+        ]
+        verification_statuses = cls.get_attempt_statuses(
+            SoftwareSecurePhotoVerification,
+            {verified_name.verification_attempt_id for verified_name in verified_names_to_look_up},
+        )
+        platform_verification_statuses = cls.get_attempt_statuses(
+            PlatformVerificationAttempt,
+            {verified_name.platform_verification_attempt_id for verified_name in verified_names_to_look_up},
+        )
+
+        for verified_name in verified_names:
+            verified_name._prefetched_attempt_statuses = {  # pylint: disable=protected-access
+                'verification_attempt_status': verification_statuses.get(verified_name.verification_attempt_id),
+                'platform_verification_attempt_status': platform_verification_statuses.get(
+                    verified_name.platform_verification_attempt_id
+                ),
+            }
+
+    @classmethod
+    def get_attempt_statuses(cls, attempt_model, attempt_ids):
+        """
+        Return a dict mapping attempt ID to status for the given attempt model, which may be
+        None if the platform's verification models are not available.
+        """
+        attempt_ids = [attempt_id for attempt_id in attempt_ids if attempt_id]
+        if not attempt_ids or not attempt_model:
+            return {}
+
+        attempts = attempt_model.objects.only('status').in_bulk(attempt_ids)
+        return {attempt_id: attempt.status for attempt_id, attempt in attempts.items()}
 
     class Meta:
         """ Meta class for this Django model """
         db_table = 'nameaffirmation_verifiedname'
         verbose_name = 'verified name'
+        indexes = [
+            # Latest-name lookups filter on user (and optionally status) and order by
+            # (-created, -id), so both paths can be answered by walking one of these indexes.
+            models.Index(fields=['user', '-created', '-id'], name='nameaff_vn_user_created_idx'),
+            models.Index(fields=['user', 'status', '-created', '-id'], name='nameaff_vn_user_status_idx'),
+            # Attempt deletions and status updates look rows up by external attempt ID alone.
+            models.Index(fields=['verification_attempt_id'], name='nameaff_vn_verif_attempt_idx'),
+            models.Index(fields=['proctored_exam_attempt_id'], name='nameaff_vn_proctor_attempt_idx'),
+        ]
+        constraints = [
+            # A platform verification attempt is linked to at most one VerifiedName, which lets the
+            # IDV task upsert on the attempt ID. This also indexes the column.
+            models.UniqueConstraint(
+                fields=['platform_verification_attempt_id'], name='nameaff_vn_unique_pverif_attempt',
+            ),
+        ]
+
+    @property
+    def has_final_attempt_status(self):
+        """
+        Returns whether the attempt status snapshot holds a final status of the linked platform
+        verification attempt. Other snapshots may be outdated, so the attempt is looked up instead.
+        """
+        return bool(self.platform_verification_attempt_id) and self.attempt_status in FINAL_PLATFORM_ATTEMPT_STATUSES
 
     @property
     def verification_attempt_status(self):
         "Returns the status associated with its SoftwareSecurePhotoVerification with verification_attempt_id if any."
 
-        if not self.verification_attempt_id or not SoftwareSecurePhotoVerification:
+        if not self.verification_attempt_id:
+            return None
+
+        if hasattr(self, '_prefetched_attempt_statuses'):
+            return self._prefetched_attempt_statuses['verification_attempt_status']
+
+        if not SoftwareSecurePhotoVerification:
             return None
 
         try:
@@ -84,7 +181,16 @@ class VerifiedName(TimeStampedModel):
         """
         Returns the status associated with its platform VerificationAttempt
         """
-        if not self.platform_verification_attempt_id or not PlatformVerificationAttempt:
+        if not self.platform_verification_attempt_id:
+            return None
+
+        if self.has_final_attempt_status:
+            return self.attempt_status
+
+        if hasattr(self, '_prefetched_attempt_statuses'):
+            return self._prefetched_attempt_statuses['platform_verification_attempt_status']
+
+        if not PlatformVerificationAttempt:
             return None
 
         try:
@@ -119,3 +225,201 @@ class VerifiedNameConfig(ConfigurationModel):
         """ Meta class for this Django model """
         db_table = 'nameaffirmation_verifiednameconfig'
         verbose_name = 'verified name config'
+
+
+class CurrentVerifiedName(models.Model):
+    """
+    Read model holding one row per user with their latest VerifiedName, their latest approved
+    VerifiedName and their current `use_verified_name_for_certs` preference, so these can be
+    read with a primary key lookup instead of sorting the user's history.
+
+    Rows are derived from VerifiedName and VerifiedNameConfig. While the read model is maintained,
+    they are refreshed whenever either is saved or deleted.
+
+    .. no_pii: This model has no PII.
+    """
+    user = models.OneToOneField(
+        User, primary_key=True, on_delete=models.CASCADE, related_name='current_verified_name',
+    )
+    latest_verified_name = models.ForeignKey(
+        VerifiedName, null=True, on_delete=models.SET_NULL, related_name='+',
+    )
+    approved_verified_name = models.ForeignKey(
+        VerifiedName, null=True, on_delete=models.SET_NULL, related_name='+',
+    )
+    use_verified_name_for_certs = models.BooleanField(default=False)
+
+    class Meta:
+        """ Meta class for this Django model """
+        db_table = 'nameaffirmation_currentverifiedname'
+        verbose_name = 'current verified name'
+
+    @classmethod
+    def build_for_users(cls, user_ids):
+        """
+        Compute the expected rows for the given users from the source tables in a single query.
+        Returns a list of unsaved CurrentVerifiedName objects, one per existing user.
+        :param user_ids: list of int
+        """
+        user_verified_names = VerifiedName.objects.filter(user_id=OuterRef('pk')).order_by('-created', '-id')
+        current_config = VerifiedNameConfig.objects.filter(user_id=OuterRef('pk')).order_by('-change_date', '-id')
+
+        rows = User.objects.filter(pk__in=user_ids).annotate(
+            current_latest_id=Subquery(user_verified_names.values('id')[:1]),
+            current_approved_id=Subquery(
+                user_verified_names.filter(status=VerifiedNameStatus.APPROVED.value).values('id')[:1]
+            ),
+            current_use_for_certs=Subquery(current_config.values('use_verified_name_for_certs')[:1]),
+        ).values_list('pk', 'current_latest_id', 'current_approved_id', 'current_use_for_certs')
+
+        return [
+            cls(
+                user_id=user_id,
+                latest_verified_name_id=latest_id,
+                approved_verified_name_id=approved_id,
+                use_verified_name_for_certs=bool(use_for_certs),
+            )
+            for user_id, latest_id, approved_id, use_for_certs in rows
+        ]
+
+    @classmethod
+    def is_maintained(cls):
+        """
+        Return whether rows are refreshed when the source tables change. This is enabled by the
+        NAME_AFFIRMATION_MAINTAIN_CURRENT_VERIFIED_NAME setting, and by serving reads from the read
+        model with the NAME_AFFIRMATION_USE_CURRENT_VERIFIED_NAME setting.
+        """
+        return (
+            getattr(settings, 'NAME_AFFIRMATION_MAINTAIN_CURRENT_VERIFIED_NAME', False)
+            or getattr(settings, 'NAME_AFFIRMATION_USE_CURRENT_VERIFIED_NAME', False)
+        )
+
+    @classmethod
+    def refresh_for_users(cls, user_ids):
+        """
+        Recompute and store the rows for the given users, if the read model is maintained.
+        :param user_ids: list of int
+        """
+        if not cls.is_maintained():
+            return
+        deferred_user_ids = getattr(_deferred_refreshes, 'user_ids', None)
+        if deferred_user_ids is not None:
+            deferred_user_ids.update(user_ids)
+            return
+        cls.save_rows(cls.build_for_users(user_ids))
+
+    @classmethod
+    @contextmanager
+    def deferred_refresh(cls):
+        """
+        Defer the refreshes requested within this block to its end, where each user is refreshed once.
+
+        The block runs in a transaction while the read model is maintained, so that the rows are refreshed
+        along with the changes. Nested blocks are part of the outermost one. If the block raises, its
+        refreshes are dropped.
+        """
+        if not cls.is_maintained() or getattr(_deferred_refreshes, 'user_ids', None) is not None:
+            yield
+            return
+
+        with transaction.atomic():
+            user_ids = _deferred_refreshes.user_ids = set()
+            try:
+                yield
+            finally:
+                _deferred_refreshes.user_ids = None
+            if user_ids:
+                cls.save_rows(cls.build_for_users(user_ids))
+
+    @classmethod
+    def get_stale_rows(cls, user_ids):
+        """
+        Return the expected rows for the given users that differ from the stored rows. A missing
+        row only counts as stale if the user has a VerifiedName or opted in to using it on certificates.
+        :param user_ids: list of int
+        """
+        stored_rows = cls.objects.in_bulk(user_ids)
+        stale_rows = []
+        for expected_row in cls.build_for_users(user_ids):
+            stored_row = stored_rows.get(expected_row.user_id)
+            if stored_row is None:
+                if expected_row.latest_verified_name_id or expected_row.use_verified_name_for_certs:
+                    stale_rows.append(expected_row)
+            elif not stored_row.matches(expected_row):
+                stale_rows.append(expected_row)
+        return stale_rows
+
+    @classmethod
+    def save_rows(cls, rows):
+        """
+        Insert or update the given rows with a single statement.
+        :param rows: list of CurrentVerifiedName objects
+        """
+        # MySQL updates on any duplicate key and does not accept the fields to check for conflicts
+        unique_fields = ['user'] if connection.features.supports_update_conflicts_with_target else None
+        with transaction.atomic():
+            cls.objects.bulk_create(
+                rows,
+                update_conflicts=True,
+                unique_fields=unique_fields,
+                update_fields=['latest_verified_name', 'approved_verified_name', 'use_verified_name_for_certs'],
+            )
+
+    def matches(self, other):
+        """
+        Return whether this row holds the same values as another CurrentVerifiedName for the same user.
+        """
+        return (
+            self.user_id == other.user_id
+            and self.latest_verified_name_id == other.latest_verified_name_id
+            and self.approved_verified_name_id == other.approved_verified_name_id
+            and self.use_verified_name_for_certs == other.use_verified_name_for_certs
+        )
+
+
+class TaskOutboxEntry(models.Model):
+    """
+    A Celery task dispatch written in the same transaction as the event that triggered it. The
+    `relay_task_outbox` management command publishes entries to Celery and then deletes them.
+
+    `dispatcher` names the handler function that publishes the entry, and `payload` holds its arguments.
+    `user_id` is the user the payload applies to, if any, so that the entry is deleted when they are retired.
+
+    .. pii: The payload of IDV and proctoring updates contains the verified and profile names.
+    .. pii_types: name
+    .. pii_retirement: local_api
+    """
+    created = models.DateTimeField(auto_now_add=True)
+    dispatcher = models.CharField(max_length=64)
+    payload = models.JSONField()
+    user_id = models.PositiveIntegerField(null=True, blank=True, db_index=True)
+
+    class Meta:
+        """ Meta class for this Django model """
+        db_table = 'nameaffirmation_taskoutboxentry'
+        verbose_name = 'task outbox entry'
+        verbose_name_plural = 'task outbox entries'
+
+
+class DeadLetterTask(models.Model):
+    """
+    A Celery task that failed for good, either because it ran out of retries or because it raised
+    an error that is not retried. The `replay_dead_letter_tasks` management command runs them again.
+    `user_id` is the user the arguments apply to, if any, so that the task is deleted when they are retired.
+
+    .. pii: The arguments of IDV and proctoring updates contain the verified and profile names.
+    .. pii_types: name
+    .. pii_retirement: local_api
+    """
+    created = models.DateTimeField(auto_now_add=True)
+    task_id = models.CharField(max_length=255, null=True, blank=True)
+    task_name = models.CharField(max_length=255)
+    user_id = models.PositiveIntegerField(null=True, blank=True, db_index=True)
+    args = models.JSONField(default=list)
+    kwargs = models.JSONField(default=dict)
+    exception = models.TextField(blank=True)
+
+    class Meta:
+        """ Meta class for this Django model """
+        db_table = 'nameaffirmation_deadlettertask'
+        verbose_name = 'dead letter task'
@@ -5,12 +5,25 @@ import re
 from rest_framework import serializers
 
 from django.contrib.auth import get_user_model
+from django.db import models
 
 from edx_name_affirmation.models import VerifiedName, VerifiedNameConfig
+from edx_name_affirmation.statuses import VerifiedNameStatus
 
 User = get_user_model()
 
 
+class VerifiedNameListSerializer(serializers.ListSerializer):
+    """
+    List serializer for the VerifiedName Model, which looks up the linked attempt statuses
+    for all records at once instead of once per record.
+    """
+    def to_representation(self, data):
+        verified_names = list(data.all() if isinstance(data, models.manager.BaseManager) else data)
+        VerifiedName.prefetch_attempt_statuses(verified_names)
+        return super().to_representation(verified_names)
+
+
 class VerifiedNameSerializer(serializers.ModelSerializer):
     """
     Serializer for the VerifiedName Model.
@@ -30,6 +43,7 @@ class VerifiedNameSerializer(serializers.ModelSerializer):
         Meta Class
         """
         model = VerifiedName
+        list_serializer_class = VerifiedNameListSerializer
 
         fields = (
             "id", "created", "username", "verified_name", "profile_name", "verification_attempt_id",
@@ -68,6 +82,31 @@ class UpdateVerifiedNameSerializer(VerifiedNameSerializer):
     status = serializers.CharField(required=True)
 
 
+class BulkUpdateVerifiedNameStatusSerializer(serializers.Serializer):  # pylint: disable=abstract-method
+    """
+    Serializer for bulk status updates of VerifiedNames, by attempt ID.
+    """
+    MAX_ATTEMPT_IDS = 10000
+
+    status = serializers.ChoiceField(choices=[status.value for status in VerifiedNameStatus], required=True)
+    verification_attempt_ids = serializers.ListField(child=serializers.IntegerField(), required=False)
+    proctored_exam_attempt_ids = serializers.ListField(child=serializers.IntegerField(), required=False)
+    platform_verification_attempt_ids = serializers.ListField(child=serializers.IntegerField(), required=False)
+    enforce_lifecycle = serializers.BooleanField(required=False, default=False)
+
+    def validate(self, attrs):
+        num_attempt_ids = sum(
+            len(attrs.get(field_name, [])) for field_name in (
+                'verification_attempt_ids', 'proctored_exam_attempt_ids', 'platform_verification_attempt_ids',
+            )
+        )
+        if not num_attempt_ids:
+            raise serializers.ValidationError('At least one attempt ID must be given.')
+        if num_attempt_ids > self.MAX_ATTEMPT_IDS:
+            raise serializers.ValidationError(f'At most {self.MAX_ATTEMPT_IDS} attempt IDs can be given.')
+        return attrs
+
+
 class VerifiedNameConfigSerializer(serializers.ModelSerializer):
     """
     Serializer for the VerifiedNameConfig Model.
@@ -31,10 +31,13 @@ class NameAffirmationService:
 
     def _bind_to_module_functions(self, module):
         """
-        Bind module functions.
+        Bind the public functions defined in the module. Private functions and functions the
+        module imports from elsewhere are not exposed.
         """
         for attr_name in dir(module):
+            if attr_name.startswith('_'):
+                continue
             attr = getattr(module, attr_name, None)
-            if isinstance(attr, types.FunctionType):
+            if isinstance(attr, types.FunctionType) and attr.__module__ == module.__name__:
                 if not hasattr(self, attr_name):
                     setattr(self, attr_name, attr)
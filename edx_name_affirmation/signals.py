@@ -2,6 +2,10 @@
 Name Affirmation signals
 """
 
+import threading
+from contextlib import contextmanager
+
+from django.db import transaction
 from django.dispatch import Signal
 from django.dispatch.dispatcher import receiver
 
@@ -14,8 +18,51 @@ except ImportError:
 
 from .models import VerifiedName
 
+# Sent with `user_id` and `profile_name` when a VerifiedName is created as approved or its status
+# changes to approved. Saving a VerifiedName that was already approved does not send it again.
 VERIFIED_NAME_APPROVED = Signal()
 
+_deferred_approvals = threading.local()
+
+
+@contextmanager
+def deferred_approval_signals():
+    """
+    Defer the VERIFIED_NAME_APPROVED signals sent within this block until the transaction commits.
+
+    Once the transaction commits, the signal is sent once per user, with the profile name of their last
+    approval. Nested blocks are part of the outermost one. If the block raises, its approvals are dropped.
+    """
+    if getattr(_deferred_approvals, 'approvals', None) is not None:
+        yield
+        return
+
+    approvals = _deferred_approvals.approvals = {}
+    try:
+        yield
+    finally:
+        _deferred_approvals.approvals = None
+    if approvals:
+        transaction.on_commit(lambda: _send_verified_names_approved(approvals))
+
+
+def send_verified_name_approved(user_id, profile_name):
+    """
+    Send VERIFIED_NAME_APPROVED for the user, or defer it if within `deferred_approval_signals`.
+    """
+    approvals = getattr(_deferred_approvals, 'approvals', None)
+    if approvals is not None:
+        # re-insert so that each user's signal is sent in the order of their last approval
+        approvals.pop(user_id, None)
+        approvals[user_id] = profile_name
+        return
+    VERIFIED_NAME_APPROVED.send(sender='name_affirmation', user_id=user_id, profile_name=profile_name)
+
+
+def _send_verified_names_approved(approvals):
+    for user_id, profile_name in approvals.items():
+        VERIFIED_NAME_APPROVED.send(sender='name_affirmation', user_id=user_id, profile_name=profile_name)
+
 
 @receiver(USER_RETIRE_LMS_MISC)
 def _listen_for_lms_retire_verified_names(sender, **kwargs):  # pylint: disable=unused-argument
@@ -32,6 +32,20 @@ class VerifiedNameStatus(str, Enum):
     APPROVED = "approved"
     DENIED = "denied"
 
+    @classmethod
+    def get_lifecycle_position(cls, status):
+        """
+        Return the position of the given status in the expected lifecycle. Approved and denied
+        are both final, so they share a position.
+        """
+        lifecycle_positions = {
+            cls.PENDING: 0,
+            cls.SUBMITTED: 1,
+            cls.APPROVED: 2,
+            cls.DENIED: 2,
+        }
+        return lifecycle_positions[cls(status)]
+
     @classmethod
     def trigger_state_change_from_proctoring(cls, proctoring_status):
         """
@@ -3,15 +3,24 @@
 Name affirmation celery tasks
 """
 
+import inspect
 import logging
+from collections import defaultdict, namedtuple
 
-from celery import shared_task
-from edx_django_utils.monitoring import set_code_owner_attribute
+from celery import Task, shared_task
+from edx_django_utils.monitoring import set_code_owner_attribute, set_custom_attribute
+from simple_history.utils import bulk_create_with_history, bulk_update_with_history
 
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.db.models import Q
+from django.core.exceptions import ObjectDoesNotExist
+from django.db import DataError, IntegrityError, transaction
+from django.db.models import Case, Q, Value, When
+from django.utils import timezone
 
-from edx_name_affirmation.models import VerifiedName
+from edx_name_affirmation.cache import claim_idv_event, invalidate_verified_name_cache
+from edx_name_affirmation.models import CurrentVerifiedName, DeadLetterTask, VerifiedName
+from edx_name_affirmation.signals import deferred_approval_signals, send_verified_name_approved
 from edx_name_affirmation.statuses import VerifiedNameStatus
 
 User = get_user_model()
@@ -19,17 +28,122 @@ User = get_user_model()
 log = logging.getLogger(__name__)
 
 DEFAULT_RETRY_SECONDS = 30
-MAX_RETRIES = 3
+MAX_RETRIES = getattr(settings, 'NAME_AFFIRMATION_TASK_MAX_RETRIES', 3)
 
+# Retries are delayed by a random amount of time between 0 and RETRY_BACKOFF_SECONDS * 2 ** retries,
+# capped at RETRY_BACKOFF_MAX_SECONDS, so that tasks which failed together do not all retry at once.
+RETRY_BACKOFF_SECONDS = getattr(settings, 'NAME_AFFIRMATION_TASK_RETRY_BACKOFF_SECONDS', DEFAULT_RETRY_SECONDS)
+RETRY_BACKOFF_MAX_SECONDS = getattr(settings, 'NAME_AFFIRMATION_TASK_RETRY_BACKOFF_MAX_SECONDS', 600)
 
-@shared_task(
-    bind=True, autoretry_for=(Exception,), default_retry_delay=DEFAULT_RETRY_SECONDS, max_retries=MAX_RETRIES,
+# Errors that will fail the same way on every retry, such as a missing user or a malformed payload.
+# Every other error, such as a lost database connection or a deadlock, is retried.
+NON_RETRYABLE_EXCEPTIONS = (ObjectDoesNotExist, IntegrityError, DataError, ValueError, TypeError, KeyError)
+
+# Maximum number of attempt ids per delete statement in delete_verified_names_task
+DELETE_BATCH_SIZE = 1000
+
+
+class NameAffirmationTask(Task):
+    """
+    Base class for name affirmation tasks, which stores tasks that failed for good as DeadLetterTasks
+    so that they can be replayed.
+    """
+    def on_failure(self, exc, task_id, args, kwargs, einfo):
+        try:
+            DeadLetterTask.objects.bulk_create([
+                DeadLetterTask(
+                    task_id=task_id,
+                    task_name=self.name,
+                    user_id=user_id,
+                    args=user_args,
+                    kwargs=user_kwargs,
+                    exception=repr(exc),
+                )
+                for user_id, user_args, user_kwargs in self.split_by_user(args, kwargs)
+            ])
+        except Exception:  # pylint: disable=broad-except
+            log.exception(f'Failed to store dead letter for task {self.name} with id {task_id}')
+
+    def split_by_user(self, args, kwargs):
+        """
+        Split the arguments of a call into (user_id, args, kwargs) tuples, one for each user the call applies to.
+
+        The arguments of a task with updates for many users are split into a call with the updates of each user,
+        so that each dead letter can be deleted when its user is retired. Arguments that do not match the task
+        are kept together, without a user.
+        """
+        try:
+            call_args = inspect.signature(self.run).bind(*args, **kwargs).arguments
+        except TypeError:
+            return [(None, list(args), kwargs)]
+
+        if 'user_id' in call_args:
+            return [(call_args['user_id'], list(args), kwargs)]
+
+        for updates_arg in ('idv_updates', 'proctoring_updates'):
+            if updates_arg not in call_args:
+                continue
+            updates_by_user = defaultdict(list)
+            try:
+                for update in call_args[updates_arg]:
+                    updates_by_user[update[1]].append(update)
+            except (TypeError, IndexError, KeyError):
+                break
+            if updates_by_user:
+                return [(user_id, [updates], {}) for user_id, updates in updates_by_user.items()]
+
+        return [(None, list(args), kwargs)]
+
+
+TASK_RETRY_OPTIONS = {
+    'autoretry_for': (Exception,),
+    'dont_autoretry_for': NON_RETRYABLE_EXCEPTIONS,
+    'max_retries': MAX_RETRIES,
+    'retry_backoff': RETRY_BACKOFF_SECONDS,
+    'retry_backoff_max': RETRY_BACKOFF_MAX_SECONDS,
+    'retry_jitter': True,
+}
+
+# An update for a single IDV attempt, as passed to `idv_update_verified_names_task`
+IDVUpdate = namedtuple(
+    'IDVUpdate',
+    ['attempt_id', 'user_id', 'status', 'photo_id_name', 'full_name', 'attempt_status'],
+    defaults=[None],
 )
+
+# An update for a single proctoring attempt, as passed to `proctoring_update_verified_names_task`
+ProctoringUpdate = namedtuple('ProctoringUpdate', ['attempt_id', 'user_id', 'status', 'full_name', 'profile_name'])
+
+
+@shared_task(bind=True, base=NameAffirmationTask, **TASK_RETRY_OPTIONS)
 @set_code_owner_attribute
-def idv_update_verified_name_task(self, attempt_id, user_id, name_affirmation_status, photo_id_name, full_name):
+def idv_update_verified_name_task(
+    self, attempt_id, user_id, name_affirmation_status, photo_id_name, full_name, attempt_status=None,
+    coalesce_token=None,
+):
     """
     Celery task for updating a verified name based on an IDV attempt
+
+    `full_name` is the user's name from the IDV event. If the user has a pending name change,
+    that is used as the profile name of a created VerifiedName instead.
+
+    `attempt_status` is the platform's own status for the attempt. If given, it is stored
+    on the affected VerifiedName as its attempt status snapshot.
+
+    `coalesce_token` is the sequence number of the event when IDV events are coalesced. The update
+    is skipped if another event of the attempt supersedes it.
     """
+    if coalesce_token:
+        should_apply, num_coalesced = claim_idv_event(attempt_id, coalesce_token, name_affirmation_status)
+        if not should_apply:
+            set_custom_attribute('name_affirmation_idv_event_superseded', True)
+            log.info(
+                'Skipping update for platform_verification_attempt_id={attempt_id} to status={status} '
+                'because another event supersedes it'.format(attempt_id=attempt_id, status=name_affirmation_status)
+            )
+            return
+        set_custom_attribute('name_affirmation_idv_events_coalesced', num_coalesced)
+
     log.info('VerifiedName: idv_update_verified_name triggering Celery task started for user %(user_id)s '
              'with attempt_id %(attempt_id)s and status %(status)s',
              {
@@ -38,80 +152,233 @@ def idv_update_verified_name_task(self, attempt_id, user_id, name_affirmation_st
                 'status': name_affirmation_status
              }
              )
-    # get all verified names that are either not associated with an IDV attempt, or
-    # only associated with the IDV attempt for which we received an update. We do not
-    # want to grab all verified names for the same user and name combination, because
-    # some of those records may already be associated with a different IDV attempt.
-    verified_names = VerifiedName.objects.filter(
-        (Q(platform_verification_attempt_id=attempt_id) | Q(platform_verification_attempt_id__isnull=True))
-        & Q(user__id=user_id)
-        & Q(verified_name=photo_id_name)
-    ).order_by('-created')
-    verified_names_updated = False
-    if verified_names:
-        # if there are VerifiedName objects, we want to update existing entries
-        # for each attempt with no attempt id (either proctoring or idv), update attempt id
-        updated_for_attempt_id = verified_names.filter(
-            proctored_exam_attempt_id=None,
-            verification_attempt_id=None,
-            platform_verification_attempt_id=None
-        ).update(platform_verification_attempt_id=attempt_id)
+    _update_verified_name_for_idv_attempt(
+        attempt_id, user_id, name_affirmation_status, photo_id_name, full_name, attempt_status,
+    )
 
-        if updated_for_attempt_id:
-            verified_names_updated = True
-            log.info(
-                'Updated VerifiedNames for user={user_id} to platform_verification_attempt_id={attempt_id}'.format(
+
+@shared_task(bind=True, base=NameAffirmationTask, **TASK_RETRY_OPTIONS)
+@set_code_owner_attribute
+def idv_update_verified_names_task(self, idv_updates):
+    """
+    Celery task for updating verified names based on many IDV attempts at once
+
+    `idv_updates` is a list of (attempt_id, user_id, name_affirmation_status, photo_id_name, full_name)
+    tuples, optionally followed by the attempt status. If there are several updates for the same
+    attempt, only the one furthest along the status lifecycle is applied, or the last of those.
+    """
+    latest_updates = {}
+    for idv_update in idv_updates:
+        idv_update = IDVUpdate(*idv_update)
+        previous_update = latest_updates.get(idv_update.attempt_id)
+        if previous_update is None or (
+            VerifiedNameStatus.get_lifecycle_position(idv_update.status)
+            >= VerifiedNameStatus.get_lifecycle_position(previous_update.status)
+        ):
+            latest_updates[idv_update.attempt_id] = idv_update
+    idv_updates = list(latest_updates.values())
+
+    set_custom_attribute('name_affirmation_idv_batch_size', len(idv_updates))
+    log.info('VerifiedName: idv_update_verified_names triggering Celery task started for {num_updates} '
+             'IDV attempts'.format(num_updates=len(idv_updates)))
+
+    try:
+        with transaction.atomic(), deferred_approval_signals():
+            _bulk_update_verified_names_for_idv_attempts(idv_updates)
+    except IntegrityError:
+        # A concurrent task created a VerifiedName for one of the attempts first
+        log.warning('Failed to update VerifiedNames for {num_updates} IDV attempts at once, updating them '
+                    'one at a time instead'.format(num_updates=len(idv_updates)))
+        with deferred_approval_signals():
+            for idv_update in idv_updates:
+                _update_verified_name_for_idv_attempt(*idv_update)
+
+
+def _update_verified_name_for_idv_attempt(
+    attempt_id, user_id, name_affirmation_status, photo_id_name, full_name, attempt_status,
+):
+    """
+    Create or update the VerifiedName for an IDV attempt.
+    """
+    verified_name = _get_verified_name_for_idv_attempt(attempt_id, user_id, photo_id_name)
+
+    # if there is no entry to update, we want to create one.
+    if not verified_name:
+        try:
+            with transaction.atomic():
+                verified_name = VerifiedName.objects.create(
+                    user_id=user_id,
+                    verified_name=photo_id_name,
+                    profile_name=_get_profile_name(User.objects.filter(id=user_id).first(), full_name),
+                    platform_verification_attempt_id=attempt_id,
+                    status=name_affirmation_status,
+                    attempt_status=attempt_status,
+                )
+        except IntegrityError:
+            # another task for the same attempt created the VerifiedName first, so update that one instead
+            verified_name = VerifiedName.objects.filter(platform_verification_attempt_id=attempt_id).first()
+            if not verified_name:
+                raise
+        else:
+            log.error(
+                'Created VerifiedName for user={user_id} to have status={status} '
+                'and platform_verification_attempt_id={attempt_id}, because no matching '
+                'attempt_id or verified_name were found.'.format(
                     user_id=user_id,
                     attempt_id=attempt_id,
+                    status=verified_name.status
                 )
             )
+            return
 
-        # then for all matching attempt ids, update the status
-        verified_name_qs = verified_names.filter(
-            platform_verification_attempt_id=attempt_id,
-            verification_attempt_id=None,
-            proctored_exam_attempt_id=None
+    # Save the instance rather than using `.update()` to ensure that post_save signals send
+    verified_name.platform_verification_attempt_id = attempt_id
+    verified_name.status = name_affirmation_status
+    if attempt_status:
+        verified_name.attempt_status = attempt_status
+    verified_name.save()
+
+    log.info(
+        'Updated VerifiedName for user={user_id} with platform_verification_attempt_id={attempt_id} to '
+        'have status={status}'.format(
+            user_id=user_id,
+            attempt_id=attempt_id,
+            status=name_affirmation_status
         )
+    )
 
-        # Individually update to ensure that post_save signals send
-        for verified_name_obj in verified_name_qs:
-            verified_name_obj.status = name_affirmation_status
-            verified_name_obj.save()
-            verified_names_updated = True
 
-        log.info(
-            'Updated VerifiedNames for user={user_id} with platform_verification_attempt_id={attempt_id} to '
-            'have status={status}'.format(
-                user_id=user_id,
-                attempt_id=attempt_id,
-                status=name_affirmation_status
+def _get_verified_name_for_idv_attempt(attempt_id, user_id, photo_id_name):
+    """
+    Return the VerifiedName that an update for the given IDV attempt applies to, or None.
+
+    This is the VerifiedName already associated with the attempt if there is one. Otherwise, it is
+    the most recent VerifiedName with the same name that is not associated with any attempt yet. We
+    do not want to grab verified names that are associated with a different attempt, and each IDV
+    attempt may only be associated with a single VerifiedName.
+    """
+    return VerifiedName.objects.filter(
+        Q(user_id=user_id)
+        & (
+            Q(platform_verification_attempt_id=attempt_id)
+            | Q(
+                verified_name=photo_id_name,
+                platform_verification_attempt_id=None,
+                verification_attempt_id=None,
+                proctored_exam_attempt_id=None,
             )
         )
+    ).order_by(
+        Case(When(platform_verification_attempt_id=attempt_id, then=Value(0)), default=Value(1)),
+        '-created',
+        '-id',
+    ).first()
+
+
+def _get_profile_name(user, full_name):
+    """
+    Return the profile name for a VerifiedName created for the user from an IDV event.
+    """
+    # If the user has a pending name change, use that as the full name
+    try:
+        return user.pending_name_change
+    except AttributeError:
+        return full_name
+
+
+def _bulk_update_verified_names_for_idv_attempts(idv_updates):
+    """
+    Create or update the VerifiedNames for many IDV attempts, with one update per attempt.
+
+    This bypasses post_save signals, so the affected users' cached lookups and CurrentVerifiedNames are
+    refreshed here. VERIFIED_NAME_APPROVED is sent for each VerifiedName whose status changed to approved,
+    which is deferred until the transaction commits when called within `deferred_approval_signals`.
+    """
+    verified_names_by_attempt_id = {
+        verified_name.platform_verification_attempt_id: verified_name
+        for verified_name in VerifiedName.objects.filter(
+            platform_verification_attempt_id__in=[idv_update.attempt_id for idv_update in idv_updates]
+        )
+    }
 
-    # if there are no entries to update, we want to create one.
-    if not verified_names_updated:
-        user = User.objects.get(id=user_id)
-        verified_name = VerifiedName.objects.create(
-            user=user,
-            verified_name=photo_id_name,
-            profile_name=full_name,
-            platform_verification_attempt_id=attempt_id,
-            status=name_affirmation_status,
+    # unlinked VerifiedNames for each user and name, most recent first
+    unlinked_verified_names = defaultdict(list)
+    unlinked_updates = [
+        idv_update for idv_update in idv_updates if idv_update.attempt_id not in verified_names_by_attempt_id
+    ]
+    if unlinked_updates:
+        for verified_name in VerifiedName.objects.filter(
+            user_id__in={idv_update.user_id for idv_update in unlinked_updates},
+            verified_name__in={idv_update.photo_id_name for idv_update in unlinked_updates},
+            platform_verification_attempt_id=None,
+            verification_attempt_id=None,
+            proctored_exam_attempt_id=None,
+        ).order_by('-created', '-id'):
+            unlinked_verified_names[(verified_name.user_id, verified_name.verified_name)].append(verified_name)
+
+    now = timezone.now()
+    verified_names_to_update = []
+    updates_to_create = []
+    for idv_update in idv_updates:
+        verified_name = verified_names_by_attempt_id.get(idv_update.attempt_id)
+        if not verified_name:
+            matching_verified_names = unlinked_verified_names[(idv_update.user_id, idv_update.photo_id_name)]
+            verified_name = matching_verified_names.pop(0) if matching_verified_names else None
+
+        if verified_name:
+            verified_name.platform_verification_attempt_id = idv_update.attempt_id
+            verified_name.status = idv_update.status
+            if idv_update.attempt_status:
+                verified_name.attempt_status = idv_update.attempt_status
+            verified_name.modified = now
+            verified_names_to_update.append(verified_name)
+        else:
+            updates_to_create.append(idv_update)
+
+    users = User.objects.in_bulk({idv_update.user_id for idv_update in updates_to_create}) if updates_to_create else {}
+    verified_names_to_create = [
+        VerifiedName(
+            user_id=idv_update.user_id,
+            verified_name=idv_update.photo_id_name,
+            profile_name=_get_profile_name(users.get(idv_update.user_id), idv_update.full_name),
+            platform_verification_attempt_id=idv_update.attempt_id,
+            status=idv_update.status,
+            attempt_status=idv_update.attempt_status,
         )
-        log.error(
-            'Created VerifiedName for user={user_id} to have status={status} '
-            'and platform_verification_attempt_id={attempt_id}, because no matching '
-            'attempt_id or verified_name were found.'.format(
-                user_id=user_id,
-                attempt_id=attempt_id,
-                status=verified_name.status
-            )
+        for idv_update in updates_to_create
+    ]
+
+    # collected before the bulk writes, which do not reset the status trackers consistently
+    approved_verified_names = [
+        verified_name for verified_name in verified_names_to_update + verified_names_to_create
+        if verified_name.status == VerifiedNameStatus.APPROVED and verified_name.tracker.has_changed('status')
+    ]
+
+    bulk_update_with_history(
+        verified_names_to_update,
+        VerifiedName,
+        ['platform_verification_attempt_id', 'status', 'attempt_status', 'modified'],
+    )
+    bulk_create_with_history(verified_names_to_create, VerifiedName)
+    log.info(
+        'Updated {num_updated} and created {num_created} VerifiedNames for IDV attempts'.format(
+            num_updated=len(verified_names_to_update),
+            num_created=len(verified_names_to_create),
         )
+    )
 
+    verified_names = verified_names_to_update + verified_names_to_create
+    user_ids = {verified_name.user_id for verified_name in verified_names}
+    for user_id in user_ids:
+        invalidate_verified_name_cache(user_id)
+    transaction.on_commit(lambda: [invalidate_verified_name_cache(user_id) for user_id in user_ids])
+    CurrentVerifiedName.refresh_for_users(user_ids)
 
-@shared_task(
-    bind=True, autoretry_for=(Exception,), default_retry_delay=DEFAULT_RETRY_SECONDS, max_retries=MAX_RETRIES,
-)
+    for verified_name in approved_verified_names:
+        send_verified_name_approved(verified_name.user_id, verified_name.profile_name)
+
+
+@shared_task(bind=True, base=NameAffirmationTask, **TASK_RETRY_OPTIONS)
 @set_code_owner_attribute
 def proctoring_update_verified_name_task(
     self,
@@ -124,74 +391,188 @@ def proctoring_update_verified_name_task(
     """
     Celery task for updating a verified name based on a proctoring attempt
     """
+    proctoring_update = ProctoringUpdate(attempt_id, user_id, name_affirmation_status, full_name, profile_name)
+    approved_verified_name, verified_name_for_exam = _get_verified_names_for_proctoring_attempt(user_id, attempt_id)
+    verified_name = _apply_proctoring_update(proctoring_update, approved_verified_name, verified_name_for_exam)
+    if not verified_name:
+        return
+
+    is_new = verified_name._state.adding  # pylint: disable=protected-access
+    verified_name.save()
+    if is_new:
+        log.info(
+            'Created VerifiedName for user={user_id} to have status={status} '
+            'and proctored_exam_attempt_id={attempt_id}'.format(
+                user_id=user_id,
+                attempt_id=attempt_id,
+                status=name_affirmation_status
+            )
+        )
+    else:
+        log.info(
+            'Updated VerifiedName for user={user_id} with proctored_exam_attempt_id={attempt_id} '
+            'to have status={status}'.format(
+                user_id=user_id,
+                attempt_id=attempt_id,
+                status=name_affirmation_status
+            )
+        )
+
+
+@shared_task(bind=True, base=NameAffirmationTask, **TASK_RETRY_OPTIONS)
+@set_code_owner_attribute
+def proctoring_update_verified_names_task(self, proctoring_updates):
+    """
+    Celery task for updating verified names based on many proctoring attempts at once
+
+    `proctoring_updates` is a list of (attempt_id, user_id, name_affirmation_status, full_name, profile_name)
+    tuples. They are applied in order, with the same outcome as running `proctoring_update_verified_name_task`
+    for each of them.
+    """
+    proctoring_updates = [ProctoringUpdate(*proctoring_update) for proctoring_update in proctoring_updates]
 
-    approved_verified_name = VerifiedName.objects.filter(
-        user__id=user_id,
-        status=VerifiedNameStatus.APPROVED
-    ).order_by('-created').first()
+    set_custom_attribute('name_affirmation_proctoring_batch_size', len(proctoring_updates))
+    log.info('VerifiedName: proctoring_update_verified_names triggering Celery task started for {num_updates} '
+             'proctoring attempts'.format(num_updates=len(proctoring_updates)))
 
-    verified_name_for_exam = VerifiedName.objects.filter(
-        user__id=user_id,
-        proctored_exam_attempt_id=attempt_id
-    ).order_by('-created').first()
+    with transaction.atomic(), deferred_approval_signals():
+        _bulk_update_verified_names_for_proctoring_attempts(proctoring_updates)
 
+
+def _get_verified_names_for_proctoring_attempt(user_id, attempt_id):
+    """
+    Return the user's most recent approved VerifiedName and most recent VerifiedName for the proctoring
+    attempt, either of which may be None, with a single query.
+    """
+    approved_verified_name = None
+    verified_name_for_exam = None
+    verified_names = VerifiedName.objects.filter(
+        Q(status=VerifiedNameStatus.APPROVED) | Q(proctored_exam_attempt_id=attempt_id),
+        user_id=user_id,
+    ).order_by('-created')
+    for verified_name in verified_names:
+        if approved_verified_name is None and verified_name.status == VerifiedNameStatus.APPROVED:
+            approved_verified_name = verified_name
+        if verified_name_for_exam is None and verified_name.proctored_exam_attempt_id == attempt_id:
+            verified_name_for_exam = verified_name
+    return approved_verified_name, verified_name_for_exam
+
+
+def _apply_proctoring_update(proctoring_update, approved_verified_name, verified_name_for_exam):
+    """
+    Return the VerifiedName to save for a proctoring update, given the user's most recent approved VerifiedName
+    and most recent VerifiedName for the attempt. This is the VerifiedName for the attempt with its new status,
+    or a new unsaved VerifiedName if there is none yet. Returns None if there is nothing to save.
+    """
     # check if approved VerifiedName already exists for the user, and skip
     # update if no VerifiedName has already been created for this specific exam
     if approved_verified_name and not verified_name_for_exam:
-        is_full_name_approved = approved_verified_name.verified_name == full_name
+        is_full_name_approved = approved_verified_name.verified_name == proctoring_update.full_name
         if not is_full_name_approved:
             log.warning(
                 'Full name for proctored_exam_attempt_id={attempt_id} is not equal '
                 'to the most recent verified name verified_name_id={name_id}.'.format(
-                    attempt_id=attempt_id,
+                    attempt_id=proctoring_update.attempt_id,
                     name_id=approved_verified_name.id
                 )
             )
-        return
+        return None
 
     if verified_name_for_exam:
-        verified_name_for_exam.status = name_affirmation_status
-        verified_name_for_exam.save()
-        log.info(
-            'Updated VerifiedName for user={user_id} with proctored_exam_attempt_id={attempt_id} '
-            'to have status={status}'.format(
-                user_id=user_id,
-                attempt_id=attempt_id,
-                status=name_affirmation_status
-            )
+        verified_name_for_exam.status = proctoring_update.status
+        return verified_name_for_exam
+
+    if proctoring_update.full_name and proctoring_update.profile_name:
+        # if they do not already have an approved VerifiedName, create one
+        return VerifiedName(
+            user_id=proctoring_update.user_id,
+            verified_name=proctoring_update.full_name,
+            proctored_exam_attempt_id=proctoring_update.attempt_id,
+            status=proctoring_update.status,
+            profile_name=proctoring_update.profile_name
         )
-    else:
-        if full_name and profile_name:
-            # if they do not already have an approved VerifiedName, create one
-            user = User.objects.get(id=user_id)
-            VerifiedName.objects.create(
-                user=user,
-                verified_name=full_name,
-                proctored_exam_attempt_id=attempt_id,
-                status=name_affirmation_status,
-                profile_name=profile_name
-            )
-            log.info(
-                'Created VerifiedName for user={user_id} to have status={status} '
-                'and proctored_exam_attempt_id={attempt_id}'.format(
-                    user_id=user_id,
-                    attempt_id=attempt_id,
-                    status=name_affirmation_status
-                )
-            )
-        else:
-            log.error(
-                'Cannot create VerifiedName for user={user_id} for proctored_exam_attempt_id={attempt_id} '
-                'because neither profile name nor full name were provided'.format(
-                    user_id=user_id,
-                    attempt_id=attempt_id,
-                )
-            )
 
+    log.error(
+        'Cannot create VerifiedName for user={user_id} for proctored_exam_attempt_id={attempt_id} '
+        'because neither profile name nor full name were provided'.format(
+            user_id=proctoring_update.user_id,
+            attempt_id=proctoring_update.attempt_id,
+        )
+    )
+    return None
 
-@shared_task(
-    bind=True, autoretry_for=(Exception,), default_retry_delay=DEFAULT_RETRY_SECONDS, max_retries=MAX_RETRIES,
-)
+
+def _bulk_update_verified_names_for_proctoring_attempts(proctoring_updates):
+    """
+    Create or update the VerifiedNames for many proctoring attempts, with a single lookup and bulk writes.
+
+    Like `_bulk_update_verified_names_for_idv_attempts`, this bypasses post_save signals and refreshes the
+    affected users' cached lookups and CurrentVerifiedNames itself.
+    """
+    # the approved VerifiedNames and VerifiedNames for the attempts of each user, most recent first
+    verified_names_by_user_id = defaultdict(list)
+    for verified_name in VerifiedName.objects.filter(
+        Q(status=VerifiedNameStatus.APPROVED)
+        | Q(proctored_exam_attempt_id__in={proctoring_update.attempt_id for proctoring_update in proctoring_updates}),
+        user_id__in={proctoring_update.user_id for proctoring_update in proctoring_updates},
+    ).order_by('-created'):
+        verified_names_by_user_id[verified_name.user_id].append(verified_name)
+
+    now = timezone.now()
+    verified_names_to_update = {}
+    verified_names_to_create = []
+    for proctoring_update in proctoring_updates:
+        user_verified_names = verified_names_by_user_id[proctoring_update.user_id]
+        approved_verified_name = next((
+            verified_name for verified_name in user_verified_names
+            if verified_name.status == VerifiedNameStatus.APPROVED
+        ), None)
+        verified_name_for_exam = next((
+            verified_name for verified_name in user_verified_names
+            if verified_name.proctored_exam_attempt_id == proctoring_update.attempt_id
+        ), None)
+
+        verified_name = _apply_proctoring_update(proctoring_update, approved_verified_name, verified_name_for_exam)
+        if not verified_name:
+            continue
+        if verified_name.pk:
+            verified_name.modified = now
+            verified_names_to_update[verified_name.pk] = verified_name
+        elif verified_name is not verified_name_for_exam:
+            # a new VerifiedName, rather than one created by an earlier update in the batch, is the
+            # most recent one for the updates that follow
+            user_verified_names.insert(0, verified_name)
+            verified_names_to_create.append(verified_name)
+
+    verified_names_to_update = list(verified_names_to_update.values())
+    # collected before the bulk writes, which do not reset the status trackers consistently
+    approved_verified_names = [
+        verified_name for verified_name in verified_names_to_update + verified_names_to_create
+        if verified_name.status == VerifiedNameStatus.APPROVED and verified_name.tracker.has_changed('status')
+    ]
+
+    bulk_update_with_history(verified_names_to_update, VerifiedName, ['status', 'modified'])
+    bulk_create_with_history(verified_names_to_create, VerifiedName)
+    log.info(
+        'Updated {num_updated} and created {num_created} VerifiedNames for proctoring attempts'.format(
+            num_updated=len(verified_names_to_update),
+            num_created=len(verified_names_to_create),
+        )
+    )
+
+    user_ids = {
+        verified_name.user_id for verified_name in verified_names_to_update + verified_names_to_create
+    }
+    for user_id in user_ids:
+        invalidate_verified_name_cache(user_id)
+    transaction.on_commit(lambda: [invalidate_verified_name_cache(user_id) for user_id in user_ids])
+    CurrentVerifiedName.refresh_for_users(user_ids)
+
+    for verified_name in approved_verified_names:
+        send_verified_name_approved(verified_name.user_id, verified_name.profile_name)
+
+
+@shared_task(bind=True, base=NameAffirmationTask, **TASK_RETRY_OPTIONS)
 @set_code_owner_attribute
 def delete_verified_name_task(self, platform_verification_attempt_id, proctoring_attempt_id):
     """
@@ -204,28 +585,56 @@ def delete_verified_name_task(self, platform_verification_attempt_id, proctoring
         )
         return
 
-    log_message = {'field_name': '', 'attempt_id': ''}
-
     if platform_verification_attempt_id:
-        verified_names = VerifiedName.objects.filter(platform_verification_attempt_id=platform_verification_attempt_id)
-        log_message['field_name'] = 'platform_verification_attempt_id'
-        log_message['attempt_id'] = platform_verification_attempt_id
+        field_name = 'platform_verification_attempt_id'
+        attempt_id = platform_verification_attempt_id
     else:
-        verified_names = VerifiedName.objects.filter(proctored_exam_attempt_id=proctoring_attempt_id)
-        log_message['field_name'] = 'proctored_exam_attempt_id'
-        log_message['attempt_id'] = proctoring_attempt_id
+        field_name = 'proctored_exam_attempt_id'
+        attempt_id = proctoring_attempt_id
 
-    if verified_names:
+    # The read model of the users whose names are deleted is refreshed once per user, rather than once per name
+    with CurrentVerifiedName.deferred_refresh():
+        num_names, _ = VerifiedName.objects.filter(**{field_name: attempt_id}).delete()
+
+    if num_names:
         log.info(
-            'Deleting {num_names} VerifiedName(s) associated with {field_name}='
-            '{platform_verification_attempt_id}'.format(
-                num_names=len(verified_names),
-                field_name=log_message['field_name'],
-                platform_verification_attempt_id=log_message['attempt_id'],
+            'Deleted {num_names} VerifiedName(s) associated with {field_name}={attempt_id}'.format(
+                num_names=num_names,
+                field_name=field_name,
+                attempt_id=attempt_id,
             )
         )
-        verified_names.delete()
+    else:
+        log.info(
+            'No VerifiedNames deleted because no VerifiedNames were associated with the provided attempt ID.'
+        )
+
+
+@shared_task(bind=True, base=NameAffirmationTask, **TASK_RETRY_OPTIONS)
+@set_code_owner_attribute
+def delete_verified_names_task(self, platform_verification_attempt_ids=None, proctoring_attempt_ids=None):
+    """
+    Celery task to delete the verified names of many idv and proctoring attempts, with one delete
+    per DELETE_BATCH_SIZE attempt ids
+    """
+    num_names = 0
+    for field_name, attempt_ids in (
+        ('platform_verification_attempt_id', platform_verification_attempt_ids),
+        ('proctored_exam_attempt_id', proctoring_attempt_ids),
+    ):
+        attempt_ids = sorted(set(attempt_ids or []))
+        for i in range(0, len(attempt_ids), DELETE_BATCH_SIZE):
+            with CurrentVerifiedName.deferred_refresh():
+                num_batch_names, _ = VerifiedName.objects.filter(
+                    **{f'{field_name}__in': attempt_ids[i:i + DELETE_BATCH_SIZE]}
+                ).delete()
+            num_names += num_batch_names
 
     log.info(
-        'No VerifiedNames deleted because no VerifiedNames were associated with the provided attempt ID.'
+        'Deleted {num_names} VerifiedName(s) associated with {num_idv_attempts} idv attempt(s) and '
+        '{num_proctoring_attempts} proctoring attempt(s)'.format(
+            num_names=num_names,
+            num_idv_attempts=len(platform_verification_attempt_ids or []),
+            num_proctoring_attempts=len(proctoring_attempt_ids or []),
+        )
     )
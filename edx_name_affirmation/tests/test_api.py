@@ -3,18 +3,26 @@ Tests for the `edx_name_affirmation` Python API.
 """
 
 import ddt
+from mock import patch
 
 from django.contrib.auth import get_user_model
 from django.core.cache import cache
-from django.test import TestCase
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 
 from edx_name_affirmation.api import (
+    bulk_update_verified_name_status,
+    compare_and_set_verified_name_status,
     create_verified_name,
     create_verified_name_config,
     get_verified_name,
     get_verified_name_history,
+    get_verified_names_for_users,
     should_use_verified_name_for_certs,
-    update_verified_name_status
+    should_use_verified_name_for_certs_for_users,
+    update_verified_name_status,
+    with_verified_name
 )
 from edx_name_affirmation.exceptions import (
     VerifiedNameAttemptIdNotGiven,
@@ -22,7 +30,7 @@ from edx_name_affirmation.exceptions import (
     VerifiedNameEmptyString,
     VerifiedNameMultipleAttemptIds
 )
-from edx_name_affirmation.models import VerifiedNameConfig
+from edx_name_affirmation.models import CurrentVerifiedName, VerifiedName, VerifiedNameConfig
 from edx_name_affirmation.statuses import VerifiedNameStatus
 
 User = get_user_model()
@@ -202,6 +210,92 @@ class TestVerifiedNameAPI(TestCase):
         else:
             self.assertIsNone(verified_name_obj)
 
+    @ddt.data(
+        (False, None, 'newest pending'),
+        (True, None, 'newest approved'),
+        (False, [VerifiedNameStatus.PENDING], 'newest approved'),
+    )
+    @ddt.unpack
+    def test_get_verified_names_for_users(self, is_verified, statuses_to_exclude, expected_name):
+        """
+        Test that the most recent matching VerifiedName is returned for each user in a single query.
+        """
+        users = [self.user]
+        for i in range(3):
+            user = User(username=f'bulkuser{i}', email=f'bulkuser{i}@test.com')
+            user.save()
+            users.append(user)
+
+        for user in users:
+            create_verified_name(user, 'old approved', self.PROFILE_NAME, status=VerifiedNameStatus.APPROVED)
+            create_verified_name(user, 'newest approved', self.PROFILE_NAME, status=VerifiedNameStatus.APPROVED)
+            create_verified_name(user, 'newest pending', self.PROFILE_NAME)
+
+        # a user with no verified names is left out of the result
+        no_names_user = User(username='nonames', email='nonames@test.com')
+        no_names_user.save()
+
+        user_ids = [user.id for user in users] + [no_names_user.id]
+        with self.assertNumQueries(1):
+            verified_names = get_verified_names_for_users(user_ids, is_verified, statuses_to_exclude)
+
+        self.assertEqual(set(verified_names), {user.id for user in users})
+        for user in users:
+            self.assertEqual(verified_names[user.id].verified_name, expected_name)
+            self.assertEqual(
+                verified_names[user.id],
+                get_verified_name(user, is_verified, statuses_to_exclude),
+            )
+
+    @patch('edx_name_affirmation.api.BULK_LOOKUP_CHUNK_SIZE', 2)
+    def test_get_verified_names_for_users_chunked(self):
+        """
+        Test that users are resolved with one query per chunk.
+        """
+        users = []
+        for i in range(5):
+            user = User(username=f'chunkuser{i}', email=f'chunkuser{i}@test.com')
+            user.save()
+            create_verified_name(user, self.VERIFIED_NAME, self.PROFILE_NAME)
+            users.append(user)
+
+        with self.assertNumQueries(3):
+            verified_names = get_verified_names_for_users([user.id for user in users])
+
+        self.assertEqual(len(verified_names), 5)
+
+    def test_get_verified_names_for_users_empty(self):
+        with self.assertNumQueries(0):
+            self.assertEqual(get_verified_names_for_users([]), {})
+
+    @ddt.data(False, True)
+    @override_settings(NAME_AFFIRMATION_USE_CURRENT_VERIFIED_NAME=True)
+    def test_get_verified_name_from_current(self, is_verified):
+        """
+        Test that the latest (approved) VerifiedName is read through the CurrentVerifiedName row.
+        """
+        self._create_verified_name(status=VerifiedNameStatus.APPROVED)
+        create_verified_name(self.user, 'pending name', self.PROFILE_NAME)
+
+        with self.assertNumQueries(1) as queries:
+            verified_name_obj = get_verified_name(self.user, is_verified)
+
+        self.assertIn('nameaffirmation_currentverifiedname', queries.captured_queries[0]['sql'])
+        self.assertEqual(verified_name_obj.verified_name, self.VERIFIED_NAME if is_verified else 'pending name')
+
+    @override_settings(NAME_AFFIRMATION_USE_CURRENT_VERIFIED_NAME=True)
+    def test_get_verified_name_from_current_missing_row(self):
+        """
+        Test that the history is used if the user has no CurrentVerifiedName row yet.
+        """
+        self._create_verified_name(status=VerifiedNameStatus.APPROVED)
+        CurrentVerifiedName.objects.filter(user=self.user).delete()
+
+        with self.assertNumQueries(2):
+            verified_name_obj = get_verified_name(self.user, True)
+
+        self.assertEqual(verified_name_obj.verified_name, self.VERIFIED_NAME)
+
     def test_get_verified_name_history(self):
         """
         Test that get_verified_name_history returns all of the user's VerifiedNames
@@ -272,6 +366,195 @@ class TestVerifiedNameAPI(TestCase):
         with self.assertRaises(VerifiedNameDoesNotExist):
             update_verified_name_status(self.user, True, self.VERIFICATION_ATTEMPT_ID)
 
+    @ddt.data(
+        (VerifiedNameStatus.PENDING, VerifiedNameStatus.SUBMITTED, False, True),
+        (VerifiedNameStatus.PENDING, VerifiedNameStatus.APPROVED, True, True),
+        (VerifiedNameStatus.SUBMITTED, VerifiedNameStatus.DENIED, True, True),
+        (VerifiedNameStatus.SUBMITTED, VerifiedNameStatus.SUBMITTED, False, False),
+        (VerifiedNameStatus.APPROVED, VerifiedNameStatus.SUBMITTED, False, True),
+        (VerifiedNameStatus.APPROVED, VerifiedNameStatus.SUBMITTED, True, False),
+        (VerifiedNameStatus.APPROVED, VerifiedNameStatus.DENIED, True, False),
+        (VerifiedNameStatus.SUBMITTED, VerifiedNameStatus.PENDING, True, False),
+    )
+    @ddt.unpack
+    def test_compare_and_set_status(self, current_status, status, enforce_lifecycle, expected_transition):
+        """
+        Test that the status is only changed, with a history record, if it is a transition that is allowed
+        """
+        verified_name = self._create_verified_name(status=current_status)
+
+        with patch('edx_name_affirmation.signals.VERIFIED_NAME_APPROVED.send') as mock_signal:
+            transitioned = compare_and_set_verified_name_status(verified_name, status, enforce_lifecycle)
+
+        self.assertEqual(transitioned, expected_transition)
+        self.assertEqual(verified_name.status, status if expected_transition else current_status)
+        self.assertEqual(VerifiedName.objects.get(id=verified_name.id).status, verified_name.status)
+        self.assertEqual(verified_name.history.count(), 2 if expected_transition else 1)
+        self.assertEqual(verified_name.history.first().status, verified_name.status)
+        if expected_transition and status == VerifiedNameStatus.APPROVED:
+            mock_signal.assert_called_once_with(
+                sender='name_affirmation', user_id=self.user.id, profile_name=self.PROFILE_NAME,
+            )
+        else:
+            mock_signal.assert_not_called()
+
+    def test_compare_and_set_status_keeps_concurrent_changes(self):
+        """
+        Test that only the status is written, and that the status is compared with the database
+        """
+        verified_name = self._create_verified_name()
+        # concurrent changes, which the VerifiedName object does not have
+        VerifiedName.objects.filter(id=verified_name.id).update(
+            verified_name='Jonathan X Doe', status=VerifiedNameStatus.APPROVED,
+        )
+
+        self.assertFalse(
+            compare_and_set_verified_name_status(verified_name, VerifiedNameStatus.SUBMITTED, enforce_lifecycle=True)
+        )
+        self.assertTrue(compare_and_set_verified_name_status(verified_name, VerifiedNameStatus.DENIED))
+
+        self.assertEqual(verified_name.verified_name, 'Jonathan X Doe')
+        verified_name = VerifiedName.objects.get(id=verified_name.id)
+        self.assertEqual(verified_name.verified_name, 'Jonathan X Doe')
+        self.assertEqual(verified_name.status, VerifiedNameStatus.DENIED)
+        self.assertEqual(get_verified_name(self.user).status, VerifiedNameStatus.DENIED)
+
+    def test_compare_and_set_status_num_queries(self):
+        verified_name = self._create_verified_name()
+        # 1 conditional update inside a savepoint
+        with self.assertNumQueries(3):
+            self.assertFalse(compare_and_set_verified_name_status(verified_name, VerifiedNameStatus.PENDING))
+
+    def test_update_status_enforce_lifecycle(self):
+        self._create_verified_name(
+            proctored_exam_attempt_id=self.PROCTORED_EXAM_ATTEMPT_ID, status=VerifiedNameStatus.DENIED,
+        )
+        verified_name = update_verified_name_status(
+            self.user, VerifiedNameStatus.SUBMITTED, proctored_exam_attempt_id=self.PROCTORED_EXAM_ATTEMPT_ID,
+            enforce_lifecycle=True,
+        )
+        self.assertEqual(verified_name.status, VerifiedNameStatus.DENIED)
+
+    @patch('edx_name_affirmation.api.log')
+    def test_update_status_not_updated_logs_current_status(self, mock_log):
+        """
+        Test that a status changed by another process since the lookup is logged and returned
+        """
+        self._create_verified_name(proctored_exam_attempt_id=self.PROCTORED_EXAM_ATTEMPT_ID)
+
+        def approve_concurrently(verified_name, status, enforce_lifecycle):
+            VerifiedName.objects.filter(id=verified_name.id).update(status=VerifiedNameStatus.APPROVED)
+            return compare_and_set_verified_name_status(verified_name, status, enforce_lifecycle)
+
+        with patch('edx_name_affirmation.api.compare_and_set_verified_name_status', approve_concurrently):
+            verified_name = update_verified_name_status(
+                self.user, VerifiedNameStatus.SUBMITTED, proctored_exam_attempt_id=self.PROCTORED_EXAM_ATTEMPT_ID,
+                enforce_lifecycle=True,
+            )
+
+        self.assertEqual(verified_name.status, VerifiedNameStatus.APPROVED)
+        self.assertIn('from status=approved.', mock_log.info.call_args.args[0])
+
+    @override_settings(NAME_AFFIRMATION_MAINTAIN_CURRENT_VERIFIED_NAME=True)
+    def test_bulk_update_status(self):
+        """
+        Test that the most recent VerifiedName for each attempt is updated, with a result for each attempt
+        """
+        other_user = User(username='bobsmith', email='bobsmith@test.com')
+        other_user.save()
+        older_name = VerifiedName.objects.create(
+            user=self.user, verified_name='Old Name', profile_name=self.PROFILE_NAME, proctored_exam_attempt_id=1,
+        )
+        newer_name = VerifiedName.objects.create(
+            user=self.user, verified_name=self.VERIFIED_NAME, profile_name=self.PROFILE_NAME,
+            proctored_exam_attempt_id=1, status=VerifiedNameStatus.SUBMITTED,
+        )
+        other_name = VerifiedName.objects.create(
+            user=other_user, verified_name=self.VERIFIED_NAME, profile_name='Bob', verification_attempt_id=2,
+        )
+        approved_name = VerifiedName.objects.create(
+            user=other_user, verified_name=self.VERIFIED_NAME, profile_name='Bob',
+            platform_verification_attempt_id=3, status=VerifiedNameStatus.APPROVED,
+        )
+
+        with patch('edx_name_affirmation.signals.VERIFIED_NAME_APPROVED.send') as mock_signal:
+            with self.captureOnCommitCallbacks(execute=True):
+                results = bulk_update_verified_name_status(
+                    VerifiedNameStatus.APPROVED,
+                    verification_attempt_ids=[2],
+                    proctored_exam_attempt_ids=[1, 1, 4],
+                    platform_verification_attempt_ids=[3],
+                )
+
+        self.assertEqual(results, [
+            {'verification_attempt_id': 2, 'verified_name_id': other_name.id, 'result': 'updated'},
+            {'proctored_exam_attempt_id': 1, 'verified_name_id': newer_name.id, 'result': 'updated'},
+            {'proctored_exam_attempt_id': 4, 'verified_name_id': None, 'result': 'not_found'},
+            {'platform_verification_attempt_id': 3, 'verified_name_id': approved_name.id, 'result': 'unchanged'},
+        ])
+        for verified_name, expected_status, expected_history_count in (
+            (older_name, VerifiedNameStatus.PENDING, 1),
+            (newer_name, VerifiedNameStatus.APPROVED, 2),
+            (other_name, VerifiedNameStatus.APPROVED, 2),
+            (approved_name, VerifiedNameStatus.APPROVED, 1),
+        ):
+            verified_name.refresh_from_db()
+            self.assertEqual(verified_name.status, expected_status)
+            self.assertEqual(verified_name.history.count(), expected_history_count)
+            self.assertEqual(verified_name.history.first().status, expected_status)
+        self.assertEqual(CurrentVerifiedName.objects.get(user=self.user).approved_verified_name, newer_name)
+        self.assertEqual(mock_signal.call_count, 2)
+
+    def test_bulk_update_status_enforce_lifecycle(self):
+        verified_name = self._create_verified_name(proctored_exam_attempt_id=1, status=VerifiedNameStatus.DENIED)
+        results = bulk_update_verified_name_status(
+            VerifiedNameStatus.SUBMITTED, proctored_exam_attempt_ids=[1], enforce_lifecycle=True,
+        )
+        self.assertEqual(results[0]['result'], 'unchanged')
+        verified_name.refresh_from_db()
+        self.assertEqual(verified_name.status, VerifiedNameStatus.DENIED)
+
+    def test_bulk_update_status_num_queries_per_chunk(self):
+        """
+        Test that each chunk of attempts is updated with the same number of queries, whatever its size
+        """
+        users = []
+        for i in range(4):
+            user = User(username=f'bulk_tester{i}', email=f'bulk_tester{i}@test.com')
+            user.save()
+            users.append(user)
+            VerifiedName.objects.create(
+                user=user, verified_name=self.VERIFIED_NAME, profile_name=self.PROFILE_NAME,
+                proctored_exam_attempt_id=i,
+            )
+
+        def count_queries(attempt_ids):
+            with CaptureQueriesContext(connection) as queries:
+                bulk_update_verified_name_status(VerifiedNameStatus.APPROVED, proctored_exam_attempt_ids=attempt_ids)
+            return len(queries.captured_queries)
+
+        self.assertEqual(count_queries([0]), count_queries([1, 2, 3]))
+        with patch('edx_name_affirmation.api.BULK_STATUS_UPDATE_CHUNK_SIZE', 1):
+            # a lookup and a transition check for each chunk of unchanged attempts, inside a savepoint
+            self.assertEqual(count_queries([1, 2, 3]), 12)
+
+    def test_bulk_update_status_lookup_per_field(self):
+        """
+        Test that the VerifiedNames are looked up with one IN clause per attempt ID field
+        """
+        with CaptureQueriesContext(connection) as queries:
+            bulk_update_verified_name_status(
+                VerifiedNameStatus.APPROVED,
+                proctored_exam_attempt_ids=[1, 2, 3],
+                platform_verification_attempt_ids=[4, 5],
+            )
+
+        # the lookup follows the savepoint of the chunk
+        lookup_sql = queries.captured_queries[1]['sql']
+        self.assertIn('"proctored_exam_attempt_id" IN (1, 2, 3)', lookup_sql)
+        self.assertIn('"platform_verification_attempt_id" IN (4, 5)', lookup_sql)
+        self.assertEqual(lookup_sql.count(' OR '), 1)
+
     def _create_verified_name(
         self, verification_attempt_id=None, proctored_exam_attempt_id=None,
         platform_verification_attempt_id=None, status=VerifiedNameStatus.PENDING,
@@ -307,6 +590,70 @@ class TestVerifiedNameAPI(TestCase):
         should_use_for_certs = should_use_verified_name_for_certs(self.user)
         self.assertEqual(should_use_for_certs, expected_value)
 
+    @ddt.data(False, True)
+    @override_settings(NAME_AFFIRMATION_USE_CURRENT_VERIFIED_NAME=True)
+    def test_should_use_verified_name_for_certs_from_current(self, use_verified_name_for_certs):
+        """
+        Test that the config value is read from the CurrentVerifiedName row.
+        """
+        VerifiedNameConfig.objects.create(user=self.user, use_verified_name_for_certs=use_verified_name_for_certs)
+
+        with self.assertNumQueries(1) as queries:
+            should_use_for_certs = should_use_verified_name_for_certs(self.user)
+
+        self.assertIn('nameaffirmation_currentverifiedname', queries.captured_queries[0]['sql'])
+        self.assertEqual(should_use_for_certs, use_verified_name_for_certs)
+
+    def test_should_use_verified_name_for_certs_for_users(self):
+        """
+        Test that config values are resolved in bulk and cached for later single-user lookups.
+        """
+        opted_in_user = User(username='optedin', email='optedin@test.com')
+        opted_in_user.save()
+        VerifiedNameConfig.objects.create(user=opted_in_user, use_verified_name_for_certs=False)
+        VerifiedNameConfig.objects.create(user=opted_in_user, use_verified_name_for_certs=True)
+
+        no_config_user = User(username='noconfig', email='noconfig@test.com')
+        no_config_user.save()
+
+        users = [self.user, opted_in_user, no_config_user]
+        with self.assertNumQueries(2):
+            result = should_use_verified_name_for_certs_for_users([user.id for user in users] + [99999])
+
+        self.assertEqual(result, {self.user.id: False, opted_in_user.id: True, no_config_user.id: False})
+
+        with self.assertNumQueries(0):
+            for user in users:
+                self.assertEqual(should_use_verified_name_for_certs(user), result[user.id])
+
+    def test_should_use_verified_name_for_certs_for_users_cache_invalidation(self):
+        """
+        Test that a new config entry still invalidates the cache primed by the bulk lookup.
+        """
+        should_use_verified_name_for_certs_for_users([self.user.id])
+        create_verified_name_config(self.user, use_verified_name_for_certs=True)
+        self.assertTrue(should_use_verified_name_for_certs(self.user))
+
+    def test_with_verified_name(self):
+        """
+        Test that a User QuerySet is annotated with the latest approved name and the certificate preference.
+        """
+        create_verified_name(self.user, 'old approved', self.PROFILE_NAME, status=VerifiedNameStatus.APPROVED)
+        create_verified_name(self.user, self.VERIFIED_NAME, self.PROFILE_NAME, status=VerifiedNameStatus.APPROVED)
+        create_verified_name(self.user, 'pending name', self.PROFILE_NAME)
+        create_verified_name_config(self.user, use_verified_name_for_certs=True)
+
+        no_names_user = User(username='nonames', email='nonames@test.com')
+        no_names_user.save()
+
+        with self.assertNumQueries(1):
+            users = list(with_verified_name(User.objects.order_by('id')).iterator())
+
+        self.assertEqual(
+            [(user.id, user.verified_name, user.use_verified_name_for_certs) for user in users],
+            [(self.user.id, self.VERIFIED_NAME, True), (no_names_user.id, None, False)],
+        )
+
     def test_create_verified_name_config(self):
         """
         Test that verified name config is created and updated successfully
@@ -0,0 +1,244 @@
+"""
+Tests for the cached verified name lookups
+"""
+
+import ddt
+from mock import MagicMock, patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from edx_name_affirmation import api
+from edx_name_affirmation.api import create_verified_name, get_verified_name, update_verified_name_status
+from edx_name_affirmation.cache import claim_idv_event, invalidate_verified_name_cache, record_idv_event
+from edx_name_affirmation.models import VerifiedName
+from edx_name_affirmation.statuses import VerifiedNameStatus
+from edx_name_affirmation.tasks import idv_update_verified_name_task, proctoring_update_verified_name_task
+
+User = get_user_model()
+
+
+@ddt.ddt
+@override_settings(NAME_AFFIRMATION_VERIFIED_NAME_CACHE_ENABLED=True)
+class VerifiedNameCacheTests(TestCase):
+    """
+    Tests for caching `get_verified_name` results
+    """
+    def setUp(self):
+        super().setUp()
+        self.user = User(username='tester', email='tester@test.com')
+        self.user.save()
+        self.verified_name_obj = VerifiedName.objects.create(
+            user=self.user,
+            verified_name='Jonathan Doe',
+            profile_name='Jon Doe',
+            proctored_exam_attempt_id=123,
+            status=VerifiedNameStatus.APPROVED,
+        )
+
+    def tearDown(self):
+        super().tearDown()
+        cache.clear()
+
+    @ddt.data(
+        (False, None),
+        (True, None),
+        (False, [VerifiedNameStatus.DENIED]),
+    )
+    @ddt.unpack
+    def test_cache_hit(self, is_verified, statuses_to_exclude):
+        with self.assertNumQueries(1):
+            get_verified_name(self.user, is_verified, statuses_to_exclude)
+
+        with self.assertNumQueries(0):
+            verified_name = get_verified_name(self.user, is_verified, statuses_to_exclude)
+
+        self.assertEqual(verified_name, self.verified_name_obj)
+
+    def test_variants_cached_separately(self):
+        VerifiedName.objects.create(user=self.user, verified_name='Pending Name', profile_name='Jon Doe')
+
+        self.assertEqual(get_verified_name(self.user).verified_name, 'Pending Name')
+        self.assertEqual(get_verified_name(self.user, is_verified=True).verified_name, 'Jonathan Doe')
+        self.assertEqual(
+            get_verified_name(self.user, statuses_to_exclude=[VerifiedNameStatus.PENDING]).verified_name,
+            'Jonathan Doe',
+        )
+
+    @override_settings(NAME_AFFIRMATION_VERIFIED_NAME_CACHE_ENABLED=False)
+    def test_cache_disabled(self):
+        get_verified_name(self.user)
+        with self.assertNumQueries(1):
+            get_verified_name(self.user)
+
+    def test_invalidated_on_save(self):
+        get_verified_name(self.user)
+        create_verified_name(self.user, 'New Name', 'Jon Doe')
+        self.assertEqual(get_verified_name(self.user).verified_name, 'New Name')
+
+    def test_invalidated_on_status_update(self):
+        get_verified_name(self.user, is_verified=True)
+        update_verified_name_status(self.user, VerifiedNameStatus.DENIED, proctored_exam_attempt_id=123)
+        self.assertIsNone(get_verified_name(self.user, is_verified=True))
+
+    def test_invalidated_on_delete(self):
+        get_verified_name(self.user)
+        self.verified_name_obj.delete()
+        self.assertIsNone(get_verified_name(self.user))
+
+    def test_invalidated_on_retire(self):
+        get_verified_name(self.user)
+        VerifiedName.retire_user(self.user.id)
+        self.assertIsNone(get_verified_name(self.user))
+
+    def test_invalidated_on_commit(self):
+        """
+        Results cached while the change was still uncommitted are dropped once it commits.
+        """
+        with self.captureOnCommitCallbacks() as callbacks:
+            create_verified_name(self.user, 'New Name', 'Jon Doe')
+            get_verified_name(self.user)
+
+        with self.assertNumQueries(0):
+            get_verified_name(self.user)
+
+        for callback in callbacks:
+            callback()
+
+        with self.assertNumQueries(1):
+            get_verified_name(self.user)
+
+    def test_invalidated_during_lookup(self):
+        """
+        A result read before an invalidation is not served once the invalidation happened.
+        """
+        filter_by_status = api._filter_by_status
+
+        def invalidate_after_read(*args):
+            verified_name_qs = filter_by_status(*args)
+            verified_name = verified_name_qs.first()
+            invalidate_verified_name_cache(self.user.id)
+            return MagicMock(first=MagicMock(return_value=verified_name))
+
+        with patch('edx_name_affirmation.api._filter_by_status', side_effect=invalidate_after_read):
+            get_verified_name(self.user)
+
+        with self.assertNumQueries(1):
+            get_verified_name(self.user)
+
+    def test_invalidation_is_per_user(self):
+        other_user = User(username='other', email='other@test.com')
+        other_user.save()
+        VerifiedName.objects.create(user=other_user, verified_name='Other Name', profile_name='Other')
+
+        get_verified_name(self.user)
+        get_verified_name(other_user)
+        invalidate_verified_name_cache(other_user.id)
+
+        with self.assertNumQueries(0):
+            get_verified_name(self.user)
+        with self.assertNumQueries(1):
+            get_verified_name(other_user)
+
+
+@override_settings(NAME_AFFIRMATION_VERIFIED_NAME_CACHE_ENABLED=True)
+class NoVerifiedNameCacheTests(TestCase):
+    """
+    Tests for caching the absence of a verified name
+    """
+    def setUp(self):
+        super().setUp()
+        self.user = User(username='tester', email='tester@test.com')
+        self.user.save()
+
+    def tearDown(self):
+        super().tearDown()
+        cache.clear()
+
+    def _assert_no_verified_name_cached(self):
+        self.assertIsNone(get_verified_name(self.user, is_verified=True))
+        with self.assertNumQueries(0):
+            self.assertIsNone(get_verified_name(self.user, is_verified=True))
+
+    def test_no_verified_name_cached(self):
+        self._assert_no_verified_name_cached()
+
+    def test_cleared_by_create_verified_name(self):
+        self._assert_no_verified_name_cached()
+        create_verified_name(self.user, 'Jonathan Doe', 'Jon Doe', status=VerifiedNameStatus.APPROVED)
+        self.assertEqual(get_verified_name(self.user, is_verified=True).verified_name, 'Jonathan Doe')
+
+    def test_cleared_by_idv_task(self):
+        self._assert_no_verified_name_cached()
+        idv_update_verified_name_task.delay(1234, self.user.id, VerifiedNameStatus.APPROVED, 'Jonathan Doe', 'Jon Doe')
+        self.assertEqual(get_verified_name(self.user, is_verified=True).verified_name, 'Jonathan Doe')
+
+    def test_cleared_by_proctoring_task(self):
+        self._assert_no_verified_name_cached()
+        proctoring_update_verified_name_task.delay(
+            1234, self.user.id, VerifiedNameStatus.APPROVED, 'Jonathan Doe', 'Jon Doe',
+        )
+        self.assertEqual(get_verified_name(self.user, is_verified=True).verified_name, 'Jonathan Doe')
+
+
+@override_settings(NAME_AFFIRMATION_IDV_EVENT_COALESCE_SECONDS=5)
+class IDVEventStateTests(TestCase):
+    """
+    Tests for recording and claiming coalesced IDV events
+    """
+    attempt_id = 123
+
+    def tearDown(self):
+        super().tearDown()
+        cache.clear()
+
+    def test_events_numbered(self):
+        self.assertEqual(
+            [record_idv_event(self.attempt_id, VerifiedNameStatus.PENDING) for _ in range(3)],
+            [1, 2, 3],
+        )
+        self.assertEqual(record_idv_event(self.attempt_id + 1, VerifiedNameStatus.PENDING), 1)
+
+    def test_events_recorded_with_one_cache_operation(self):
+        record_idv_event(self.attempt_id, VerifiedNameStatus.PENDING)
+
+        with patch('edx_name_affirmation.cache.cache.add') as mock_add:
+            self.assertEqual(record_idv_event(self.attempt_id, VerifiedNameStatus.APPROVED), 2)
+        mock_add.assert_not_called()
+
+    def test_newest_event_claimed(self):
+        pending = record_idv_event(self.attempt_id, VerifiedNameStatus.PENDING)
+        submitted = record_idv_event(self.attempt_id, VerifiedNameStatus.SUBMITTED)
+        resubmitted = record_idv_event(self.attempt_id, VerifiedNameStatus.SUBMITTED)
+
+        self.assertEqual(claim_idv_event(self.attempt_id, pending, VerifiedNameStatus.PENDING), (False, 0))
+        self.assertEqual(claim_idv_event(self.attempt_id, submitted, VerifiedNameStatus.SUBMITTED), (False, 0))
+        self.assertEqual(claim_idv_event(self.attempt_id, resubmitted, VerifiedNameStatus.SUBMITTED), (True, 2))
+
+    def test_out_of_order_event_not_claimed(self):
+        """
+        An event that arrives after an event further along the lifecycle is never applied, whichever
+        of their tasks runs first.
+        """
+        approved = record_idv_event(self.attempt_id, VerifiedNameStatus.APPROVED)
+        pending = record_idv_event(self.attempt_id, VerifiedNameStatus.PENDING)
+
+        self.assertEqual(claim_idv_event(self.attempt_id, pending, VerifiedNameStatus.PENDING), (False, 0))
+        self.assertEqual(claim_idv_event(self.attempt_id, approved, VerifiedNameStatus.APPROVED), (True, 1))
+
+    def test_events_counted_since_last_claim(self):
+        first = record_idv_event(self.attempt_id, VerifiedNameStatus.PENDING)
+        self.assertEqual(claim_idv_event(self.attempt_id, first, VerifiedNameStatus.PENDING), (True, 0))
+
+        record_idv_event(self.attempt_id, VerifiedNameStatus.SUBMITTED)
+        approved = record_idv_event(self.attempt_id, VerifiedNameStatus.APPROVED)
+        self.assertEqual(claim_idv_event(self.attempt_id, approved, VerifiedNameStatus.APPROVED), (True, 1))
+
+    def test_claimed_if_state_evicted(self):
+        sequence = record_idv_event(self.attempt_id, VerifiedNameStatus.PENDING)
+        record_idv_event(self.attempt_id, VerifiedNameStatus.APPROVED)
+        cache.clear()
+
+        self.assertEqual(claim_idv_event(self.attempt_id, sequence, VerifiedNameStatus.PENDING), (True, 0))
+        self.assertEqual(record_idv_event(self.attempt_id, VerifiedNameStatus.PENDING), 1)
@@ -0,0 +1,238 @@
+"""
+Tests for Name Affirmation management commands
+"""
+
+from mock import MagicMock, patch
+
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.test import TestCase, override_settings
+
+from edx_name_affirmation.models import (
+    CurrentVerifiedName,
+    DeadLetterTask,
+    TaskOutboxEntry,
+    VerifiedName,
+    VerifiedNameConfig
+)
+from edx_name_affirmation.statuses import VerifiedNameStatus
+
+User = get_user_model()
+
+COMMAND_MODULE = 'edx_name_affirmation.management.commands.backfill_verified_name_attempt_status'
+REPLAY_COMMAND_MODULE = 'edx_name_affirmation.management.commands.replay_dead_letter_tasks'
+
+
+class BackfillVerifiedNameAttemptStatusTests(TestCase):
+    """
+    Tests for the backfill_verified_name_attempt_status management command
+    """
+    def setUp(self):
+        self.user = User(username='tester', email='tester@test.com')
+        self.user.save()
+
+    def _create_verified_name(self, **kwargs):
+        return VerifiedName.objects.create(
+            user=self.user, verified_name='Jonathan Doe', profile_name='Jon Doe', **kwargs
+        )
+
+    def _mock_attempt_model(self, statuses):
+        """
+        Return a mock attempt model whose in_bulk lookup returns the given statuses.
+        """
+        def in_bulk(attempt_ids):
+            return {
+                attempt_id: MagicMock(status=statuses[attempt_id])
+                for attempt_id in attempt_ids if attempt_id in statuses
+            }
+        mock_model = MagicMock()
+        mock_model.objects.only.return_value.in_bulk.side_effect = in_bulk
+        return mock_model
+
+    def test_backfill(self):
+        platform_names = [self._create_verified_name(platform_verification_attempt_id=i) for i in range(1, 6)]
+        legacy_name = self._create_verified_name(verification_attempt_id=10)
+        final_name = self._create_verified_name(platform_verification_attempt_id=20, attempt_status='denied')
+        outdated_name = self._create_verified_name(platform_verification_attempt_id=21, attempt_status='pending')
+        missing_attempt_name = self._create_verified_name(platform_verification_attempt_id=30)
+        proctoring_name = self._create_verified_name(proctored_exam_attempt_id=40)
+
+        platform_model = self._mock_attempt_model(
+            {1: 'approved', 2: 'approved', 3: 'pending', 4: 'denied', 5: 'created', 20: 'approved', 21: 'approved'}
+        )
+        with patch(f'{COMMAND_MODULE}.PlatformVerificationAttempt', platform_model):
+            call_command('backfill_verified_name_attempt_status', batch_size=2)
+
+        # one lookup per batch
+        self.assertEqual(platform_model.objects.only.return_value.in_bulk.call_count, 4)
+
+        def attempt_status(verified_name):
+            verified_name.refresh_from_db()
+            return verified_name.attempt_status
+
+        self.assertEqual(
+            [attempt_status(verified_name) for verified_name in platform_names],
+            ['approved', 'approved', 'pending', 'denied', 'created'],
+        )
+        self.assertIsNone(attempt_status(legacy_name))
+        self.assertEqual(attempt_status(final_name), 'denied')
+        self.assertEqual(attempt_status(outdated_name), 'approved')
+        self.assertIsNone(attempt_status(missing_attempt_name))
+        self.assertIsNone(attempt_status(proctoring_name))
+
+
+@override_settings(NAME_AFFIRMATION_MAINTAIN_CURRENT_VERIFIED_NAME=True)
+class CurrentVerifiedNameCommandTests(TestCase):
+    """
+    Tests for the rebuild_current_verified_names and check_current_verified_names management commands
+    """
+    def setUp(self):
+        self.users = []
+        for i in range(3):
+            user = User(username=f'tester{i}', email=f'tester{i}@test.com')
+            user.save()
+            self.users.append(user)
+
+        self.approved_name = VerifiedName.objects.create(
+            user=self.users[0], verified_name='Jonathan Doe', profile_name='Jon Doe',
+            status=VerifiedNameStatus.APPROVED,
+        )
+        VerifiedNameConfig.objects.create(user=self.users[1], use_verified_name_for_certs=True)
+
+    def test_check_up_to_date(self):
+        call_command('check_current_verified_names', batch_size=2)
+
+    def test_rebuild(self):
+        CurrentVerifiedName.objects.all().delete()
+        with self.assertRaises(CommandError):
+            call_command('check_current_verified_names', batch_size=2)
+
+        call_command('rebuild_current_verified_names', batch_size=2)
+
+        self.assertEqual(
+            list(CurrentVerifiedName.objects.order_by('user_id').values_list(
+                'user_id', 'latest_verified_name_id', 'approved_verified_name_id', 'use_verified_name_for_certs',
+            )),
+            [
+                (self.users[0].id, self.approved_name.id, self.approved_name.id, False),
+                (self.users[1].id, None, None, True),
+            ],
+        )
+        call_command('check_current_verified_names', batch_size=2)
+
+    def test_rebuild_out_of_date_row(self):
+        CurrentVerifiedName.objects.filter(user=self.users[1]).update(use_verified_name_for_certs=False)
+        with self.assertRaises(CommandError):
+            call_command('check_current_verified_names')
+
+        call_command('rebuild_current_verified_names')
+
+        self.assertTrue(CurrentVerifiedName.objects.get(user=self.users[1]).use_verified_name_for_certs)
+
+
+class RelayTaskOutboxCommandTests(TestCase):
+    """
+    Tests for the relay_task_outbox management command
+    """
+    @patch('edx_name_affirmation.handlers.delete_verified_names_task.delay')
+    def test_relay(self, mock_delay):
+        for attempt_id in range(1, 6):
+            TaskOutboxEntry.objects.create(dispatcher='delete_verified_name', payload=[attempt_id, None])
+
+        call_command('relay_task_outbox', batch_size=2)
+
+        self.assertEqual(
+            [call.kwargs['platform_verification_attempt_ids'] for call in mock_delay.call_args_list],
+            [[1, 2], [3, 4], [5]],
+        )
+        self.assertFalse(TaskOutboxEntry.objects.exists())
+
+
+class ReplayDeadLetterTasksCommandTests(TestCase):
+    """
+    Tests for the replay_dead_letter_tasks management command
+    """
+    def setUp(self):
+        self.user = User(username='tester', email='tester@test.com')
+        self.user.save()
+        self.verified_name = VerifiedName.objects.create(
+            user=self.user, verified_name='Jonathan Doe', profile_name='Jon Doe', platform_verification_attempt_id=1,
+        )
+
+    def _create_dead_letter(self, task_name='edx_name_affirmation.tasks.delete_verified_name_task', args=None):
+        return DeadLetterTask.objects.create(
+            task_name=task_name, args=args or [1, None], exception="OperationalError('mock error')",
+        )
+
+    def test_replay(self):
+        self._create_dead_letter()
+
+        call_command('replay_dead_letter_tasks')
+
+        self.assertFalse(VerifiedName.objects.exists())
+        self.assertFalse(DeadLetterTask.objects.exists())
+
+    def test_replay_failed_again(self):
+        dead_letter = self._create_dead_letter(
+            task_name='edx_name_affirmation.tasks.proctoring_update_verified_name_task',
+            # the task is missing arguments, so it fails with a TypeError
+            args=[2],
+        )
+
+        call_command('replay_dead_letter_tasks')
+
+        # the task failed again, so it was stored as a new dead letter
+        new_dead_letter = DeadLetterTask.objects.get()
+        self.assertNotEqual(new_dead_letter.id, dead_letter.id)
+        self.assertEqual(new_dead_letter.args, dead_letter.args)
+
+    def test_dry_run(self):
+        self._create_dead_letter()
+
+        call_command('replay_dead_letter_tasks', dry_run=True)
+
+        self.assertTrue(VerifiedName.objects.exists())
+        self.assertTrue(DeadLetterTask.objects.exists())
+
+    @patch(f'{REPLAY_COMMAND_MODULE}.log')
+    def test_dry_run_unknown_task(self, mock_log):
+        self._create_dead_letter()
+        self._create_dead_letter(task_name='edx_name_affirmation.tasks.unknown_task')
+
+        call_command('replay_dead_letter_tasks', dry_run=True)
+
+        mock_log.info.assert_called_with('Found %(num_replayed)s dead letter tasks to replay', {'num_replayed': 1})
+
+    def test_unknown_task_skipped(self):
+        self._create_dead_letter(task_name='edx_name_affirmation.tasks.unknown_task')
+
+        call_command('replay_dead_letter_tasks')
+
+        self.assertTrue(DeadLetterTask.objects.exists())
+
+    def test_task_name_filter(self):
+        self._create_dead_letter()
+        self._create_dead_letter(task_name='edx_name_affirmation.tasks.idv_update_verified_names_task', args=[[]])
+
+        call_command('replay_dead_letter_tasks', task_name='edx_name_affirmation.tasks.idv_update_verified_names_task')
+
+        self.assertTrue(VerifiedName.objects.exists())
+        self.assertEqual(DeadLetterTask.objects.get().task_name, 'edx_name_affirmation.tasks.delete_verified_name_task')
+
+    @patch(f'{REPLAY_COMMAND_MODULE}.time.sleep')
+    @patch('edx_name_affirmation.tasks.delete_verified_name_task.apply_async')
+    def test_replay_published_in_batches(self, mock_apply_async, mock_sleep):
+        """
+        The tasks are published to the Celery workers, which apply the usual retries and backoff
+        """
+        for attempt_id in range(5):
+            self._create_dead_letter(args=[attempt_id, None])
+
+        call_command('replay_dead_letter_tasks', batch_size=2, max_per_second=10)
+
+        self.assertEqual(
+            [call.kwargs for call in mock_apply_async.call_args_list],
+            [{'args': [attempt_id, None], 'kwargs': {}} for attempt_id in range(5)],
+        )
+        self.assertEqual(mock_sleep.call_count, 4)
+        self.assertFalse(DeadLetterTask.objects.exists())
@@ -3,7 +3,7 @@ Tests for Name Affirmation signal handlers
 """
 
 import ddt
-from mock import MagicMock, patch
+from mock import MagicMock, call, patch
 from openedx_events.learning.data import UserData, UserPersonalData, VerificationAttemptData
 from openedx_events.learning.signals import (
     IDV_ATTEMPT_APPROVED,
@@ -13,16 +13,20 @@ from openedx_events.learning.signals import (
 )
 
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.test import TestCase, override_settings
 
 from edx_name_affirmation.handlers import (
     handle_idv_event,
     platform_verification_delete_handler,
     proctoring_attempt_handler,
-    proctoring_delete_handler
+    proctoring_delete_handler,
+    relay_task_outbox
 )
-from edx_name_affirmation.models import VerifiedName
+from edx_name_affirmation.models import TaskOutboxEntry, VerifiedName
 from edx_name_affirmation.statuses import VerifiedNameStatus
+from edx_name_affirmation.tasks import idv_update_verified_name_task
 
 User = get_user_model()
 
@@ -74,6 +78,32 @@ class PostSaveVerifiedNameTests(SignalTestCase):
                     sender='name_affirmation', user_id=self.user.id, profile_name=self.profile_name
                 )
 
+    def test_post_save_already_approved(self):
+        """
+        Test that VERIFIED_NAME_APPROVED is not sent again when an approved verified name is saved.
+        """
+        with patch('edx_name_affirmation.signals.VERIFIED_NAME_APPROVED.send') as mock_signal:
+            verified_name_obj = VerifiedName.objects.create(
+                user=self.user,
+                verified_name='Jonathan Doe',
+                profile_name=self.profile_name,
+                status=VerifiedNameStatus.APPROVED,
+            )
+            mock_signal.assert_called_once_with(
+                sender='name_affirmation', user_id=self.user.id, profile_name=self.profile_name
+            )
+
+            verified_name_obj.attempt_status = 'approved'
+            verified_name_obj.save()
+            VerifiedName.objects.get(id=verified_name_obj.id).save()
+            mock_signal.assert_called_once()
+
+            verified_name_obj.status = VerifiedNameStatus.DENIED
+            verified_name_obj.save()
+            verified_name_obj.status = VerifiedNameStatus.APPROVED
+            verified_name_obj.save()
+            self.assertEqual(mock_signal.call_count, 2)
+
 
 @ddt.ddt
 class IDVSignalTests(SignalTestCase):
@@ -81,6 +111,11 @@ class IDVSignalTests(SignalTestCase):
     Test for idv_attempt_handler
     """
     def _handle_idv_event(self, idv_signal, attempt_id):
+        """ Call IDV handler with a mock event, and commit """
+        with self.captureOnCommitCallbacks(execute=True):
+            self._send_idv_event(idv_signal, attempt_id)
+
+    def _send_idv_event(self, idv_signal, attempt_id):
         """ Call IDV handler with a mock event """
         user_data = UserData(
             id=self.user.id,
@@ -114,6 +149,7 @@ class IDVSignalTests(SignalTestCase):
         self.assertEqual(verified_name.platform_verification_attempt_id, self.idv_attempt_id)
         self.assertEqual(verified_name.verified_name, self.verified_name)
         self.assertEqual(verified_name.profile_name, self.profile_name)
+        self.assertEqual(verified_name.attempt_status, 'mock-platform-status')
 
     @ddt.data(
         (IDV_ATTEMPT_CREATED, VerifiedNameStatus.PENDING),
@@ -124,31 +160,66 @@ class IDVSignalTests(SignalTestCase):
     @ddt.unpack
     def test_idv_update_multiple_verified_names(self, idv_signal, expected_status):
         """
-        If a VerifiedName(s) for a user and verified name exist, ensure that it is updated properly
+        If multiple VerifiedNames for a user and verified name exist, ensure that only the one
+        associated with the attempt is updated
         """
         # create multiple VerifiedNames
-        VerifiedName.objects.create(
+        unlinked_names = [
+            VerifiedName.objects.create(
+                user=self.user,
+                verified_name=self.verified_name,
+                profile_name=self.profile_name,
+                status=VerifiedNameStatus.SUBMITTED,
+            )
+            for _ in range(2)
+        ]
+        linked_name = VerifiedName.objects.create(
             user=self.user,
             verified_name=self.verified_name,
             profile_name=self.profile_name,
+            platform_verification_attempt_id=self.idv_attempt_id,
+            status=VerifiedNameStatus.SUBMITTED,
         )
-        VerifiedName.objects.create(
+
+        self._handle_idv_event(idv_signal, self.idv_attempt_id)
+
+        linked_name.refresh_from_db()
+        self.assertEqual(linked_name.status, expected_status)
+        self.assertEqual(linked_name.attempt_status, 'mock-platform-status')
+        for verified_name in unlinked_names:
+            verified_name.refresh_from_db()
+            self.assertIsNone(verified_name.platform_verification_attempt_id)
+            self.assertIsNone(verified_name.attempt_status)
+
+    def test_idv_links_most_recent_verified_name(self):
+        """
+        If no VerifiedName is associated with the attempt yet, the most recent unlinked VerifiedName
+        with the same name is associated with it
+        """
+        older_name = VerifiedName.objects.create(
             user=self.user,
             verified_name=self.verified_name,
             profile_name=self.profile_name,
         )
-        VerifiedName.objects.create(
+        newer_name = VerifiedName.objects.create(
             user=self.user,
             verified_name=self.verified_name,
             profile_name=self.profile_name,
-            platform_verification_attempt_id=self.idv_attempt_id
+        )
+        VerifiedName.objects.create(
+            user=self.user,
+            verified_name='Other Name',
+            profile_name=self.profile_name,
         )
 
-        self._handle_idv_event(idv_signal, self.idv_attempt_id)
+        self._handle_idv_event(IDV_ATTEMPT_APPROVED, self.idv_attempt_id)
 
-        # check that the attempt id and status have been updated for all three VerifiedNames
-        self.assertEqual(len(VerifiedName.objects.filter(platform_verification_attempt_id=self.idv_attempt_id)), 3)
-        self.assertEqual(len(VerifiedName.objects.filter(status=expected_status)), 3)
+        verified_name = VerifiedName.objects.get(platform_verification_attempt_id=self.idv_attempt_id)
+        self.assertEqual(verified_name, newer_name)
+        self.assertEqual(verified_name.status, VerifiedNameStatus.APPROVED)
+        older_name.refresh_from_db()
+        self.assertIsNone(older_name.platform_verification_attempt_id)
+        self.assertEqual(older_name.status, VerifiedNameStatus.PENDING)
 
     def test_idv_create_with_existing_verified_names(self):
         """
@@ -259,20 +330,116 @@ class IDVSignalTests(SignalTestCase):
             else:
                 mock_signal.assert_not_called()
 
-    @patch('edx_name_affirmation.tasks.delete_verified_name_task.delay')
+    @patch('edx_name_affirmation.tasks.delete_verified_names_task.delay')
     def test_idv_delete_handler(self, mock_task):
         """
         Test that a celery task is triggered if an idv delete signal is received
         """
         mock_idv_object = MagicMock()
         mock_idv_object.id = 'abcdef'
-        platform_verification_delete_handler(
-            {},
-            mock_idv_object,
-            '',
+        with self.captureOnCommitCallbacks(execute=True):
+            platform_verification_delete_handler(
+                {},
+                mock_idv_object,
+                '',
+            )
+            mock_task.assert_not_called()
+
+        mock_task.assert_called_with(platform_verification_attempt_ids=[mock_idv_object.id], proctoring_attempt_ids=[])
+
+    def test_idv_handler_num_queries(self):
+        """
+        The handler does not query the database, and only triggers the task once the transaction commits
+        """
+        with self.captureOnCommitCallbacks() as callbacks:
+            with self.assertNumQueries(0):
+                self._send_idv_event(IDV_ATTEMPT_APPROVED, self.idv_attempt_id)
+        self.assertFalse(VerifiedName.objects.exists())
+
+        for callback in callbacks:
+            callback()
+        verified_name = VerifiedName.objects.get(platform_verification_attempt_id=self.idv_attempt_id)
+        self.assertEqual(verified_name.status, VerifiedNameStatus.APPROVED)
+
+    def test_idv_create_with_pending_name_change(self):
+        """
+        If the user has a pending name change, it is used as the profile name of a created VerifiedName
+        """
+        with patch.object(User, 'pending_name_change', 'Pending Name', create=True):
+            self._handle_idv_event(IDV_ATTEMPT_CREATED, self.idv_attempt_id)
+
+        verified_name = VerifiedName.objects.get(platform_verification_attempt_id=self.idv_attempt_id)
+        self.assertEqual(verified_name.profile_name, 'Pending Name')
+
+
+@override_settings(NAME_AFFIRMATION_IDV_EVENT_COALESCE_SECONDS=5)
+class IDVEventCoalescingTests(IDVSignalTests):
+    """
+    Tests for idv_attempt_handler when IDV events are coalesced. This also runs every IDVSignalTests
+    test with coalescing enabled.
+    """
+    def tearDown(self):
+        super().tearDown()
+        cache.clear()
+
+    def _handle_idv_events(self, idv_signals):
+        """
+        Handle the given IDV events for the same attempt, returning the (args, kwargs) of each task that was queued
+        """
+        with patch('edx_name_affirmation.handlers.idv_update_verified_name_task.apply_async') as mock_apply_async:
+            for idv_signal in idv_signals:
+                self._handle_idv_event(idv_signal, self.idv_attempt_id)
+
+        for apply_async_call in mock_apply_async.call_args_list:
+            self.assertEqual(apply_async_call.kwargs, {'countdown': 5})
+        return [apply_async_call.args for apply_async_call in mock_apply_async.call_args_list]
+
+    @patch('edx_name_affirmation.tasks.set_custom_attribute')
+    def test_burst_applies_newest_status(self, mock_set_custom_attribute):
+        queued_tasks = self._handle_idv_events([IDV_ATTEMPT_CREATED, IDV_ATTEMPT_PENDING, IDV_ATTEMPT_APPROVED])
+        self.assertEqual(len(queued_tasks), 3)
+
+        with patch('edx_name_affirmation.signals.VERIFIED_NAME_APPROVED.send') as mock_signal:
+            for args, kwargs in queued_tasks:
+                idv_update_verified_name_task.apply(args, kwargs)
+
+        verified_name = VerifiedName.objects.get(user=self.user)
+        self.assertEqual(verified_name.status, VerifiedNameStatus.APPROVED)
+        self.assertEqual(verified_name.platform_verification_attempt_id, self.idv_attempt_id)
+        self.assertEqual(verified_name.history.count(), 1)
+        mock_signal.assert_called_once()
+        mock_set_custom_attribute.assert_any_call('name_affirmation_idv_events_coalesced', 2)
+        self.assertEqual(
+            mock_set_custom_attribute.call_args_list.count(call('name_affirmation_idv_event_superseded', True)), 2
         )
 
-        mock_task.assert_called_with(mock_idv_object.id, None)
+    def test_out_of_order_event_ignored(self):
+        queued_tasks = self._handle_idv_events([IDV_ATTEMPT_CREATED, IDV_ATTEMPT_DENIED, IDV_ATTEMPT_PENDING])
+        self.assertEqual(len(queued_tasks), 3)
+
+        # run the queued tasks in reverse order as well
+        for args, kwargs in reversed(queued_tasks):
+            idv_update_verified_name_task.apply(args, kwargs)
+
+        verified_name = VerifiedName.objects.get(user=self.user)
+        self.assertEqual(verified_name.status, VerifiedNameStatus.DENIED)
+
+    def test_late_event_ignored_after_apply(self):
+        for args, kwargs in self._handle_idv_events([IDV_ATTEMPT_APPROVED]):
+            idv_update_verified_name_task.apply(args, kwargs)
+
+        for args, kwargs in self._handle_idv_events([IDV_ATTEMPT_PENDING]):
+            idv_update_verified_name_task.apply(args, kwargs)
+        self.assertEqual(VerifiedName.objects.get(user=self.user).status, VerifiedNameStatus.APPROVED)
+
+    def test_applies_if_state_evicted(self):
+        queued_tasks = self._handle_idv_events([IDV_ATTEMPT_PENDING])
+        cache.clear()
+
+        for args, kwargs in queued_tasks:
+            idv_update_verified_name_task.apply(args, kwargs)
+
+        self.assertEqual(VerifiedName.objects.get(user=self.user).status, VerifiedNameStatus.SUBMITTED)
 
 
 @ddt.ddt
@@ -280,6 +447,10 @@ class ProctoringSignalTests(SignalTestCase):
     """
     Test for proctoring_attempt_handler
     """
+    def _handle_proctoring_event(self, *args):
+        """ Call proctoring handler, and commit """
+        with self.captureOnCommitCallbacks(execute=True):
+            proctoring_attempt_handler(*args)
 
     @ddt.data(
         ('created', VerifiedNameStatus.PENDING),
@@ -302,7 +473,7 @@ class ProctoringSignalTests(SignalTestCase):
         )
         object_id = verified_name.id
 
-        proctoring_attempt_handler(
+        self._handle_proctoring_event(
             self.proctoring_attempt_id,
             self.user.id,
             proctoring_status,
@@ -328,7 +499,7 @@ class ProctoringSignalTests(SignalTestCase):
         If we receive a proctoring update with an error status, ensure that later status updates are handled as expected
         """
 
-        proctoring_attempt_handler(
+        self._handle_proctoring_event(
             self.proctoring_attempt_id,
             self.user.id,
             'error',
@@ -344,7 +515,7 @@ class ProctoringSignalTests(SignalTestCase):
         self.assertEqual(verified_name.status, VerifiedNameStatus.DENIED)
 
         # update status
-        proctoring_attempt_handler(
+        self._handle_proctoring_event(
             self.proctoring_attempt_id,
             self.user.id,
             proctoring_status,
@@ -365,7 +536,7 @@ class ProctoringSignalTests(SignalTestCase):
         """
         Test that if no verified name exists for the name or attempt id, create one
         """
-        proctoring_attempt_handler(
+        self._handle_proctoring_event(
             self.proctoring_attempt_id,
             self.user.id,
             'created',
@@ -388,7 +559,7 @@ class ProctoringSignalTests(SignalTestCase):
         record.
         """
 
-        proctoring_attempt_handler(
+        self._handle_proctoring_event(
             self.proctoring_attempt_id,
             self.user.id,
             'created',
@@ -412,7 +583,7 @@ class ProctoringSignalTests(SignalTestCase):
         """
         Test that a celery task is not triggered if the exam does not contain an id verification event
         """
-        proctoring_attempt_handler(
+        self._handle_proctoring_event(
             self.proctoring_attempt_id,
             self.user.id,
             'created',
@@ -444,7 +615,7 @@ class ProctoringSignalTests(SignalTestCase):
         )
 
         additional_attempt_id = self.proctoring_attempt_id + 1
-        proctoring_attempt_handler(
+        self._handle_proctoring_event(
             additional_attempt_id,
             self.user.id,
             'created',
@@ -482,7 +653,7 @@ class ProctoringSignalTests(SignalTestCase):
         """
         Test that a celery task is not triggered if a non-relevant status is received
         """
-        proctoring_attempt_handler(
+        self._handle_proctoring_event(
             self.proctoring_attempt_id,
             self.user.id,
             status,
@@ -495,24 +666,27 @@ class ProctoringSignalTests(SignalTestCase):
 
         mock_task.assert_not_called()
 
-    @patch('edx_name_affirmation.tasks.delete_verified_name_task.delay')
+    @patch('edx_name_affirmation.tasks.delete_verified_names_task.delay')
     def test_proctoring_delete_handler(self, mock_task):
         """
         Test that a celery task is triggered if an idv delete signal is received
         """
         mock_proctoring_object = MagicMock()
         mock_proctoring_object.id = 'abcdef'
-        proctoring_delete_handler(
-            {},
-            mock_proctoring_object,
-            '',
-        )
+        with self.captureOnCommitCallbacks(execute=True):
+            proctoring_delete_handler(
+                {},
+                mock_proctoring_object,
+                '',
+            )
 
-        mock_task.assert_called_with(None, mock_proctoring_object.id)
+        mock_task.assert_called_with(
+            platform_verification_attempt_ids=[], proctoring_attempt_ids=[mock_proctoring_object.id],
+        )
 
     def test_proctoring_multiple_approved(self):
         # create task for submitted exam
-        proctoring_attempt_handler(
+        self._handle_proctoring_event(
             self.proctoring_attempt_id,
             self.user.id,
             'submitted',
@@ -525,7 +699,7 @@ class ProctoringSignalTests(SignalTestCase):
 
         # create task for submitted on another exam
         other_attempt_id = self.proctoring_attempt_id + 1
-        proctoring_attempt_handler(
+        self._handle_proctoring_event(
             other_attempt_id,
             self.user.id,
             'submitted',
@@ -540,7 +714,7 @@ class ProctoringSignalTests(SignalTestCase):
         self.assertEqual(len(VerifiedName.objects.filter(status=VerifiedNameStatus.SUBMITTED)), 2)
 
         # create task for approved exam 1
-        proctoring_attempt_handler(
+        self._handle_proctoring_event(
             self.proctoring_attempt_id,
             self.user.id,
             'verified',
@@ -552,7 +726,7 @@ class ProctoringSignalTests(SignalTestCase):
         )
 
         # create task for approved exam 2
-        proctoring_attempt_handler(
+        self._handle_proctoring_event(
             other_attempt_id,
             self.user.id,
             'verified',
@@ -565,3 +739,327 @@ class ProctoringSignalTests(SignalTestCase):
 
         self.assertEqual(len(VerifiedName.objects.filter()), 2)
         self.assertEqual(len(VerifiedName.objects.filter(status=VerifiedNameStatus.APPROVED)), 2)
+
+
+class AttemptDeleteHandlerTests(SignalTestCase):
+    """
+    Tests for batching the VerifiedName deletes of the attempt delete handlers
+    """
+    @override_settings(NAME_AFFIRMATION_DELETE_BATCH_SIZE=2)
+    @patch('edx_name_affirmation.tasks.delete_verified_names_task.delay')
+    def test_delete_handlers_batched(self, mock_task):
+        """
+        Test that the deletes of a transaction are sent together once it commits, in batches
+        """
+        with self.captureOnCommitCallbacks(execute=True):
+            for attempt_id in range(1, 4):
+                platform_verification_delete_handler({}, MagicMock(id=attempt_id), '')
+            proctoring_delete_handler({}, MagicMock(id=self.proctoring_attempt_id), '')
+            mock_task.assert_not_called()
+
+        self.assertEqual(mock_task.call_args_list, [
+            call(platform_verification_attempt_ids=[1, 2], proctoring_attempt_ids=[]),
+            call(platform_verification_attempt_ids=[3], proctoring_attempt_ids=[self.proctoring_attempt_id]),
+        ])
+
+    @patch('edx_name_affirmation.tasks.delete_verified_names_task.delay')
+    def test_delete_handler_rolled_back(self, mock_task):
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    proctoring_delete_handler({}, MagicMock(id=self.proctoring_attempt_id), '')
+                    raise IntegrityError
+            except IntegrityError:
+                pass
+        mock_task.assert_not_called()
+
+    @patch('edx_name_affirmation.tasks.delete_verified_names_task.delay')
+    def test_delete_handler_savepoint_rolled_back(self, mock_task):
+        """
+        Test that the deletes of a rolled back savepoint are not sent with the rest of the transaction
+        """
+        with self.captureOnCommitCallbacks(execute=True):
+            platform_verification_delete_handler({}, MagicMock(id=1), '')
+            try:
+                with transaction.atomic():
+                    platform_verification_delete_handler({}, MagicMock(id=2), '')
+                    raise IntegrityError
+            except IntegrityError:
+                pass
+            platform_verification_delete_handler({}, MagicMock(id=3), '')
+
+        mock_task.assert_called_once_with(platform_verification_attempt_ids=[1, 3], proctoring_attempt_ids=[])
+
+    @patch('edx_name_affirmation.tasks.delete_verified_names_task.delay')
+    def test_delete_handler_savepoint_released(self, mock_task):
+        """
+        Test that the deletes of a released savepoint are sent once the transaction commits
+        """
+        with self.captureOnCommitCallbacks(execute=True):
+            platform_verification_delete_handler({}, MagicMock(id=1), '')
+            with transaction.atomic():
+                platform_verification_delete_handler({}, MagicMock(id=2), '')
+                platform_verification_delete_handler({}, MagicMock(id=3), '')
+            mock_task.assert_not_called()
+
+        self.assertEqual(mock_task.call_args_list, [
+            call(platform_verification_attempt_ids=[1], proctoring_attempt_ids=[]),
+            call(platform_verification_attempt_ids=[2, 3], proctoring_attempt_ids=[]),
+        ])
+
+
+@override_settings(
+    NAME_AFFIRMATION_PROCTORING_EVENT_DISPATCH='batched', NAME_AFFIRMATION_PROCTORING_EVENT_BATCH_SIZE=2,
+    NAME_AFFIRMATION_TASK_OUTBOX_ENABLED=True,
+)
+class ProctoringEventBatchingTests(ProctoringSignalTests):
+    """
+    Tests for proctoring_attempt_handler when proctoring events are dispatched in batches by the task outbox
+    relay. This also runs every ProctoringSignalTests test with batched dispatch.
+    """
+    def _relay(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            return relay_task_outbox()
+
+    def _handle_proctoring_event(self, *args):
+        super()._handle_proctoring_event(*args)
+        self._relay()
+
+    @patch('edx_name_affirmation.tasks.delete_verified_names_task.delay')
+    def test_proctoring_delete_handler(self, mock_task):
+        proctoring_delete_handler({}, MagicMock(id=1234), '')
+        mock_task.assert_not_called()
+
+        self._relay()
+        mock_task.assert_called_with(platform_verification_attempt_ids=[], proctoring_attempt_ids=[1234])
+
+    @patch('edx_name_affirmation.handlers.proctoring_update_verified_names_task.delay')
+    def test_events_batched_across_transactions(self, mock_delay):
+        for attempt_id in range(1, 6):
+            with self.captureOnCommitCallbacks(execute=True):
+                proctoring_attempt_handler(
+                    attempt_id, self.user.id, 'submitted', self.verified_name, self.profile_name, True, True, True,
+                )
+        mock_delay.assert_not_called()
+
+        self.assertEqual(self._relay(), 5)
+        self.assertEqual(
+            [[proctoring_update[0] for proctoring_update in call.args[0]] for call in mock_delay.call_args_list],
+            [[1, 2], [3, 4], [5]],
+        )
+        self.assertEqual(
+            mock_delay.call_args_list[0].args[0][0],
+            [1, self.user.id, VerifiedNameStatus.SUBMITTED, self.verified_name, self.profile_name],
+        )
+
+    @override_settings(NAME_AFFIRMATION_TASK_OUTBOX_ENABLED=False)
+    @patch('edx_name_affirmation.handlers.proctoring_update_verified_names_task.delay')
+    @patch('edx_name_affirmation.handlers.proctoring_update_verified_name_task.delay')
+    def test_dispatched_per_event_without_outbox(self, mock_delay, mock_batch_delay):
+        with self.captureOnCommitCallbacks(execute=True):
+            for attempt_id in range(1, 4):
+                proctoring_attempt_handler(
+                    attempt_id, self.user.id, 'submitted', self.verified_name, self.profile_name, True, True, True,
+                )
+            mock_delay.assert_not_called()
+
+        self.assertEqual([call.args[0] for call in mock_delay.call_args_list], [1, 2, 3])
+        mock_batch_delay.assert_not_called()
+
+
+@override_settings(NAME_AFFIRMATION_TASK_OUTBOX_ENABLED=True)
+class TaskOutboxTests(IDVSignalTests):
+    """
+    Tests for dispatching tasks through the task outbox
+    """
+    def _relay(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            return relay_task_outbox()
+
+    def _handle_idv_event(self, idv_signal, attempt_id):
+        super()._handle_idv_event(idv_signal, attempt_id)
+        self._relay()
+
+    def test_idv_handler_num_queries(self):
+        """
+        The handler only writes to the outbox, and the task is triggered by the relay
+        """
+        with patch('edx_name_affirmation.handlers.idv_update_verified_name_task.delay') as mock_delay:
+            with self.captureOnCommitCallbacks(execute=True):
+                with self.assertNumQueries(1):
+                    self._send_idv_event(IDV_ATTEMPT_APPROVED, self.idv_attempt_id)
+            mock_delay.assert_not_called()
+            outbox_entry = TaskOutboxEntry.objects.get()
+            self.assertEqual((outbox_entry.dispatcher, outbox_entry.user_id), ('idv_update', self.user.id))
+
+            self.assertEqual(self._relay(), 1)
+            mock_delay.assert_called_once_with(
+                self.idv_attempt_id,
+                self.user.id,
+                VerifiedNameStatus.APPROVED,
+                self.verified_name,
+                self.profile_name,
+                attempt_status='mock-platform-status',
+            )
+        self.assertFalse(TaskOutboxEntry.objects.exists())
+
+    @patch('edx_name_affirmation.tasks.delete_verified_names_task.delay')
+    def test_idv_delete_handler(self, mock_task):
+        platform_verification_delete_handler({}, MagicMock(id=1234), '')
+        mock_task.assert_not_called()
+
+        self._relay()
+        mock_task.assert_called_with(platform_verification_attempt_ids=[1234], proctoring_attempt_ids=[])
+
+    @patch('edx_name_affirmation.tasks.delete_verified_names_task.delay')
+    def test_proctoring_delete_handler(self, mock_task):
+        proctoring_delete_handler({}, MagicMock(id=1234), '')
+        mock_task.assert_not_called()
+
+        self._relay()
+        mock_task.assert_called_with(platform_verification_attempt_ids=[], proctoring_attempt_ids=[1234])
+
+    @override_settings(NAME_AFFIRMATION_DELETE_BATCH_SIZE=2)
+    @patch('edx_name_affirmation.tasks.delete_verified_names_task.delay')
+    def test_delete_handlers_batched(self, mock_task):
+        for attempt_id in range(1, 4):
+            platform_verification_delete_handler({}, MagicMock(id=attempt_id), '')
+        proctoring_delete_handler({}, MagicMock(id=self.proctoring_attempt_id), '')
+
+        self._relay()
+        self.assertEqual(mock_task.call_args_list, [
+            call(platform_verification_attempt_ids=[1, 2], proctoring_attempt_ids=[]),
+            call(platform_verification_attempt_ids=[3], proctoring_attempt_ids=[self.proctoring_attempt_id]),
+        ])
+
+    def test_rolled_back_event_not_recorded(self):
+        try:
+            with transaction.atomic():
+                self._send_idv_event(IDV_ATTEMPT_PENDING, self.idv_attempt_id)
+                raise IntegrityError
+        except IntegrityError:
+            pass
+        self.assertFalse(TaskOutboxEntry.objects.exists())
+
+    @override_settings(NAME_AFFIRMATION_IDV_EVENT_DISPATCH='batched', NAME_AFFIRMATION_IDV_EVENT_BATCH_SIZE=2)
+    @patch('edx_name_affirmation.handlers.idv_update_verified_names_task.delay')
+    @patch('edx_name_affirmation.handlers.delete_verified_names_task.delay')
+    @patch('edx_name_affirmation.handlers.proctoring_update_verified_name_task.delay')
+    def test_relay_in_order(self, mock_proctoring_delay, mock_delete_delay, mock_batch_delay):
+        for attempt_id in range(1, 4):
+            self._send_idv_event(IDV_ATTEMPT_PENDING, attempt_id)
+        proctoring_attempt_handler(
+            self.proctoring_attempt_id, self.user.id, 'verified', self.verified_name, self.profile_name,
+            True, True, True,
+        )
+        proctoring_delete_handler({}, MagicMock(id=self.proctoring_attempt_id), '')
+        TaskOutboxEntry.objects.create(dispatcher='unknown', payload=[])
+        platform_verification_delete_handler({}, MagicMock(id=1), '')
+        mock_batch_delay.assert_not_called()
+        mock_proctoring_delay.assert_not_called()
+        mock_delete_delay.assert_not_called()
+
+        self.assertEqual(self._relay(), 7)
+
+        self.assertEqual(
+            [[idv_update[0] for idv_update in call.args[0]] for call in mock_batch_delay.call_args_list],
+            [[1, 2], [3]],
+        )
+        mock_proctoring_delay.assert_called_once_with(
+            self.proctoring_attempt_id, self.user.id, VerifiedNameStatus.APPROVED, self.verified_name,
+            self.profile_name,
+        )
+        # the unknown entry splits the deletes into two groups
+        self.assertEqual(mock_delete_delay.call_args_list, [
+            call(platform_verification_attempt_ids=[], proctoring_attempt_ids=[self.proctoring_attempt_id]),
+            call(platform_verification_attempt_ids=[1], proctoring_attempt_ids=[]),
+        ])
+        self.assertFalse(TaskOutboxEntry.objects.exists())
+
+    def test_relay_batch_size(self):
+        for attempt_id in range(1, 4):
+            self._send_idv_event(IDV_ATTEMPT_PENDING, attempt_id)
+
+        with patch('edx_name_affirmation.handlers.idv_update_verified_name_task.delay') as mock_delay:
+            self.assertEqual(relay_task_outbox(batch_size=2), 2)
+            self.assertEqual(relay_task_outbox(batch_size=2), 1)
+            self.assertEqual(relay_task_outbox(batch_size=2), 0)
+        self.assertEqual([call.args[0] for call in mock_delay.call_args_list], [1, 2, 3])
+
+
+@override_settings(NAME_AFFIRMATION_IDV_EVENT_DISPATCH='batched', NAME_AFFIRMATION_IDV_EVENT_BATCH_SIZE=2)
+class IDVEventBatchingTests(TaskOutboxTests):
+    """
+    Tests for idv_attempt_handler when IDV events are dispatched in batches by the task outbox relay. This
+    also runs every TaskOutboxTests test with batched dispatch.
+    """
+    def test_idv_handler_num_queries(self):
+        """
+        The handler only writes to the outbox, and the batched task is triggered by the relay
+        """
+        with patch('edx_name_affirmation.handlers.idv_update_verified_names_task.delay') as mock_delay:
+            with self.captureOnCommitCallbacks(execute=True):
+                with self.assertNumQueries(1):
+                    self._send_idv_event(IDV_ATTEMPT_APPROVED, self.idv_attempt_id)
+            mock_delay.assert_not_called()
+            self.assertEqual(TaskOutboxEntry.objects.get().dispatcher, 'idv_update_batch')
+
+            self.assertEqual(self._relay(), 1)
+            mock_delay.assert_called_once()
+
+    @patch('edx_name_affirmation.handlers.idv_update_verified_names_task.delay')
+    def test_events_batched_across_transactions(self, mock_delay):
+        for attempt_id in range(1, 6):
+            with self.captureOnCommitCallbacks(execute=True):
+                self._send_idv_event(IDV_ATTEMPT_PENDING, attempt_id)
+        mock_delay.assert_not_called()
+
+        self.assertEqual(self._relay(), 5)
+        self.assertEqual(
+            [[idv_update[0] for idv_update in call.args[0]] for call in mock_delay.call_args_list],
+            [[1, 2], [3, 4], [5]],
+        )
+        self.assertEqual(
+            mock_delay.call_args_list[0].args[0][0],
+            [
+                1, self.user.id, VerifiedNameStatus.SUBMITTED, self.verified_name, self.profile_name,
+                'mock-platform-status',
+            ],
+        )
+
+    @patch('edx_name_affirmation.handlers.idv_update_verified_names_task.delay')
+    def test_rolled_back_events_not_dispatched(self, mock_delay):
+        try:
+            with transaction.atomic():
+                self._send_idv_event(IDV_ATTEMPT_PENDING, 1)
+                raise IntegrityError
+        except IntegrityError:
+            pass
+        self._send_idv_event(IDV_ATTEMPT_PENDING, 2)
+
+        self._relay()
+        mock_delay.assert_called_once()
+        self.assertEqual([idv_update[0] for idv_update in mock_delay.call_args.args[0]], [2])
+
+    @override_settings(NAME_AFFIRMATION_TASK_OUTBOX_ENABLED=False)
+    @patch('edx_name_affirmation.handlers.idv_update_verified_names_task.delay')
+    @patch('edx_name_affirmation.handlers.idv_update_verified_name_task.delay')
+    def test_dispatched_per_event_without_outbox(self, mock_delay, mock_batch_delay):
+        with self.captureOnCommitCallbacks(execute=True):
+            for attempt_id in range(1, 4):
+                self._send_idv_event(IDV_ATTEMPT_PENDING, attempt_id)
+
+        self.assertEqual([call.args[0] for call in mock_delay.call_args_list], [1, 2, 3])
+        mock_batch_delay.assert_not_called()
+
+    def test_relay_batch_size(self):
+        for attempt_id in range(1, 4):
+            self._send_idv_event(IDV_ATTEMPT_PENDING, attempt_id)
+
+        with patch('edx_name_affirmation.handlers.idv_update_verified_names_task.delay') as mock_delay:
+            self.assertEqual(relay_task_outbox(batch_size=2), 2)
+            self.assertEqual(relay_task_outbox(batch_size=2), 1)
+        self.assertEqual(
+            [[idv_update[0] for idv_update in call.args[0]] for call in mock_delay.call_args_list],
+            [[1, 2], [3]],
+        )
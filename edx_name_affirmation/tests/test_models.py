@@ -3,16 +3,20 @@ Tests for Name Affirmation models
 """
 from unittest.mock import patch
 
+import ddt
+
 from django.contrib.auth import get_user_model
 from django.core.exceptions import ObjectDoesNotExist
-from django.test import TestCase
+from django.db import IntegrityError, connection, transaction
+from django.test import TestCase, override_settings
 
-from edx_name_affirmation.models import VerifiedName
+from edx_name_affirmation.models import CurrentVerifiedName, VerifiedName, VerifiedNameConfig
 from edx_name_affirmation.statuses import VerifiedNameStatus
 
 User = get_user_model()
 
 
+@ddt.ddt
 class VerifiedNameModelTests(TestCase):
     """
     Test suite for the VerifiedName models
@@ -83,6 +87,88 @@ class VerifiedNameModelTests(TestCase):
         self.verified_name.platform_verification_attempt_id = self.idv_attempt_id
         assert self.verified_name.platform_verification_attempt_status is self.idv_attempt_status
 
+    @patch('edx_name_affirmation.models.PlatformVerificationAttempt')
+    @patch('edx_name_affirmation.models.SoftwareSecurePhotoVerification')
+    def test_prefetch_attempt_statuses(self, sspv_mock, platform_attempt_mock):
+        """
+        Test that attempt statuses are looked up with one in_bulk call per source model
+        """
+        sspv_mock.objects.only.return_value.in_bulk.return_value = {
+            1: self._obj({'status': 'approved'}),
+        }
+        platform_attempt_mock.objects.only.return_value.in_bulk.return_value = {
+            2: self._obj({'status': 'denied'}),
+            3: self._obj({'status': 'pending'}),
+        }
+        verified_names = [
+            VerifiedName(user=self.user, verification_attempt_id=1),
+            VerifiedName(user=self.user, platform_verification_attempt_id=2),
+            VerifiedName(user=self.user, platform_verification_attempt_id=3),
+            VerifiedName(user=self.user, platform_verification_attempt_id=self.idv_attempt_id_notfound),
+            VerifiedName(user=self.user, proctored_exam_attempt_id=4),
+        ]
+
+        VerifiedName.prefetch_attempt_statuses(verified_names)
+
+        sspv_mock.objects.only.return_value.in_bulk.assert_called_once_with([1])
+        platform_attempt_mock.objects.only.return_value.in_bulk.assert_called_once()
+        self.assertEqual(
+            sorted(platform_attempt_mock.objects.only.return_value.in_bulk.call_args[0][0]),
+            [2, 3, self.idv_attempt_id_notfound],
+        )
+        self.assertEqual(
+            [
+                (verified_name.verification_attempt_status, verified_name.platform_verification_attempt_status)
+                for verified_name in verified_names
+            ],
+            [('approved', None), (None, 'denied'), (None, 'pending'), (None, None), (None, None)],
+        )
+        sspv_mock.objects.get.assert_not_called()
+        platform_attempt_mock.objects.get.assert_not_called()
+
+    @patch('edx_name_affirmation.models.PlatformVerificationAttempt')
+    @patch('edx_name_affirmation.models.SoftwareSecurePhotoVerification')
+    def test_attempt_status_snapshot(self, sspv_mock, platform_attempt_mock):
+        """
+        Test that a final platform attempt status snapshot is returned without looking up the attempt
+        """
+        self.verified_name.attempt_status = 'approved'
+        self.verified_name.platform_verification_attempt_id = self.idv_attempt_id
+        assert self.verified_name.platform_verification_attempt_status == 'approved'
+        assert self.verified_name.verification_attempt_status is None
+
+        VerifiedName.prefetch_attempt_statuses([self.verified_name])
+        assert self.verified_name.platform_verification_attempt_status == 'approved'
+
+        sspv_mock.objects.get.assert_not_called()
+        platform_attempt_mock.objects.get.assert_not_called()
+        platform_attempt_mock.objects.only.return_value.in_bulk.assert_not_called()
+
+    @ddt.data('created', 'pending')
+    @patch('edx_name_affirmation.models.PlatformVerificationAttempt')
+    def test_attempt_status_snapshot_not_final(self, snapshot_status, platform_attempt_mock):
+        """
+        Test that the attempt is looked up if the snapshot does not hold a final status
+        """
+        platform_attempt_mock.objects.get.return_value.status = 'approved'
+        self.verified_name.attempt_status = snapshot_status
+        self.verified_name.platform_verification_attempt_id = self.idv_attempt_id
+
+        assert self.verified_name.platform_verification_attempt_status == 'approved'
+        platform_attempt_mock.objects.get.assert_called_once_with(id=self.idv_attempt_id)
+
+    @patch('edx_name_affirmation.models.SoftwareSecurePhotoVerification')
+    def test_attempt_status_snapshot_ignored_for_verification_attempt(self, sspv_mock):
+        """
+        Test that the status of a SoftwareSecurePhotoVerification is always looked up
+        """
+        sspv_mock.objects.get.return_value.status = 'denied'
+        self.verified_name.attempt_status = 'approved'
+        self.verified_name.verification_attempt_id = self.idv_attempt_id
+
+        assert self.verified_name.verification_attempt_status == 'denied'
+        sspv_mock.objects.get.assert_called_once_with(id=self.idv_attempt_id)
+
     def test_verification_id_exclusivity(self):
         """
         Test that only one verification ID can be set at a time
@@ -110,3 +196,178 @@ class VerifiedNameModelTests(TestCase):
             return self._obj({'status': self.idv_attempt_status})
 
         return self._obj({'status': None})
+
+
+@ddt.ddt
+class VerifiedNameIndexTests(TestCase):
+    """
+    Test that the common VerifiedName lookups are served by an index rather than a table scan.
+    """
+    def setUp(self):
+        self.user = User.objects.create(username='indexTester', email='index@tester.com')
+        return super().setUp()
+
+    def _assert_uses_index(self, queryset, index_name):
+        """
+        Assert that the query plan for the given queryset searches the named index and needs no extra sort step.
+        """
+        plan = queryset.explain()
+        self.assertIn(f'USING INDEX {index_name}', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+
+    def test_latest_approved_name_lookup(self):
+        queryset = VerifiedName.objects.filter(
+            user=self.user, status=VerifiedNameStatus.APPROVED,
+        ).order_by('-created', '-id')
+        self._assert_uses_index(queryset, 'nameaff_vn_user_status_idx')
+
+    def test_history_lookup(self):
+        queryset = VerifiedName.objects.filter(user=self.user).order_by('-created', '-id')
+        self._assert_uses_index(queryset, 'nameaff_vn_user_created_idx')
+
+    @ddt.data(
+        ('verification_attempt_id', 'nameaff_vn_verif_attempt_idx'),
+        ('proctored_exam_attempt_id', 'nameaff_vn_proctor_attempt_idx'),
+    )
+    @ddt.unpack
+    def test_attempt_id_lookup(self, field_name, index_name):
+        """
+        The delete task filters on the attempt ID alone.
+        """
+        queryset = VerifiedName.objects.filter(**{field_name: 1234})
+        self._assert_uses_index(queryset, index_name)
+
+    def test_platform_attempt_id_lookup(self):
+        """
+        Lookups by platform verification attempt ID use the index backing its uniqueness constraint.
+        """
+        queryset = VerifiedName.objects.filter(platform_verification_attempt_id=1234)
+        plan = queryset.explain()
+        self.assertIn('USING INDEX', plan)
+        self.assertNotIn('SCAN', plan)
+
+    def test_platform_attempt_id_unique(self):
+        VerifiedName.objects.create(
+            user=self.user, verified_name='Jonathan Doe', profile_name='Jon Doe', platform_verification_attempt_id=1234,
+        )
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            VerifiedName.objects.create(
+                user=self.user, verified_name='Jonathan Doe', profile_name='Jon Doe',
+                platform_verification_attempt_id=1234,
+            )
+
+    @ddt.data('verification_attempt_id', 'proctored_exam_attempt_id', 'platform_verification_attempt_id')
+    def test_status_update_lookup(self, field_name):
+        """
+        `update_verified_name_status` filters on the user and an attempt ID.
+        """
+        queryset = VerifiedName.objects.filter(user=self.user, **{field_name: 1234}).order_by('-created')
+        self.assertNotIn('SCAN', queryset.explain())
+
+
+@override_settings(NAME_AFFIRMATION_MAINTAIN_CURRENT_VERIFIED_NAME=True)
+class CurrentVerifiedNameModelTests(TestCase):
+    """
+    Test suite for keeping the CurrentVerifiedName read model in sync
+    """
+    def setUp(self):
+        self.user = User.objects.create(username='currentTester', email='current@tester.com')
+        return super().setUp()
+
+    def _create_verified_name(self, **kwargs):
+        return VerifiedName.objects.create(
+            user=self.user, verified_name='Test Tester', profile_name='Test', **kwargs
+        )
+
+    def _assert_current(self, latest, approved, use_verified_name_for_certs=False):
+        current_verified_name = CurrentVerifiedName.objects.get(user=self.user)
+        self.assertEqual(current_verified_name.latest_verified_name, latest)
+        self.assertEqual(current_verified_name.approved_verified_name, approved)
+        self.assertEqual(current_verified_name.use_verified_name_for_certs, use_verified_name_for_certs)
+
+    def test_verified_name_changes(self):
+        approved = self._create_verified_name(status=VerifiedNameStatus.APPROVED)
+        self._assert_current(approved, approved)
+
+        pending = self._create_verified_name()
+        self._assert_current(pending, approved)
+
+        pending.status = VerifiedNameStatus.APPROVED
+        pending.save()
+        self._assert_current(pending, pending)
+
+        pending.delete()
+        self._assert_current(approved, approved)
+
+        VerifiedName.retire_user(self.user.id)
+        self._assert_current(None, None)
+
+    def test_config_changes(self):
+        VerifiedNameConfig.objects.create(user=self.user, use_verified_name_for_certs=True)
+        self._assert_current(None, None, use_verified_name_for_certs=True)
+
+        config = VerifiedNameConfig.objects.create(user=self.user, use_verified_name_for_certs=False)
+        self._assert_current(None, None)
+
+        config.delete()
+        self._assert_current(None, None, use_verified_name_for_certs=True)
+
+    @override_settings(NAME_AFFIRMATION_MAINTAIN_CURRENT_VERIFIED_NAME=False)
+    def test_not_maintained(self):
+        with self.assertNumQueries(2):
+            self._create_verified_name(status=VerifiedNameStatus.APPROVED)
+        VerifiedNameConfig.objects.create(user=self.user, use_verified_name_for_certs=True)
+
+        self.assertFalse(CurrentVerifiedName.objects.exists())
+
+    def test_user_deletion(self):
+        self._create_verified_name(status=VerifiedNameStatus.APPROVED)
+        VerifiedNameConfig.objects.create(user=self.user, use_verified_name_for_certs=True)
+
+        self.user.delete()
+        self.assertFalse(CurrentVerifiedName.objects.exists())
+
+    def test_deferred_refresh(self):
+        approved = self._create_verified_name(status=VerifiedNameStatus.APPROVED)
+
+        with patch.object(CurrentVerifiedName, 'save_rows', wraps=CurrentVerifiedName.save_rows) as mock_save_rows:
+            with CurrentVerifiedName.deferred_refresh():
+                self._create_verified_name()
+                with CurrentVerifiedName.deferred_refresh():
+                    pending = self._create_verified_name()
+                self._assert_current(approved, approved)
+
+        mock_save_rows.assert_called_once()
+        self._assert_current(pending, approved)
+
+    def test_deferred_refresh_rolled_back(self):
+        approved = self._create_verified_name(status=VerifiedNameStatus.APPROVED)
+
+        with self.assertRaises(IntegrityError):
+            with CurrentVerifiedName.deferred_refresh():
+                self._create_verified_name()
+                raise IntegrityError
+
+        self.assertEqual(list(VerifiedName.objects.all()), [approved])
+        self._assert_current(approved, approved)
+
+    def test_save_rows_without_conflict_target(self):
+        """
+        Test that rows are saved on databases that cannot name the conflicting fields, like MySQL.
+        """
+        with patch.object(connection.features, 'supports_update_conflicts', True):
+            with patch.object(connection.features, 'supports_update_conflicts_with_target', False):
+                approved = self._create_verified_name(status=VerifiedNameStatus.APPROVED)
+
+        self._assert_current(approved, approved)
+
+    def test_get_stale_rows(self):
+        other_user = User.objects.create(username='otherTester', email='other@tester.com')
+        approved = self._create_verified_name(status=VerifiedNameStatus.APPROVED)
+        self.assertEqual(CurrentVerifiedName.get_stale_rows([self.user.id, other_user.id]), [])
+
+        CurrentVerifiedName.objects.filter(user=self.user).update(approved_verified_name=None)
+        stale_rows = CurrentVerifiedName.get_stale_rows([self.user.id, other_user.id])
+        self.assertEqual([(row.user_id, row.approved_verified_name_id) for row in stale_rows], [
+            (self.user.id, approved.id),
+        ])
@@ -27,7 +27,20 @@ class NameAffirmationServiceTest(TestCase):
         for attr_name in dir(edx_name_affirmation_api):
             attr = getattr(edx_name_affirmation_api, attr_name, None)
             if isinstance(attr, types.FunctionType):
-                self.assertTrue(hasattr(service, attr_name))
+                is_public = not attr_name.startswith('_') and attr.__module__ == edx_name_affirmation_api.__name__
+                self.assertEqual(hasattr(service, attr_name), is_public)
+
+    def test_internals_not_exposed(self):
+        """
+        Make sure private helpers and functions imported by the API module are not exposed
+        """
+        service = NameAffirmationService()
+
+        for attr_name in ('_use_current_verified_name', 'get_user_model', 'invalidate_verified_name_cache',
+                          'send_verified_name_approved'):
+            self.assertTrue(hasattr(edx_name_affirmation_api, attr_name))
+            self.assertFalse(hasattr(service, attr_name))
+        self.assertTrue(hasattr(service, 'get_verified_name'))
 
     def test_singleton(self):
         """
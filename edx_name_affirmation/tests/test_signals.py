@@ -3,12 +3,14 @@ Tests for Name Affirmation signals
 """
 
 import ddt
+from mock import call, patch
 
 from django.contrib.auth import get_user_model
 from django.test import TestCase
 
-from edx_name_affirmation.models import VerifiedName
-from edx_name_affirmation.signals import _listen_for_lms_retire_verified_names
+from edx_name_affirmation.models import DeadLetterTask, TaskOutboxEntry, VerifiedName
+from edx_name_affirmation.signals import _listen_for_lms_retire_verified_names, deferred_approval_signals
+from edx_name_affirmation.statuses import VerifiedNameStatus
 
 User = get_user_model()
 
@@ -64,3 +66,67 @@ class RetirementSignalVerifiedNamesTest(TestCase):
         )
         _listen_for_lms_retire_verified_names(sender=self.__class__, user=self.user)
         self.assertEqual(len(VerifiedName.objects.filter(user=self.user)), 0)
+
+    def test_retirement_signal_pending_and_failed_tasks(self):
+        for user in (self.user, self.other_user):
+            TaskOutboxEntry.objects.create(
+                dispatcher='proctoring_update', payload=[1, user.id, 'approved', 'Name', 'Name'], user_id=user.id,
+            )
+            DeadLetterTask.objects.create(
+                task_name='edx_name_affirmation.tasks.proctoring_update_verified_name_task',
+                args=[1, user.id, 'approved', 'Name', 'Name'],
+                user_id=user.id,
+            )
+
+        _listen_for_lms_retire_verified_names(sender=self.__class__, user=self.user)
+
+        self.assertEqual(list(TaskOutboxEntry.objects.values_list('user_id', flat=True)), [self.other_user.id])
+        self.assertEqual(list(DeadLetterTask.objects.values_list('user_id', flat=True)), [self.other_user.id])
+
+
+class DeferredApprovalSignalsTest(TestCase):
+    """
+    Tests for deferring VERIFIED_NAME_APPROVED with deferred_approval_signals
+    """
+
+    def setUp(self):
+        self.users = []
+        for i in range(2):
+            user = User(username=f'tester{i}', email=f'tester{i}@test.com')
+            user.save()
+            self.users.append(user)
+
+    def _approve(self, user, profile_name):
+        VerifiedName.objects.create(
+            user=user, verified_name='Jonathan Smith', profile_name=profile_name, status=VerifiedNameStatus.APPROVED,
+        )
+
+    @patch('edx_name_affirmation.signals.VERIFIED_NAME_APPROVED.send')
+    def test_sent_once_per_user_on_commit(self, mock_signal):
+        with self.captureOnCommitCallbacks() as callbacks:
+            with deferred_approval_signals():
+                self._approve(self.users[0], 'Jon')
+                self._approve(self.users[1], 'Other')
+                with deferred_approval_signals():
+                    self._approve(self.users[0], 'Jonathan')
+        mock_signal.assert_not_called()
+
+        for callback in callbacks:
+            callback()
+        self.assertEqual(mock_signal.call_args_list, [
+            call(sender='name_affirmation', user_id=self.users[1].id, profile_name='Other'),
+            call(sender='name_affirmation', user_id=self.users[0].id, profile_name='Jonathan'),
+        ])
+
+    @patch('edx_name_affirmation.signals.VERIFIED_NAME_APPROVED.send')
+    def test_dropped_on_error(self, mock_signal):
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertRaises(ValueError):
+                with deferred_approval_signals():
+                    self._approve(self.users[0], 'Jon')
+                    raise ValueError
+
+            # signals are sent right away again after the block
+            self._approve(self.users[1], 'Other')
+
+        mock_signal.assert_called_once_with(sender='name_affirmation', user_id=self.users[1].id, profile_name='Other')
@@ -6,14 +6,20 @@ import ddt
 from mock import patch
 
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.db import IntegrityError, OperationalError, connection, transaction
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 
-from edx_name_affirmation.models import VerifiedName
+from edx_name_affirmation.models import CurrentVerifiedName, DeadLetterTask, VerifiedName
 from edx_name_affirmation.statuses import VerifiedNameStatus
 from edx_name_affirmation.tasks import (
+    RETRY_BACKOFF_SECONDS,
     delete_verified_name_task,
+    delete_verified_names_task,
     idv_update_verified_name_task,
-    proctoring_update_verified_name_task
+    idv_update_verified_names_task,
+    proctoring_update_verified_name_task,
+    proctoring_update_verified_names_task
 )
 
 User = get_user_model()
@@ -35,29 +41,230 @@ class TaskTests(TestCase):
         self.proctoring_attempt_id = 2222222
 
     @patch('edx_name_affirmation.tasks.idv_update_verified_name_task.retry')
-    def test_idv_retry(self, mock_retry):
+    @patch('edx_name_affirmation.tasks.VerifiedName.objects.filter', side_effect=OperationalError('mock error'))
+    def test_idv_retry(self, mock_filter, mock_retry):  # pylint: disable=unused-argument
+        # force an error while looking up the VerifiedName
         idv_update_verified_name_task.delay(
             self.idv_attempt_id,
-            # force an error with an invalid user ID
-            99999,
+            self.user.id,
             VerifiedNameStatus.SUBMITTED,
             self.verified_name_obj.verified_name,
             self.verified_name_obj.profile_name,
         )
         mock_retry.assert_called()
+        # retries are delayed by a random amount of time, up to the backoff for the first retry
+        self.assertLessEqual(0, mock_retry.call_args.kwargs['countdown'])
+        self.assertLessEqual(mock_retry.call_args.kwargs['countdown'], RETRY_BACKOFF_SECONDS)
 
     @patch('edx_name_affirmation.tasks.proctoring_update_verified_name_task.retry')
-    def test_proctoring_retry(self, mock_retry):
+    @patch('edx_name_affirmation.tasks.VerifiedName.objects.filter', side_effect=OperationalError('mock error'))
+    def test_proctoring_retry(self, mock_filter, mock_retry):  # pylint: disable=unused-argument
+        # force an error while looking up the VerifiedName
         proctoring_update_verified_name_task.delay(
             self.proctoring_attempt_id,
-            # force an error with an invalid user ID
-            99999,
+            self.user.id,
             VerifiedNameStatus.PENDING,
             self.verified_name_obj.verified_name,
             self.verified_name_obj.profile_name,
         )
         mock_retry.assert_called()
 
+    @patch('edx_name_affirmation.tasks.delete_verified_name_task.retry')
+    @patch('edx_name_affirmation.tasks.VerifiedName.objects.filter', side_effect=OperationalError('mock error'))
+    def test_delete_retry(self, mock_filter, mock_retry):  # pylint: disable=unused-argument
+        delete_verified_name_task.delay(self.idv_attempt_id, None)
+        mock_retry.assert_called()
+
+    @patch('edx_name_affirmation.tasks.proctoring_update_verified_name_task.retry')
+    @patch('edx_name_affirmation.tasks.VerifiedName.save', side_effect=IntegrityError('mock error'))
+    def test_proctoring_no_retry_for_integrity_error(self, mock_save, mock_retry):  # pylint: disable=unused-argument
+        # such as for an invalid user ID
+        result = proctoring_update_verified_name_task.delay(
+            self.proctoring_attempt_id,
+            self.user.id,
+            VerifiedNameStatus.PENDING,
+            self.verified_name_obj.verified_name,
+            self.verified_name_obj.profile_name,
+        )
+        mock_retry.assert_not_called()
+        self.assertIsInstance(result.result, IntegrityError)
+
+    @patch('edx_name_affirmation.tasks.VerifiedName.save', side_effect=IntegrityError('mock error'))
+    def test_failed_task_stored_as_dead_letter(self, mock_save):  # pylint: disable=unused-argument
+        result = proctoring_update_verified_name_task.delay(
+            self.proctoring_attempt_id,
+            self.user.id,
+            VerifiedNameStatus.PENDING,
+            self.verified_name_obj.verified_name,
+            self.verified_name_obj.profile_name,
+        )
+        dead_letter = DeadLetterTask.objects.get()
+        self.assertEqual(dead_letter.task_id, result.id)
+        self.assertEqual(dead_letter.task_name, proctoring_update_verified_name_task.name)
+        self.assertEqual(dead_letter.args, [
+            self.proctoring_attempt_id,
+            self.user.id,
+            VerifiedNameStatus.PENDING,
+            self.verified_name_obj.verified_name,
+            self.verified_name_obj.profile_name,
+        ])
+        self.assertEqual(dead_letter.kwargs, {})
+        self.assertEqual(dead_letter.user_id, self.user.id)
+        self.assertEqual(dead_letter.exception, "IntegrityError('mock error')")
+
+    @patch('edx_name_affirmation.tasks.VerifiedName.objects.bulk_create', side_effect=IntegrityError('mock error'))
+    @patch('edx_name_affirmation.tasks.VerifiedName.save', side_effect=IntegrityError('mock error'))
+    def test_failed_batch_task_stored_per_user(self, mock_save, mock_bulk_create):  # pylint: disable=unused-argument
+        other_user = User.objects.create(username='other', email='other@test.com')
+        idv_updates = [
+            [self.idv_attempt_id, self.user.id, VerifiedNameStatus.PENDING, 'Jonathan Doe', 'Jon Doe', None],
+            [self.idv_attempt_id + 1, other_user.id, VerifiedNameStatus.PENDING, 'Other Doe', 'Other', None],
+            [self.idv_attempt_id + 2, self.user.id, VerifiedNameStatus.PENDING, 'Jonathan Doe', 'Jon Doe', None],
+        ]
+
+        idv_update_verified_names_task.delay(idv_updates)
+
+        self.assertEqual(
+            [(dead_letter.user_id, dead_letter.args) for dead_letter in DeadLetterTask.objects.order_by('id')],
+            [
+                (self.user.id, [[idv_updates[0], idv_updates[2]]]),
+                (other_user.id, [[idv_updates[1]]]),
+            ],
+        )
+
+    def test_successful_task_not_stored_as_dead_letter(self):
+        delete_verified_name_task.delay(self.idv_attempt_id, None)
+        self.assertFalse(DeadLetterTask.objects.exists())
+
+    @patch('edx_name_affirmation.tasks.idv_update_verified_names_task.retry')
+    def test_idv_no_retry_for_invalid_status(self, mock_retry):
+        result = idv_update_verified_names_task.delay([
+            (self.idv_attempt_id, self.user.id, 'invalid', 'Jonathan Doe', 'Jon Doe'),
+            (self.idv_attempt_id, self.user.id, VerifiedNameStatus.PENDING, 'Jonathan Doe', 'Jon Doe'),
+        ])
+        mock_retry.assert_not_called()
+        self.assertIsInstance(result.result, ValueError)
+
+    @ddt.data(
+        # 1 lookup, 1 update and 1 history insert
+        (False, 3),
+        # plus 4 for refreshing the CurrentVerifiedName
+        (True, 7),
+    )
+    @ddt.unpack
+    def test_idv_update_num_queries(self, maintain_current_verified_name, expected_num_queries):
+        """
+        Updating the VerifiedName for an attempt takes a single lookup and a single update
+        """
+        with override_settings(NAME_AFFIRMATION_MAINTAIN_CURRENT_VERIFIED_NAME=maintain_current_verified_name):
+            with self.assertNumQueries(expected_num_queries):
+                idv_update_verified_name_task.delay(
+                    self.idv_attempt_id,
+                    self.user.id,
+                    VerifiedNameStatus.SUBMITTED,
+                    self.verified_name_obj.verified_name,
+                    self.verified_name_obj.profile_name,
+                )
+        self.verified_name_obj.refresh_from_db()
+        self.assertEqual(self.verified_name_obj.platform_verification_attempt_id, self.idv_attempt_id)
+        self.assertEqual(self.verified_name_obj.status, VerifiedNameStatus.SUBMITTED)
+
+    def test_idv_create_num_queries(self):
+        """
+        Creating the VerifiedName for an attempt only looks up the user to check for a pending name change
+        """
+        # 1 lookup, then 1 user lookup for a pending name change, 1 insert and 1 history insert inside
+        # a savepoint
+        with self.assertNumQueries(6):
+            idv_update_verified_name_task.delay(
+                self.idv_attempt_id,
+                self.user.id,
+                VerifiedNameStatus.SUBMITTED,
+                'Another Name',
+                self.verified_name_obj.profile_name,
+            )
+        verified_name = VerifiedName.objects.get(platform_verification_attempt_id=self.idv_attempt_id)
+        self.assertEqual(verified_name.verified_name, 'Another Name')
+
+    @ddt.data(
+        # approved name for another exam: 1 lookup
+        (VerifiedNameStatus.APPROVED, 'other_exam', 1),
+        # name for this exam: 1 lookup, 1 update and 1 history insert
+        (VerifiedNameStatus.PENDING, 'this_exam', 3),
+        # no name for this exam: 1 lookup, 1 insert and 1 history insert
+        (VerifiedNameStatus.PENDING, 'other_exam', 3),
+    )
+    @ddt.unpack
+    def test_proctoring_num_queries(self, existing_status, existing_exam, expected_num_queries):
+        """
+        The VerifiedNames needed by the proctoring task are looked up together, and the user is not fetched
+        """
+        self.verified_name_obj.status = existing_status
+        self.verified_name_obj.proctored_exam_attempt_id = (
+            self.proctoring_attempt_id if existing_exam == 'this_exam' else 3333333
+        )
+        self.verified_name_obj.save()
+
+        with self.assertNumQueries(expected_num_queries):
+            proctoring_update_verified_name_task.delay(
+                self.proctoring_attempt_id,
+                self.user.id,
+                VerifiedNameStatus.SUBMITTED,
+                self.verified_name_obj.verified_name,
+                self.verified_name_obj.profile_name,
+            )
+        self.assertEqual(
+            VerifiedName.objects.filter(
+                proctored_exam_attempt_id=self.proctoring_attempt_id, status=VerifiedNameStatus.SUBMITTED,
+            ).exists(),
+            existing_status != VerifiedNameStatus.APPROVED,
+        )
+
+    def test_proctoring_no_names_num_queries(self):
+        # 1 lookup, and nothing is created without a full name and profile name
+        with self.assertNumQueries(1):
+            proctoring_update_verified_name_task.delay(
+                self.proctoring_attempt_id, self.user.id, VerifiedNameStatus.SUBMITTED, '', '',
+            )
+
+    def test_proctoring_approved_name_for_exam(self):
+        """
+        An approved VerifiedName for the exam itself is both the approved name and the name for the exam
+        """
+        self.verified_name_obj.status = VerifiedNameStatus.APPROVED
+        self.verified_name_obj.proctored_exam_attempt_id = self.proctoring_attempt_id
+        self.verified_name_obj.save()
+
+        proctoring_update_verified_name_task.delay(
+            self.proctoring_attempt_id,
+            self.user.id,
+            VerifiedNameStatus.DENIED,
+            self.verified_name_obj.verified_name,
+            self.verified_name_obj.profile_name,
+        )
+        self.verified_name_obj.refresh_from_db()
+        self.assertEqual(self.verified_name_obj.status, VerifiedNameStatus.DENIED)
+
+    @patch('edx_name_affirmation.tasks._get_verified_name_for_idv_attempt', return_value=None)
+    def test_idv_create_conflict(self, mock_lookup):  # pylint: disable=unused-argument
+        """
+        If another task created the VerifiedName for the attempt first, that VerifiedName is updated
+        """
+        self.verified_name_obj.platform_verification_attempt_id = self.idv_attempt_id
+        self.verified_name_obj.save()
+
+        idv_update_verified_name_task.delay(
+            self.idv_attempt_id,
+            self.user.id,
+            VerifiedNameStatus.APPROVED,
+            self.verified_name_obj.verified_name,
+            self.verified_name_obj.profile_name,
+        )
+
+        verified_name = VerifiedName.objects.get(platform_verification_attempt_id=self.idv_attempt_id)
+        self.assertEqual(verified_name, self.verified_name_obj)
+        self.assertEqual(verified_name.status, VerifiedNameStatus.APPROVED)
+
     def test_idv_delete(self):
         """
         Assert that only relevant VerifiedNames are deleted for a given idv_attempt_id
@@ -68,14 +275,6 @@ class TaskTests(TestCase):
 
         other_attempt_id = 123456
 
-        # create another VerifiedName with the same idv attempt
-        VerifiedName(
-            user=self.user,
-            verified_name='Jonathan X Doe',
-            profile_name='Jon D',
-            platform_verification_attempt_id=self.idv_attempt_id
-        ).save()
-
         # create VerifiedName not associated with idv attempt
         other_verified_name_obj = VerifiedName(
             user=self.user,
@@ -155,3 +354,258 @@ class TaskTests(TestCase):
         mock_logger.assert_called_with(
             'No VerifiedNames deleted because no VerifiedNames were associated with the provided attempt ID.'
         )
+
+    @patch('logging.Logger.info')
+    def test_delete_logs_num_names(self, mock_logger):
+        self.verified_name_obj.platform_verification_attempt_id = self.idv_attempt_id
+        self.verified_name_obj.save()
+
+        delete_verified_name_task.delay(self.idv_attempt_id, None)
+
+        mock_logger.assert_called_with(
+            f'Deleted 1 VerifiedName(s) associated with platform_verification_attempt_id={self.idv_attempt_id}'
+        )
+
+    def test_delete_no_names_num_queries(self):
+        # a single lookup of the rows to delete, and nothing else when there are none
+        with self.assertNumQueries(1):
+            delete_verified_name_task.delay(self.idv_attempt_id, None)
+
+    @patch('edx_name_affirmation.tasks.DELETE_BATCH_SIZE', 2)
+    def test_bulk_delete(self):
+        idv_names = [
+            VerifiedName.objects.create(
+                user=self.user, verified_name='Jonathan Doe', profile_name='Jon Doe',
+                platform_verification_attempt_id=attempt_id,
+            )
+            for attempt_id in range(1, 5)
+        ]
+        proctoring_name = VerifiedName.objects.create(
+            user=self.user, verified_name='Jonathan Doe', profile_name='Jon Doe',
+            proctored_exam_attempt_id=self.proctoring_attempt_id,
+        )
+
+        with CaptureQueriesContext(connection) as queries:
+            delete_verified_names_task.delay(
+                platform_verification_attempt_ids=[1, 2, 3, 3, 99999],
+                proctoring_attempt_ids=[self.proctoring_attempt_id],
+            )
+
+        self.assertEqual(
+            list(VerifiedName.objects.order_by('id')),
+            [self.verified_name_obj, idv_names[3]],
+        )
+        # the 4 idv attempt ids are deleted in 2 batches, and the proctoring attempt id in 1
+        delete_queries = [
+            query for query in queries if query['sql'].startswith('DELETE FROM "nameaffirmation_verifiedname"')
+        ]
+        self.assertEqual(len(delete_queries), 3)
+        self.assertTrue(VerifiedName.history.filter(id=proctoring_name.id, history_type='-').exists())
+
+    @override_settings(NAME_AFFIRMATION_MAINTAIN_CURRENT_VERIFIED_NAME=True)
+    def test_bulk_delete_refreshes_current_verified_name_once(self):
+        for attempt_id in range(1, 4):
+            VerifiedName.objects.create(
+                user=self.user, verified_name='Jonathan Doe', profile_name='Jon Doe',
+                platform_verification_attempt_id=attempt_id,
+            )
+
+        with patch.object(CurrentVerifiedName, 'save_rows', wraps=CurrentVerifiedName.save_rows) as mock_save_rows:
+            delete_verified_names_task.delay(platform_verification_attempt_ids=[1, 2, 3])
+
+        mock_save_rows.assert_called_once()
+        self.assertEqual(
+            CurrentVerifiedName.objects.get(user=self.user).latest_verified_name, self.verified_name_obj,
+        )
+
+
+class IDVBatchTaskTests(TestCase):
+    """
+    Tests for idv_update_verified_names_task
+    """
+    def setUp(self):
+        self.users = []
+        for i in range(4):
+            user = User(username=f'tester{i}', email=f'tester{i}@test.com')
+            user.save()
+            self.users.append(user)
+
+    def _create_verified_name(self, user, **kwargs):
+        return VerifiedName.objects.create(user=user, verified_name='Jonathan Doe', profile_name='Jon Doe', **kwargs)
+
+    @override_settings(NAME_AFFIRMATION_MAINTAIN_CURRENT_VERIFIED_NAME=True)
+    def test_update_and_create(self):
+        linked_name = self._create_verified_name(self.users[0], platform_verification_attempt_id=1)
+        unlinked_name = self._create_verified_name(self.users[1])
+        proctoring_name = self._create_verified_name(self.users[2], proctored_exam_attempt_id=123)
+
+        with patch('edx_name_affirmation.signals.VERIFIED_NAME_APPROVED.send') as mock_signal:
+            with self.captureOnCommitCallbacks(execute=True):
+                idv_update_verified_names_task.delay([
+                    (1, self.users[0].id, VerifiedNameStatus.APPROVED, 'Jonathan Doe', 'Jon Doe', 'approved'),
+                    (2, self.users[1].id, VerifiedNameStatus.SUBMITTED, 'Jonathan Doe', 'Jon Doe'),
+                    (3, self.users[2].id, VerifiedNameStatus.PENDING, 'Jonathan Doe', 'Jon Doe', 'created'),
+                ])
+
+        linked_name.refresh_from_db()
+        self.assertEqual(linked_name.status, VerifiedNameStatus.APPROVED)
+        self.assertEqual(linked_name.attempt_status, 'approved')
+        self.assertEqual(linked_name.history.count(), 2)
+
+        unlinked_name.refresh_from_db()
+        self.assertEqual(unlinked_name.platform_verification_attempt_id, 2)
+        self.assertEqual(unlinked_name.status, VerifiedNameStatus.SUBMITTED)
+
+        proctoring_name.refresh_from_db()
+        self.assertIsNone(proctoring_name.platform_verification_attempt_id)
+        created_name = VerifiedName.objects.get(platform_verification_attempt_id=3)
+        self.assertEqual(created_name.user, self.users[2])
+        self.assertEqual(created_name.status, VerifiedNameStatus.PENDING)
+        self.assertEqual(created_name.attempt_status, 'created')
+        self.assertEqual(created_name.history.count(), 1)
+
+        mock_signal.assert_called_once_with(sender='name_affirmation', user_id=self.users[0].id, profile_name='Jon Doe')
+        self.assertEqual(CurrentVerifiedName.objects.get(user=self.users[0]).approved_verified_name, linked_name)
+        self.assertEqual(CurrentVerifiedName.objects.get(user=self.users[2]).latest_verified_name, created_name)
+
+    def test_approved_signal_only_on_transition(self):
+        approved_name = self._create_verified_name(
+            self.users[0], platform_verification_attempt_id=1, status=VerifiedNameStatus.APPROVED,
+        )
+        with patch('edx_name_affirmation.signals.VERIFIED_NAME_APPROVED.send') as mock_signal:
+            with self.captureOnCommitCallbacks(execute=True):
+                idv_update_verified_names_task.delay([
+                    (1, self.users[0].id, VerifiedNameStatus.APPROVED, 'Jonathan Doe', 'Jon Doe', 'approved'),
+                    (2, self.users[1].id, VerifiedNameStatus.APPROVED, 'Jonathan Doe', 'Jon Doe'),
+                ])
+
+        approved_name.refresh_from_db()
+        self.assertEqual(approved_name.attempt_status, 'approved')
+        mock_signal.assert_called_once_with(sender='name_affirmation', user_id=self.users[1].id, profile_name='Jon Doe')
+
+    def test_latest_status_per_attempt(self):
+        idv_update_verified_names_task.delay([
+            (1, self.users[0].id, VerifiedNameStatus.PENDING, 'Jonathan Doe', 'Jon Doe'),
+            (1, self.users[0].id, VerifiedNameStatus.DENIED, 'Jonathan Doe', 'Jon Doe'),
+            (1, self.users[0].id, VerifiedNameStatus.SUBMITTED, 'Jonathan Doe', 'Jon Doe'),
+        ])
+        verified_name = VerifiedName.objects.get(user=self.users[0])
+        self.assertEqual(verified_name.status, VerifiedNameStatus.DENIED)
+
+    def test_num_queries_independent_of_batch_size(self):
+        def run_batch(users, attempt_id_offset):
+            idv_updates = []
+            for i, user in enumerate(users):
+                self._create_verified_name(user)
+                self._create_verified_name(user, platform_verification_attempt_id=attempt_id_offset + i)
+                idv_updates += [
+                    (attempt_id_offset + i, user.id, VerifiedNameStatus.SUBMITTED, 'Jonathan Doe', 'Jon Doe'),
+                    (attempt_id_offset + 100 + i, user.id, VerifiedNameStatus.SUBMITTED, 'Jonathan Doe', 'Jon Doe'),
+                    (attempt_id_offset + 200 + i, user.id, VerifiedNameStatus.SUBMITTED, 'Other Name', 'Jon Doe'),
+                ]
+            with CaptureQueriesContext(connection) as queries:
+                idv_update_verified_names_task.delay(idv_updates)
+            return len(queries.captured_queries)
+
+        self.assertEqual(run_batch(self.users[:1], 1000), run_batch(self.users[1:], 2000))
+
+    @patch('edx_name_affirmation.tasks.bulk_create_with_history', side_effect=IntegrityError)
+    def test_falls_back_to_single_updates(self, mock_bulk_create):  # pylint: disable=unused-argument
+        idv_update_verified_names_task.delay([
+            (1, self.users[0].id, VerifiedNameStatus.PENDING, 'Jonathan Doe', 'Jon Doe'),
+            (2, self.users[1].id, VerifiedNameStatus.APPROVED, 'Jonathan Doe', 'Jon Doe'),
+        ])
+        self.assertEqual(VerifiedName.objects.get(platform_verification_attempt_id=1).user, self.users[0])
+        self.assertEqual(
+            VerifiedName.objects.get(platform_verification_attempt_id=2).status, VerifiedNameStatus.APPROVED
+        )
+
+
+class ProctoringBatchTaskTests(TestCase):
+    """
+    Tests for proctoring_update_verified_names_task
+    """
+    def setUp(self):
+        self.users = []
+        for i in range(4):
+            user = User(username=f'tester{i}', email=f'tester{i}@test.com')
+            user.save()
+            self.users.append(user)
+
+    def _create_verified_name(self, user, **kwargs):
+        return VerifiedName.objects.create(user=user, verified_name='Jonathan Doe', profile_name='Jon Doe', **kwargs)
+
+    @override_settings(NAME_AFFIRMATION_MAINTAIN_CURRENT_VERIFIED_NAME=True)
+    def test_update_create_and_skip(self):
+        exam_name = self._create_verified_name(self.users[0], proctored_exam_attempt_id=1)
+        approved_name = self._create_verified_name(self.users[1], status=VerifiedNameStatus.APPROVED)
+
+        with patch('edx_name_affirmation.signals.VERIFIED_NAME_APPROVED.send') as mock_signal:
+            with self.captureOnCommitCallbacks(execute=True):
+                proctoring_update_verified_names_task.delay([
+                    (1, self.users[0].id, VerifiedNameStatus.APPROVED, 'Jonathan Doe', 'Jon Doe'),
+                    # skipped, because the user has an approved name and no name for the exam
+                    (2, self.users[1].id, VerifiedNameStatus.SUBMITTED, 'Jonathan Doe', 'Jon Doe'),
+                    (3, self.users[2].id, VerifiedNameStatus.PENDING, 'Jonathan Doe', 'Jon Doe'),
+                    # skipped, because there is no name to create one with
+                    (4, self.users[3].id, VerifiedNameStatus.PENDING, '', ''),
+                ])
+
+        exam_name.refresh_from_db()
+        self.assertEqual(exam_name.status, VerifiedNameStatus.APPROVED)
+        self.assertEqual(exam_name.history.count(), 2)
+        self.assertEqual(list(VerifiedName.objects.filter(user=self.users[1])), [approved_name])
+        created_name = VerifiedName.objects.get(user=self.users[2])
+        self.assertEqual(created_name.proctored_exam_attempt_id, 3)
+        self.assertEqual(created_name.status, VerifiedNameStatus.PENDING)
+        self.assertEqual(created_name.history.count(), 1)
+        self.assertFalse(VerifiedName.objects.filter(user=self.users[3]).exists())
+        self.assertEqual(CurrentVerifiedName.objects.get(user=self.users[0]).approved_verified_name, exam_name)
+        mock_signal.assert_called_once_with(sender='name_affirmation', user_id=self.users[0].id, profile_name='Jon Doe')
+
+    def test_same_outcome_as_single_updates(self):
+        """
+        Updates are applied in order, so earlier updates in the batch affect the later ones like they
+        would with one task per update
+        """
+        proctoring_updates = [
+            (1, self.users[0].id, VerifiedNameStatus.PENDING, 'Jonathan Doe', 'Jon Doe'),
+            (1, self.users[0].id, VerifiedNameStatus.APPROVED, 'Jonathan Doe', 'Jon Doe'),
+            # skipped, because the name created for the first exam has been approved
+            (2, self.users[0].id, VerifiedNameStatus.PENDING, 'Jonathan Doe', 'Jon Doe'),
+            (3, self.users[1].id, VerifiedNameStatus.SUBMITTED, 'Jonathan Doe', 'Jon Doe'),
+            (4, self.users[1].id, VerifiedNameStatus.SUBMITTED, 'Jonathan Doe', 'Jon Doe'),
+            (3, self.users[1].id, VerifiedNameStatus.DENIED, 'Jonathan Doe', 'Jon Doe'),
+        ]
+
+        def get_outcome():
+            return list(
+                VerifiedName.objects.order_by('id').values_list('user_id', 'proctored_exam_attempt_id', 'status')
+            )
+
+        with transaction.atomic():
+            for proctoring_update in proctoring_updates:
+                proctoring_update_verified_name_task.delay(*proctoring_update)
+            expected_outcome = get_outcome()
+            transaction.set_rollback(True)
+
+        proctoring_update_verified_names_task.delay(proctoring_updates)
+
+        self.assertEqual(get_outcome(), expected_outcome)
+        self.assertEqual(len(expected_outcome), 3)
+
+    def test_num_queries_independent_of_batch_size(self):
+        def run_batch(users, attempt_id_offset):
+            proctoring_updates = []
+            for i, user in enumerate(users):
+                self._create_verified_name(user, status=VerifiedNameStatus.APPROVED)
+                self._create_verified_name(user, proctored_exam_attempt_id=attempt_id_offset + i)
+                proctoring_updates += [
+                    (attempt_id_offset + i, user.id, VerifiedNameStatus.SUBMITTED, 'Jonathan Doe', 'Jon Doe'),
+                    (attempt_id_offset + 100 + i, user.id, VerifiedNameStatus.SUBMITTED, 'Jonathan Doe', 'Jon Doe'),
+                ]
+            with CaptureQueriesContext(connection) as queries:
+                proctoring_update_verified_names_task.delay(proctoring_updates)
+            return len(queries.captured_queries)
+
+        self.assertEqual(run_batch(self.users[:1], 1000), run_batch(self.users[1:], 2000))
@@ -8,6 +8,9 @@ import ddt
 
 from django.contrib.auth import get_user_model
 from django.core.cache import cache
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
 from edx_name_affirmation.api import (
@@ -17,7 +20,7 @@ from edx_name_affirmation.api import (
     get_verified_name_history,
     should_use_verified_name_for_certs
 )
-from edx_name_affirmation.models import VerifiedNameConfig
+from edx_name_affirmation.models import VerifiedName, VerifiedNameConfig
 from edx_name_affirmation.statuses import VerifiedNameStatus
 
 from .utils import LoggedInTestCase
@@ -109,6 +112,16 @@ class VerifiedNameViewTests(NameAffirmationViewsTestCase):
         response = self.client.get(reverse('edx_name_affirmation:verified_name'))
         self.assertEqual(response.status_code, 404)
 
+    @override_settings(NAME_AFFIRMATION_VERIFIED_NAME_CACHE_ENABLED=True)
+    def test_404_cached(self):
+        self.client.get(reverse('edx_name_affirmation:verified_name'))
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('edx_name_affirmation:verified_name'))
+
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse([query for query in queries if '"nameaffirmation_verifiedname"' in query['sql']])
+
     def test_post_200(self):
         verified_name_data = {
             'username': self.user.username,
@@ -368,6 +381,86 @@ class VerifiedNameViewTests(NameAffirmationViewsTestCase):
         }
 
 
+@ddt.ddt
+class VerifiedNameBulkStatusViewTests(NameAffirmationViewsTestCase):
+    """
+    Tests for the VerifiedNameBulkStatusView
+    """
+    def _create_verified_name(self, user, **kwargs):
+        return VerifiedName.objects.create(user=user, verified_name='Jonathan Doe', profile_name='Jon Doe', **kwargs)
+
+    def _patch(self, data):
+        return self.client.patch(
+            reverse('edx_name_affirmation:verified_name_bulk_status'),
+            data,
+            content_type='application/json'
+        )
+
+    def test_patch(self):
+        self.user.is_staff = True
+        self.user.save()
+        submitted_name = self._create_verified_name(
+            self.other_user, proctored_exam_attempt_id=1, status=VerifiedNameStatus.SUBMITTED,
+        )
+        denied_name = self._create_verified_name(
+            self.user, proctored_exam_attempt_id=2, status=VerifiedNameStatus.DENIED,
+        )
+        idv_name = self._create_verified_name(
+            self.user, platform_verification_attempt_id=3, status=VerifiedNameStatus.SUBMITTED,
+        )
+
+        response = self._patch({
+            'status': VerifiedNameStatus.APPROVED,
+            'proctored_exam_attempt_ids': [1, 2, 4],
+            'platform_verification_attempt_ids': [3],
+            'enforce_lifecycle': True,
+        })
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.content.decode('utf-8')), {'results': [
+            {'proctored_exam_attempt_id': 1, 'verified_name_id': submitted_name.id, 'result': 'updated'},
+            {'proctored_exam_attempt_id': 2, 'verified_name_id': denied_name.id, 'result': 'unchanged'},
+            {'proctored_exam_attempt_id': 4, 'verified_name_id': None, 'result': 'not_found'},
+            {'platform_verification_attempt_id': 3, 'verified_name_id': idv_name.id, 'result': 'updated'},
+        ]})
+        self.assertEqual(get_verified_name(self.other_user).status, VerifiedNameStatus.APPROVED)
+        denied_name.refresh_from_db()
+        self.assertEqual(denied_name.status, VerifiedNameStatus.DENIED)
+
+    def test_patch_not_staff(self):
+        verified_name = self._create_verified_name(
+            self.other_user, proctored_exam_attempt_id=1, status=VerifiedNameStatus.SUBMITTED,
+        )
+        response = self._patch({'status': VerifiedNameStatus.APPROVED, 'proctored_exam_attempt_ids': [1]})
+        self.assertEqual(response.status_code, 403)
+        verified_name.refresh_from_db()
+        self.assertEqual(verified_name.status, VerifiedNameStatus.SUBMITTED)
+
+    @ddt.data(
+        {'proctored_exam_attempt_ids': [1]},
+        {'status': 'invalid', 'proctored_exam_attempt_ids': [1]},
+        {'status': VerifiedNameStatus.APPROVED},
+        {'status': VerifiedNameStatus.APPROVED, 'proctored_exam_attempt_ids': []},
+        {'status': VerifiedNameStatus.APPROVED, 'proctored_exam_attempt_ids': ['abc']},
+    )
+    def test_patch_invalid(self, data):
+        self.user.is_staff = True
+        self.user.save()
+        response = self._patch(data)
+        self.assertEqual(response.status_code, 400)
+
+    @patch('edx_name_affirmation.serializers.BulkUpdateVerifiedNameStatusSerializer.MAX_ATTEMPT_IDS', 2)
+    def test_patch_too_many_attempt_ids(self):
+        self.user.is_staff = True
+        self.user.save()
+        response = self._patch({
+            'status': VerifiedNameStatus.APPROVED,
+            'proctored_exam_attempt_ids': [1, 2],
+            'verification_attempt_ids': [3],
+        })
+        self.assertEqual(response.status_code, 400)
+
+
 @ddt.ddt
 class VerifiedNameHistoryViewTests(NameAffirmationViewsTestCase):
     """
@@ -403,6 +496,31 @@ class VerifiedNameHistoryViewTests(NameAffirmationViewsTestCase):
 
         self.assertEqual(data, expected_response)
 
+    @patch('edx_name_affirmation.models.PlatformVerificationAttempt')
+    def test_get_query_count_independent_of_history_length(self, platform_attempt_mock):
+        """
+        Linked attempt statuses and usernames are looked up once for the whole history, not per record.
+        """
+        platform_attempt_mock.objects.only.return_value.in_bulk.return_value = {}
+
+        def count_queries():
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(reverse('edx_name_affirmation:verified_name_history'))
+            self.assertEqual(response.status_code, 200)
+            return len(queries)
+
+        for attempt_id in range(3):
+            create_verified_name(self.user, 'Jonathan Doe', 'Jon Doe', platform_verification_attempt_id=attempt_id + 1)
+        # warm up the config cache
+        count_queries()
+        query_count = count_queries()
+
+        for attempt_id in range(3, 10):
+            create_verified_name(self.user, 'Jonathan Doe', 'Jon Doe', platform_verification_attempt_id=attempt_id + 1)
+        self.assertEqual(count_queries(), query_count)
+        self.assertEqual(platform_attempt_mock.objects.only.return_value.in_bulk.call_count, 3)
+        platform_attempt_mock.objects.get.assert_not_called()
+
     def test_get_bools(self):
         verified_name_history = self._create_verified_name_history(self.user)
         expected_response = self._get_expected_response(
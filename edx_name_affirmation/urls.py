@@ -24,6 +24,11 @@ urlpatterns = [
         name='verified_name_history'
     ),
 
+    path(
+        'edx_name_affirmation/v1/verified_name/bulk_status', views.VerifiedNameBulkStatusView.as_view(),
+        name='verified_name_bulk_status'
+    ),
+
     path(
         'edx_name_affirmation/v1/verified_name/config', views.VerifiedNameConfigView.as_view(),
         name='verified_name_config'
@@ -13,6 +13,7 @@ from rest_framework.views import APIView
 from django.contrib.auth import get_user_model
 
 from edx_name_affirmation.api import (
+    bulk_update_verified_name_status,
     create_verified_name,
     create_verified_name_config,
     delete_verified_name,
@@ -27,6 +28,7 @@ from edx_name_affirmation.exceptions import (
     VerifiedNameMultipleAttemptIds
 )
 from edx_name_affirmation.serializers import (
+    BulkUpdateVerifiedNameStatusSerializer,
     UpdateVerifiedNameSerializer,
     VerifiedNameConfigSerializer,
     VerifiedNameSerializer
@@ -232,6 +234,46 @@ class VerifiedNameView(AuthenticatedAPIView):
         return Response(status=response_status, data=data)
 
 
+class VerifiedNameBulkStatusView(AuthenticatedAPIView):
+    """
+    Endpoint for bulk status updates of VerifiedNames.
+    /edx_name_affirmation/v1/verified_name/bulk_status
+
+    Supports:
+        HTTP PATCH: Update the status of the VerifiedNames linked to many attempts
+    """
+    @schema(
+        body=BulkUpdateVerifiedNameStatusSerializer(),
+        responses={
+            200: 'The result of the update for each attempt ID: updated, unchanged or not_found',
+            403: 'User lacks required permission. Only an edX staff user can invoke this API',
+            400: 'The edit action failed validation rules'
+        },
+    )
+    def patch(self, request):
+        """
+        Update the status of the most recent VerifiedName for each of the given attempts
+
+        Example PATCH data: {
+                "status": "approved",
+                "proctored_exam_attempt_ids": [123, 456],
+                "enforce_lifecycle": true,
+            }
+        """
+        if not request.user.is_staff:
+            return Response(
+                status=http_status.HTTP_403_FORBIDDEN,
+                data={'detail': 'Must be a staff user to update verified name status.'}
+            )
+
+        serializer = BulkUpdateVerifiedNameStatusSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(status=http_status.HTTP_400_BAD_REQUEST, data=serializer.errors)
+
+        results = bulk_update_verified_name_status(**serializer.validated_data)
+        return Response(status=http_status.HTTP_200_OK, data={'results': results})
+
+
 class VerifiedNameHistoryView(AuthenticatedAPIView):
     """
     Endpoint for VerifiedName history.